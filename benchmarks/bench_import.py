@@ -0,0 +1,82 @@
+"""Benchmark the import time of `dftinputgen`.
+
+Each measurement runs in a fresh interpreter. Two scenarios are timed:
+
+1. `dftinputgen.data`, which has no third-party dependencies.
+2. `dftinputgen.qe.pwx`, with numpy and ase imported before the timer is
+   started, so that only the import cost of `dftinputgen` itself is
+   measured.
+
+Usage: python benchmarks/bench_import.py [-n REPEATS]
+"""
+
+import sys
+import json
+import argparse
+import subprocess
+
+
+SCENARIOS = [
+    ("dftinputgen.data", []),
+    ("dftinputgen.qe.pwx", ["numpy", "ase", "ase.io"]),
+]
+
+
+_TIMER_SCRIPT = """
+import sys
+import json
+import time
+{preload}
+preloaded = set(sys.modules)
+t0 = time.perf_counter()
+import {module}
+t1 = time.perf_counter()
+new_modules = sorted(set(sys.modules) - preloaded)
+from dftinputgen.data import STANDARD_ATOMIC_WEIGHTS
+from dftinputgen.qe.settings import QE_TAGS
+from dftinputgen.qe.settings.calculation_presets import QE_PRESETS
+print(json.dumps({{
+    "import_time_ms": (t1 - t0) * 1e3,
+    "new_modules": new_modules,
+    "data_loaded": [
+        getattr(d, "is_loaded", True)
+        for d in (STANDARD_ATOMIC_WEIGHTS, QE_TAGS, QE_PRESETS)
+    ],
+}}))
+"""
+
+
+def time_import(module, preload=()):
+    """Time importing `module` in a fresh interpreter."""
+    script = _TIMER_SCRIPT.format(
+        module=module, preload="\n".join("import " + p for p in preload)
+    )
+    output = subprocess.check_output([sys.executable, "-c", script])
+    return json.loads(output.decode())
+
+
+def main():
+    """Print the median import time over several fresh interpreters."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", "--repeats", type=int, default=11)
+    args = parser.parse_args()
+
+    for module, preload in SCENARIOS:
+        results = [time_import(module, preload) for _ in range(args.repeats)]
+        times = sorted(r["import_time_ms"] for r in results)
+        pkg_resources = any(
+            m.startswith("pkg_resources") for m in results[0]["new_modules"]
+        )
+        print("{} (preloaded: {})".format(module, ", ".join(preload) or "-"))
+        print("  median import time: {:.1f} ms".format(times[len(times) // 2]))
+        print("  min/max: {:.1f}/{:.1f} ms".format(times[0], times[-1]))
+        print("  pkg_resources imported: {}".format(pkg_resources))
+        print(
+            "  data loaded after import (weights, tags, presets): {}".format(
+                results[0]["data_loaded"]
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
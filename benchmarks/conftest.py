@@ -0,0 +1,59 @@
+"""Shared fixtures for the `dftinputgen` benchmark suite."""
+
+import os
+import shutil
+import tempfile
+
+import ase
+import numpy as np
+import pytest
+
+from dftinputgen.data import STANDARD_ATOMIC_WEIGHTS
+
+
+STRUCTURE_SIZES = [1, 100, 10000, 100000]
+BATCH_SIZES = [1, 100, 1000]
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--bench-max-atoms",
+        type=int,
+        default=max(STRUCTURE_SIZES),
+        help="Skip benchmarks for structures with more atoms than this",
+    )
+
+
+def make_structure(natoms, seed=0):
+    """Random FeO-like structure with `natoms` atoms (~8 A^3/atom)."""
+    rng = np.random.RandomState(seed)
+    symbols = (["Fe", "O"] * (natoms // 2 + 1))[:natoms]
+    length = 2.0 * natoms ** (1.0 / 3.0)
+    return ase.Atoms(
+        symbols=symbols,
+        scaled_positions=rng.uniform(size=(natoms, 3)),
+        cell=np.eye(3) * length,
+        pbc=True,
+    )
+
+
+@pytest.fixture(params=STRUCTURE_SIZES, ids=lambda n: "{}_atoms".format(n))
+def structure(request):
+    """Benchmark structures over a range of sizes."""
+    if request.param > request.config.getoption("--bench-max-atoms"):
+        pytest.skip("structure larger than --bench-max-atoms")
+    return make_structure(request.param)
+
+
+@pytest.fixture(scope="session")
+def large_pseudo_dir():
+    """Directory with ~4000 dummy UPF files (several per element)."""
+    pseudo_dir = tempfile.mkdtemp(prefix="bench_pseudos_")
+    suffixes = ["pbe_v1.uspp.F", "pbesol_v1.uspp.F", "pbe-n-kjpaw_psl.1.0.0"]
+    for elem in STANDARD_ATOMIC_WEIGHTS:
+        for i in range(12):
+            for suffix in suffixes:
+                fname = "{}_{}_{}.UPF".format(elem.lower(), i, suffix)
+                open(os.path.join(pseudo_dir, fname), "w").close()
+    yield pseudo_dir
+    shutil.rmtree(pseudo_dir)
@@ -0,0 +1,144 @@
+"""Benchmarks for the pw.x input generation hot paths.
+
+Run with `pytest benchmarks/` (requires `pytest-benchmark`).
+"""
+
+import os
+import sys
+import subprocess
+
+import pytest
+
+from dftinputgen.utils import get_elem_symbol
+from dftinputgen.utils import get_elem_symbols
+from dftinputgen.utils import get_kpoint_grid_from_spacing
+from dftinputgen.qe.pwx import PwxInputGenerator
+from dftinputgen.qe.pwx import _PSEUDO_INDEX_CACHE
+from dftinputgen.structure import ArrayStructure
+
+from conftest import BATCH_SIZES
+from conftest import make_structure
+
+
+CARDS = ["atomic_species", "atomic_positions", "kpoints", "cell_parameters"]
+
+
+def _pwig(structure, **kwargs):
+    return PwxInputGenerator(
+        crystal_structure=structure, calculation_presets="scf", **kwargs
+    )
+
+
+def test_constructor(benchmark, structure):
+    benchmark(_pwig, structure)
+
+
+def test_calculation_settings_cached(benchmark, structure):
+    pwig = _pwig(structure)
+    benchmark(lambda: pwig.calculation_settings)
+
+
+def test_calculation_settings_merge(benchmark, structure):
+    pwig = _pwig(structure)
+    benchmark(pwig._get_calculation_settings)
+
+
+def test_all_namelists_as_str(benchmark, structure):
+    pwig = _pwig(structure)
+    benchmark(lambda: pwig.all_namelists_as_str)
+
+
+@pytest.mark.parametrize("card", CARDS)
+def test_card(benchmark, structure, card, large_pseudo_dir):
+    pwig = _pwig(
+        structure,
+        custom_sett_dict={"pseudo_dir": large_pseudo_dir},
+        specify_potentials=True,
+    )
+    benchmark(getattr, pwig, "{}_card".format(card))
+
+
+def test_pwx_input_as_str(benchmark, structure, large_pseudo_dir):
+    pwig = _pwig(
+        structure,
+        custom_sett_dict={"pseudo_dir": large_pseudo_dir},
+        specify_potentials=True,
+    )
+    benchmark(lambda: pwig.pwx_input_as_str)
+
+
+def test_get_kpoint_grid_from_spacing(benchmark, structure):
+    benchmark(get_kpoint_grid_from_spacing, structure, 0.15)
+
+
+@pytest.mark.parametrize("index", ["cold", "warm"])
+def test_get_pseudo_names(benchmark, large_pseudo_dir, index):
+    pwig = _pwig(
+        make_structure(100),
+        custom_sett_dict={"pseudo_dir": large_pseudo_dir},
+        specify_potentials=True,
+    )
+
+    def _setup():
+        if index == "cold":
+            _PSEUDO_INDEX_CACHE.clear()
+
+    benchmark.pedantic(
+        pwig._get_pseudo_names, setup=_setup, rounds=20, iterations=1
+    )
+
+
+@pytest.mark.parametrize("batch_size", BATCH_SIZES)
+def test_generate_many(benchmark, batch_size, large_pseudo_dir):
+    structures = [make_structure(8, seed=i) for i in range(batch_size)]
+    pwig = _pwig(
+        structures[0],
+        custom_sett_dict={"pseudo_dir": large_pseudo_dir},
+        specify_potentials=True,
+    )
+    benchmark(lambda: list(pwig.generate_many(structures)))
+
+
+@pytest.mark.parametrize("batch_size", BATCH_SIZES)
+def test_generate_many_array_structures(
+    benchmark, batch_size, large_pseudo_dir
+):
+    structures = [
+        ArrayStructure.from_atoms(make_structure(8, seed=i))
+        for i in range(batch_size)
+    ]
+    pwig = _pwig(
+        structures[0],
+        custom_sett_dict={"pseudo_dir": large_pseudo_dir},
+        specify_potentials=True,
+    )
+    benchmark(lambda: list(pwig.generate_many(structures)))
+
+
+def test_cli_driver_cold_start(benchmark, tmpdir):
+    structure_file = os.path.join(
+        os.path.dirname(__file__), os.pardir, "tests", "files", "feo_conv.vasp"
+    )
+    script = "from dftinputgen.cli import driver; driver()"
+    args = [
+        sys.executable,
+        "-c",
+        script,
+        "pw.x",
+        "-i",
+        structure_file,
+        "-pre",
+        "scf",
+        "-loc",
+        str(tmpdir),
+    ]
+    benchmark.pedantic(subprocess.check_call, args=(args,), rounds=5)
+
+
+def test_get_elem_symbol(benchmark):
+    labels = ["Fe", "Fe1", "Fe-2", "Fe_up", "3RGe-34"] * 20
+    benchmark(lambda: [get_elem_symbol(label) for label in labels])
+
+
+def test_get_elem_symbols(benchmark, structure):
+    benchmark(get_elem_symbols, structure.get_chemical_symbols())
@@ -21,8 +21,20 @@ setup(
     packages=find_packages(where="src"),
     package_dir={"": "src"},
     include_package_data=True,
-    install_requires=["six", "numpy", "ase <= 3.17"],
-    entry_points={"console_scripts": ["dftinputgen = dftinputgen.cli:driver"]},
+    install_requires=[
+        "six",
+        "numpy",
+        "ase <= 3.17",
+        # backport of `concurrent.futures`
+        'futures; python_version < "3"',
+    ],
+    extras_require={"zstd": ["zstandard"], "spglib": ["spglib"]},
+    entry_points={
+        "console_scripts": [
+            "dftinputgen = dftinputgen.cli:driver",
+            "dftinputgen-client = dftinputgen.server:client_main",
+        ]
+    },
     classifiers=[
         "Programming Language :: Python :: 2.7",
         "Programming Language :: Python :: 3.8",
@@ -1,11 +1,11 @@
-import pkg_resources
+import os
 
 
 __all__ = ["VERSION", "__version__", "__short_version__"]
 
 
 # single-sourcing the package version
-version_file = pkg_resources.resource_filename("dftinputgen", "VERSION.txt")
+version_file = os.path.join(os.path.dirname(__file__), "VERSION.txt")
 with open(version_file, "r") as fr:
     __version__ = fr.read().strip()
 
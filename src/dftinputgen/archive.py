@@ -0,0 +1,234 @@
+import io
+import os
+import six
+import json
+import time
+import tarfile
+import zipfile
+
+from dftinputgen.base import DftInputGeneratorError
+
+
+__all__ = [
+    "ARCHIVE_FORMATS",
+    "ArchiveWriterError",
+    "ShardedArchiveWriter",
+]
+
+
+ARCHIVE_FORMATS = {
+    "tar": ".tar",
+    "tar.gz": ".tar.gz",
+    "tar.bz2": ".tar.bz2",
+    "tar.xz": ".tar.xz",
+    "tar.zst": ".tar.zst",
+    "zip": ".zip",
+}
+"""Supported archive formats and the extensions of the archive files."""
+
+
+class ArchiveWriterError(DftInputGeneratorError):
+    """Errors associated with writing input files into archives."""
+
+    pass
+
+
+def _open_zstd_stream(path):
+    # optional dependency: imported here, only if needed
+    try:
+        import zstandard
+    except ImportError:
+        msg = 'Archive format "tar.zst" requires the "zstandard" package'
+        raise ArchiveWriterError(msg)
+    fw = open(path, "wb")
+    compressor = zstandard.ZstdCompressor()
+    return fw, compressor.stream_writer(fw)
+
+
+class _TarShard(object):
+    def __init__(self, path, archive_format):
+        self._fileobjs = []
+        if archive_format == "tar.zst":
+            self._fileobjs = list(_open_zstd_stream(path))
+            self._tar = tarfile.open(
+                fileobj=self._fileobjs[-1], mode="w|"
+            )
+        else:
+            mode = "w:{}".format(archive_format.partition(".")[2])
+            self._tar = tarfile.open(path, mode=mode.rstrip(":"))
+
+    def add(self, member_name, data):
+        info = tarfile.TarInfo(name=member_name)
+        info.size = len(data)
+        info.mtime = time.time()
+        info.mode = 0o644
+        self._tar.addfile(info, io.BytesIO(data))
+
+    def close(self):
+        self._tar.close()
+        for fileobj in reversed(self._fileobjs):
+            fileobj.close()
+
+
+class _ZipShard(object):
+    def __init__(self, path):
+        self._zip = zipfile.ZipFile(
+            path, mode="w", compression=zipfile.ZIP_DEFLATED
+        )
+
+    def add(self, member_name, data):
+        info = zipfile.ZipInfo(
+            filename=member_name, date_time=time.localtime()[:6]
+        )
+        info.compress_type = zipfile.ZIP_DEFLATED
+        info.external_attr = 0o644 << 16
+        self._zip.writestr(info, data)
+
+    def close(self):
+        self._zip.close()
+
+
+class ShardedArchiveWriter(object):
+    """Write many small files as members of a series of archive "shards".
+
+    Instead of one file per input, files are added to archives of at most
+    `shard_size` members each, named "[`prefix`]_00000[.ext]",
+    "[`prefix`]_00001[.ext]", etc. in `write_location`. When the writer is
+    closed, an index of all members (a JSON file "[`prefix`]_index.json"
+    with member name: archive file name) is written alongside the shards.
+
+    Can be used as a context manager (the writer is closed on exit).
+    """
+
+    def __init__(
+        self,
+        write_location,
+        archive_format="tar",
+        shard_size=None,
+        prefix="inputs",
+        overwrite_files=True,
+    ):
+        """
+        Constructor.
+
+        Parameters
+        ----------
+        write_location: str
+            Path to the directory in which to write the archives.
+
+        archive_format: str, optional
+            One of :data:`ARCHIVE_FORMATS`: "tar", "tar.gz", "tar.bz2",
+            "tar.xz" (Python 3 only), "tar.zst" (requires the `zstandard`
+            package) or "zip".
+
+            Default: "tar"
+
+        shard_size: int, optional
+            Maximum number of members per archive.
+
+            Default: 10000
+
+        prefix: str, optional
+            Prefix of the names of the archive and index files.
+
+            Default: "inputs"
+
+        overwrite_files: bool, optional
+            Whether to overwrite existing archives and index files. If set
+            to False, an error is raised instead.
+
+            Default: True
+
+        """
+        if archive_format not in ARCHIVE_FORMATS:
+            msg = 'Unknown archive format "{}"; expected one of [{}]'.format(
+                archive_format, ", ".join(sorted(ARCHIVE_FORMATS))
+            )
+            raise ArchiveWriterError(msg)
+        if archive_format == "tar.xz" and not six.PY3:
+            # `tarfile` in Python 2 has no support for lzma compression
+            msg = 'Archive format "tar.xz" requires Python 3'
+            raise ArchiveWriterError(msg)
+        if shard_size is None:
+            shard_size = 10000
+        if shard_size < 1:
+            msg = "Number of members per archive must be positive"
+            raise ArchiveWriterError(msg)
+        self._write_location = write_location
+        self._archive_format = archive_format
+        self._shard_size = shard_size
+        self._prefix = prefix
+        self._overwrite_files = overwrite_files
+        self._shard = None
+        self._num_shards = 0
+        self._num_members_in_shard = 0
+        self._index = {}
+
+    @property
+    def index(self):
+        """Dictionary of member name: name of the archive file it is in."""
+        return self._index
+
+    @property
+    def index_file(self):
+        """Path to the index of all members written."""
+        return os.path.join(
+            self._write_location, "{}_index.json".format(self._prefix)
+        )
+
+    def _get_shard_name(self, shard_number):
+        return "{}_{:05d}{}".format(
+            self._prefix, shard_number, ARCHIVE_FORMATS[self._archive_format]
+        )
+
+    def _check_overwrite(self, path):
+        if not self._overwrite_files and os.path.exists(path):
+            msg = 'File "{}" already exists'.format(path)
+            raise ArchiveWriterError(msg)
+
+    def _open_next_shard(self):
+        self._close_shard()
+        if not os.path.isdir(self._write_location):
+            os.makedirs(self._write_location)
+        path = os.path.join(
+            self._write_location, self._get_shard_name(self._num_shards)
+        )
+        self._check_overwrite(path)
+        if self._archive_format == "zip":
+            self._shard = _ZipShard(path)
+        else:
+            self._shard = _TarShard(path, self._archive_format)
+        self._num_shards += 1
+        self._num_members_in_shard = 0
+
+    def _close_shard(self):
+        if self._shard is not None:
+            self._shard.close()
+            self._shard = None
+
+    def add(self, member_name, contents):
+        """Add a file with the (str) contents to the current archive."""
+        if member_name in self._index:
+            msg = 'Duplicate archive member "{}"'.format(member_name)
+            raise ArchiveWriterError(msg)
+        shard_full = self._num_members_in_shard >= self._shard_size
+        if self._shard is None or shard_full:
+            self._open_next_shard()
+        self._shard.add(member_name, contents.encode("utf-8"))
+        self._num_members_in_shard += 1
+        self._index[member_name] = self._get_shard_name(self._num_shards - 1)
+
+    def close(self):
+        """Close the current archive, and write the index of all members."""
+        self._close_shard()
+        if not self._index:
+            return
+        self._check_overwrite(self.index_file)
+        with open(self.index_file, "w") as fw:
+            json.dump(self._index, fw, indent=0, sort_keys=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
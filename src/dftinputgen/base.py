@@ -7,6 +7,12 @@ from abc import abstractmethod
 
 import ase
 
+from dftinputgen.cache import hash_inputs
+from dftinputgen.cache import InputCacheManifest
+from dftinputgen.profiling import timed
+from dftinputgen.profiling import TimingStats
+from dftinputgen.structure import ArrayStructure
+
 
 class DftInputGeneratorError(Exception):
     """Base class for errors associated with DFT input files generation."""
@@ -26,6 +32,8 @@ class DftInputGenerator(object):
         custom_sett_dict=None,
         write_location=None,
         overwrite_files=None,
+        use_input_cache=None,
+        profile=None,
         **kwargs
     ):
         """
@@ -35,7 +43,8 @@ class DftInputGenerator(object):
         ----------
         crystal_structure: :class:`ase.Atoms` object
             :class:`ase.Atoms` object resulting from `ase.io.read([crystal
-            structure file])`.
+            structure file])`, or a lightweight
+            :class:`ArrayStructure <dftinputgen.structure.ArrayStructure>`.
 
         calculation_presets: str, optional
             The "base" calculation settings to use--must be one of the
@@ -75,12 +84,41 @@ class DftInputGenerator(object):
         overwrite_files: bool, optional
             To overwrite files or not, that is the question.
 
+            If set to False, existing input files at `write_location` are
+            never modified.
+
             Default: True
 
+        use_input_cache: bool, optional
+            Whether to skip rewriting input files that are up-to-date.
+
+            If set to True, a hash of all inputs (crystal structure, merged
+            calculation settings, and package version; see
+            :func:`hash_inputs <dftinputgen.cache.hash_inputs>`) is recorded
+            for every file written, in a manifest in `write_location`. A file
+            is rewritten only if the hash of its inputs has changed, or if
+            the file was modified or removed since.
+
+            Default: False
+
+        profile: bool, optional
+            Whether to record the wall time spent in, and the number of calls
+            to, every stage of input generation (e.g. merging settings,
+            formatting input, writing files) in `timing_stats`.
+
+            Default: False
+
         **kwargs:
             Arbitrary keyword arguments.
 
         """
+        # merged calculation settings, built lazily by derived classes and
+        # discarded whenever any of the inputs they depend on change
+        self._calculation_settings = None
+
+        self._timing_stats = None
+        self.profile = profile
+
         self._crystal_structure = None
         self.crystal_structure = crystal_structure
 
@@ -102,9 +140,13 @@ class DftInputGenerator(object):
         if overwrite_files is not None:
             self.overwrite_files = overwrite_files
 
+        self._use_input_cache = False
+        if use_input_cache is not None:
+            self.use_input_cache = use_input_cache
+
     @property
     def crystal_structure(self):
-        """Input crystal structure as an `ase.Atoms` object."""
+        """Input crystal structure as an `ase.Atoms`/`ArrayStructure`."""
         return self._crystal_structure
 
     @crystal_structure.setter
@@ -112,9 +154,10 @@ class DftInputGenerator(object):
         self._set_crystal_structure(crystal_structure)
 
     def _set_crystal_structure(self, crystal_structure):
-        if not isinstance(crystal_structure, ase.Atoms):
+        if not isinstance(crystal_structure, (ase.Atoms, ArrayStructure)):
             input_type = type(crystal_structure)
-            msg = 'Expected type "ase.Atoms"; found "{}"'.format(input_type)
+            msg = 'Expected type "ase.Atoms" or "ArrayStructure"; found "{}"'
+            msg = msg.format(input_type)
             raise TypeError(msg)
         self._crystal_structure = crystal_structure
 
@@ -125,6 +168,8 @@ class DftInputGenerator(object):
 
     @calculation_presets.setter
     def calculation_presets(self, calculation_presets):
+        if calculation_presets != self._calculation_presets:
+            self._invalidate_calculation_settings()
         self._calculation_presets = calculation_presets
 
     @property
@@ -135,7 +180,10 @@ class DftInputGenerator(object):
     @custom_sett_file.setter
     def custom_sett_file(self, custom_sett_file):
         self._custom_sett_file = custom_sett_file
-        self._custom_sett_from_file = self._read_custom_sett_from_file()
+        custom_sett_from_file = self._read_custom_sett_from_file()
+        if custom_sett_from_file != self._custom_sett_from_file:
+            self._invalidate_calculation_settings()
+        self._custom_sett_from_file = custom_sett_from_file
 
     @property
     def custom_sett_from_file(self):
@@ -149,6 +197,8 @@ class DftInputGenerator(object):
 
     @custom_sett_dict.setter
     def custom_sett_dict(self, custom_sett_dict):
+        if custom_sett_dict != self._custom_sett_dict:
+            self._invalidate_calculation_settings()
         self._custom_sett_dict = custom_sett_dict
 
     @property
@@ -172,6 +222,78 @@ class DftInputGenerator(object):
     def overwrite_files(self, overwrite_files):
         self._overwrite_files = overwrite_files
 
+    @property
+    def use_input_cache(self):
+        """Should up-to-date files at `write_location` be left untouched."""
+        return self._use_input_cache
+
+    @use_input_cache.setter
+    def use_input_cache(self, use_input_cache):
+        self._use_input_cache = use_input_cache
+
+    @property
+    def profile(self):
+        """Is the time spent in every stage of input generation recorded."""
+        return self._timing_stats is not None
+
+    @profile.setter
+    def profile(self, profile):
+        if not profile:
+            self._timing_stats = None
+        elif self._timing_stats is None:
+            self._timing_stats = TimingStats()
+
+    @property
+    def timing_stats(self):
+        """Wall time and number of calls per stage (None if not `profile`)."""
+        return self._timing_stats
+
+    @property
+    @timed("input_hash")
+    def input_hash(self):
+        """Hash of all inputs that determine the generated input files."""
+        return hash_inputs(
+            self.crystal_structure,
+            self.calculation_settings,
+            extra=self._get_input_hash_extra(),
+        )
+
+    def _get_input_hash_extra(self):
+        """Data other than structure and settings that determine inputs."""
+        return {"dft_package": self.dft_package}
+
+    @timed("write_input_files")
+    def _write_input_file(self, filename, write_file):
+        """Write a file in `write_location` using the `write_file` callable.
+
+        The file is not written if it exists and `overwrite_files` is False,
+        or (with `use_input_cache`) if it is up-to-date per the manifest.
+
+        Returns True if the file was written, False if it was skipped.
+        """
+        path = os.path.join(self.write_location, filename)
+        if not self.overwrite_files and os.path.exists(path):
+            return False
+        if not self.use_input_cache:
+            write_file()
+            return True
+        manifest = InputCacheManifest(self.write_location)
+        input_hash = self.input_hash
+        if manifest.is_unchanged(filename, input_hash):
+            return False
+        write_file()
+        manifest.record(filename, input_hash)
+        manifest.save()
+        return True
+
+    def _invalidate_calculation_settings(self):
+        """Discard cached calculation settings (rebuilt on next access).
+
+        Derived classes that determine settings from the crystal structure
+        should call this when those structure-dependent settings change.
+        """
+        self._calculation_settings = None
+
     def _read_custom_sett_from_file(self):
         if self.custom_sett_file is None:
             return {}
@@ -0,0 +1,162 @@
+import os
+import json
+import hashlib
+
+import numpy as np
+
+from dftinputgen import __version__
+from dftinputgen.utils import write_json_atomic
+
+
+__all__ = ["MANIFEST_FILENAME", "hash_inputs", "InputCacheManifest"]
+
+
+MANIFEST_FILENAME = ".dftinputgen_manifest.json"
+"""Name of the manifest file written in the write location."""
+
+_MANIFEST_FORMAT_VERSION = 1
+
+
+def _update_with_array(sha, name, array):
+    array = np.ascontiguousarray(array)
+    header = "{}:{}:{}".format(name, array.dtype.str, array.shape)
+    sha.update(header.encode("utf-8"))
+    sha.update(array.tobytes())
+
+
+def hash_inputs(crystal_structure, calculation_settings, extra=None):
+    """Stable hash of everything that determines the generated input files.
+
+    The hash covers all per-atom arrays (numbers, positions, magnetic
+    moments, ...), the cell and periodicity of the crystal structure, the
+    merged calculation settings, any `extra` (JSON-serializable) data, and
+    the version of this package.
+
+    Parameters
+    ----------
+    crystal_structure: :class:`ase.Atoms` object
+        Input crystal structure.
+
+    calculation_settings: dict
+        Merged calculation settings used to generate the input files.
+
+    extra: dict, optional
+        Any other data that determines the input files, e.g. names of
+        pseudopotentials matched for each species.
+
+    Returns
+    -------
+    Hexadecimal SHA-256 digest as a str.
+
+    """
+    sha = hashlib.sha256()
+    sha.update(__version__.encode("utf-8"))
+    for name in sorted(crystal_structure.arrays):
+        _update_with_array(sha, name, crystal_structure.arrays[name])
+    _update_with_array(sha, "cell", np.array(crystal_structure.get_cell()))
+    _update_with_array(sha, "pbc", crystal_structure.get_pbc())
+    settings = {"calculation_settings": calculation_settings, "extra": extra}
+    serialized = json.dumps(settings, sort_keys=True, default=repr)
+    sha.update(serialized.encode("utf-8"))
+    return sha.hexdigest()
+
+
+class InputCacheManifest(object):
+    """Manifest of input files written to a location, with input hashes.
+
+    The manifest maps paths of input files (relative to `write_location`)
+    to the hash of the inputs they were generated from (see
+    :func:`hash_inputs`), and the size and modification time of the file
+    when it was written. A file whose inputs hash to the recorded value, and
+    which has not been modified or removed since, need not be regenerated.
+
+    The manifest is read lazily, and is only written when :meth:`save` is
+    called. A missing or unreadable manifest is treated as empty.
+    """
+
+    def __init__(self, write_location, manifest_file=None, entries=None):
+        """
+        Constructor.
+
+        Parameters
+        ----------
+        write_location: str
+            Path to the directory in which input files are written.
+
+        manifest_file: str, optional
+            Name of the manifest file in `write_location`.
+
+            Default: :data:`MANIFEST_FILENAME`
+
+        entries: dict, optional
+            Entries to start with, instead of reading them from the manifest
+            file (e.g. the subset of entries relevant to a worker process).
+
+        """
+        self._write_location = write_location
+        if manifest_file is None:
+            manifest_file = MANIFEST_FILENAME
+        self._manifest_file = manifest_file
+        self._entries = entries
+
+    @property
+    def path(self):
+        """Path to the manifest file."""
+        return os.path.join(self._write_location, self._manifest_file)
+
+    @property
+    def entries(self):
+        """Dictionary of relative file path: entry (read now, if needed)."""
+        if self._entries is None:
+            self._entries = self._read_entries()
+        return self._entries
+
+    def _read_entries(self):
+        try:
+            with open(self.path, "r") as fr:
+                manifest = json.load(fr)
+        except (IOError, OSError, ValueError):
+            return {}
+        if not isinstance(manifest, dict):
+            return {}
+        if manifest.get("format_version") != _MANIFEST_FORMAT_VERSION:
+            return {}
+        return manifest.get("entries", {})
+
+    def _stat(self, relpath):
+        try:
+            st = os.stat(os.path.join(self._write_location, relpath))
+        except OSError:
+            return None
+        return {"size": st.st_size, "mtime": st.st_mtime}
+
+    def is_unchanged(self, relpath, input_hash):
+        """Is the file at `relpath` up-to-date for inputs with this hash."""
+        entry = self.entries.get(relpath)
+        if entry is None or entry.get("hash") != input_hash:
+            return False
+        stat = self._stat(relpath)
+        if stat is None:
+            return False
+        return stat == {"size": entry["size"], "mtime": entry["mtime"]}
+
+    def record(self, relpath, input_hash):
+        """Record the hash of the inputs of the file (just) written."""
+        entry = {"hash": input_hash}
+        entry.update(self._stat(relpath))
+        self.entries[relpath] = entry
+        return entry
+
+    def update(self, entries):
+        """Add/replace entries, e.g. recorded in other processes."""
+        self.entries.update(entries)
+
+    def save(self):
+        """Write the manifest to disk (atomically, via a temporary file)."""
+        manifest = {
+            "format_version": _MANIFEST_FORMAT_VERSION,
+            "entries": self.entries,
+        }
+        if not os.path.isdir(self._write_location):
+            os.makedirs(self._write_location)
+        write_json_atomic(self.path, manifest, sort_keys=True)
@@ -2,6 +2,14 @@ import argparse
 
 from dftinputgen.demo.pwx import build_pwx_parser
 from dftinputgen.demo.pwx import generate_pwx_input_files
+from dftinputgen.demo.pwx import build_pwx_batch_parser
+from dftinputgen.demo.pwx import generate_pwx_input_files_from_manifest
+from dftinputgen.demo.pwx import build_pwx_cost_parser
+from dftinputgen.demo.pwx import report_pwx_cost
+from dftinputgen.server import build_client_parser
+from dftinputgen.server import build_serve_parser
+from dftinputgen.server import client_command
+from dftinputgen.server import serve_command
 
 
 def get_parser():
@@ -25,6 +33,33 @@ def get_parser():
     build_pwx_parser(pwx_parser)
     pwx_parser.set_defaults(func=generate_pwx_input_files)
 
+    # add pw.x batch subparser
+    batch_help = """Generate input files for pw.x for all items in a
+    JSON-lines manifest, in one process"""
+    batch_parser = subparsers.add_parser("batch", help=batch_help)
+    build_pwx_batch_parser(batch_parser)
+    batch_parser.set_defaults(func=generate_pwx_input_files_from_manifest)
+
+    # add pw.x cost report subparser
+    cost_help = """Estimate the size and cost of a pw.x calculation, and
+    recommend a parallelization layout"""
+    cost_parser = subparsers.add_parser("cost", help=cost_help)
+    build_pwx_cost_parser(cost_parser)
+    cost_parser.set_defaults(func=report_pwx_cost)
+
+    # add server subparser
+    serve_help = """Run a long-lived server that generates input files for
+    commands sent to it (as JSON lines), without per-call startup cost"""
+    serve_parser = subparsers.add_parser("serve", help=serve_help)
+    build_serve_parser(serve_parser)
+    serve_parser.set_defaults(func=serve_command)
+
+    # add client subparser
+    client_help = "Send a command to a running dftinputgen server"
+    client_parser = subparsers.add_parser("client", help=client_help)
+    build_client_parser(client_parser)
+    client_parser.set_defaults(func=client_command)
+
     # other subparsers, to be added similarly, go here
     # e.g. ones for gpaw/vasp
 
@@ -1,8 +1,150 @@
-import json
-import pkg_resources
+import os
+import importlib
 
 
-__all__ = ["STANDARD_ATOMIC_WEIGHTS"]
+__all__ = ["STANDARD_ATOMIC_WEIGHTS", "ATOMIC_WEIGHTS"]
+
+
+def _package_dir(package):  # pragma: no cover
+    """Directory of an installed package (fallback for Python < 3.9)."""
+    return os.path.dirname(importlib.import_module(package).__file__)
+
+
+def _resource_root(package):
+    """Traversable root of the data files in `package` (Python >= 3.9)."""
+    # imported here, on first use, to keep `import dftinputgen` fast
+    try:
+        from importlib.resources import files
+    except ImportError:  # pragma: no cover
+        return None
+    return files(package)
+
+
+def read_resource_text(package, resource):
+    """Read the contents of a data file packaged with `package`."""
+    root = _resource_root(package)
+    if root is None:  # pragma: no cover
+        with open(os.path.join(_package_dir(package), resource), "r") as fr:
+            return fr.read()
+    return root.joinpath(resource).read_text()
+
+
+def list_resources(package):
+    """Names of all data files packaged with `package`."""
+    root = _resource_root(package)
+    if root is None:  # pragma: no cover
+        return sorted(os.listdir(_package_dir(package)))
+    return sorted(r.name for r in root.iterdir())
+
+
+def load_json_resource(package, resource):
+    """Load a JSON data file packaged with `package`."""
+    import json
+
+    return json.loads(read_resource_text(package, resource))
+
+
+# marks a `LazyMapping` that is not loaded yet in the underlying dict, so
+# that C code reading the dict directly (e.g. the size check in the C JSON
+# encoder) does not take it for an empty dict, and calls back into the
+# (loading) methods instead
+_NOT_LOADED = object()
+
+
+class LazyMapping(dict):
+    """Dictionary whose contents are loaded on first access.
+
+    A regular `dict` in every other way (e.g. it can be serialized with
+    `json.dump`, updated, or used to update other dictionaries); any read
+    or update loads the contents first.
+
+    Parameters
+    ----------
+    loader: callable
+        Function without arguments that returns the contents (a dictionary).
+        It is called at most once, and its result is cached.
+
+    """
+
+    def __init__(self, loader):
+        super(LazyMapping, self).__init__({_NOT_LOADED: None})
+        self._loader = loader
+        self._loaded = False
+
+    def _load(self):
+        if not self._loaded:
+            self._loaded = True
+            dict.clear(self)
+            dict.update(self, self._loader())
+
+    @property
+    def data(self):
+        """The loaded dictionary (loaded now, if not already)."""
+        self._load()
+        return self
+
+    @property
+    def is_loaded(self):
+        """Have the contents already been loaded."""
+        return self._loaded
+
+    def __repr__(self):
+        if not self.is_loaded:
+            return "{}(<not loaded>)".format(type(self).__name__)
+        return "{}({})".format(type(self).__name__, dict.__repr__(self))
+
+    def __reduce__(self):
+        # copied/pickled as a plain dictionary (the loader may not pickle)
+        return (dict, (dict(self.items()),))
+
+
+def _loading(name):
+    method = getattr(dict, name)
+
+    def _method(self, *args, **kwargs):
+        self._load()
+        return method(self, *args, **kwargs)
+
+    _method.__name__ = name
+    _method.__doc__ = method.__doc__
+    return _method
+
+
+for _name in [
+    "__getitem__",
+    "__contains__",
+    "__iter__",
+    "__len__",
+    "__eq__",
+    "__ne__",
+    "__setitem__",
+    "__delitem__",
+    "keys",
+    "values",
+    "items",
+    "get",
+    "copy",
+    "update",
+    "setdefault",
+    "pop",
+    "popitem",
+    "clear",
+    "__reversed__",
+    "__or__",
+    "__ror__",
+    "__ior__",
+    # Python 2
+    "has_key",
+    "iterkeys",
+    "itervalues",
+    "iteritems",
+    "viewkeys",
+    "viewvalues",
+    "viewitems",
+]:
+    if hasattr(dict, _name):
+        setattr(LazyMapping, _name, _loading(_name))
+del _name
 
 
 """
@@ -16,9 +158,89 @@ Filtered as follows:
   materials, and does not imply any statistical distribution (i.e., the mean
   is not necessarily the most likely value).
 
+Loaded lazily, on first access.
 """
-saw_file = pkg_resources.resource_filename(
-    "dftinputgen.data", "standard_atomic_weights.json"
+STANDARD_ATOMIC_WEIGHTS = LazyMapping(
+    lambda: load_json_resource(
+        "dftinputgen.data", "standard_atomic_weights.json"
+    )
 )
-with open(saw_file) as fr:
-    STANDARD_ATOMIC_WEIGHTS = json.load(fr)
+
+
+class AtomicWeights(object):
+    """Standard atomic weights as an array indexed by atomic number.
+
+    Built lazily, on first access, from a mapping of element symbol to a
+    dictionary with the "atomic_number" and "standard_atomic_weight" of the
+    element (e.g. :data:`STANDARD_ATOMIC_WEIGHTS`), so that weights for all
+    atoms in a structure can be looked up with a single fancy-index, e.g.
+    ``ATOMIC_WEIGHTS.weights[atoms.numbers]``.
+
+    Parameters
+    ----------
+    standard_atomic_weights: mapping
+        Element symbol: {"atomic_number": int, "standard_atomic_weight":
+        float}.
+
+    """
+
+    def __init__(self, standard_atomic_weights):
+        self._standard_atomic_weights = standard_atomic_weights
+        self._weights = None
+        self._atomic_numbers = None
+
+    def _load(self):
+        # imported here, on first use, to keep `import dftinputgen` fast
+        import numpy as np
+
+        atomic_numbers = {
+            symbol: data["atomic_number"]
+            for symbol, data in self._standard_atomic_weights.items()
+        }
+        weights = np.full(max(atomic_numbers.values()) + 1, np.nan)
+        for symbol, data in self._standard_atomic_weights.items():
+            weights[data["atomic_number"]] = data["standard_atomic_weight"]
+        self._atomic_numbers = atomic_numbers
+        self._weights = weights
+
+    @property
+    def weights(self):
+        """float64 array of weights, indexed by atomic number (NaN if none)."""
+        if self._weights is None:
+            self._load()
+        return self._weights
+
+    @property
+    def atomic_numbers(self):
+        """Dictionary of element symbol: atomic number."""
+        if self._atomic_numbers is None:
+            self._load()
+        return self._atomic_numbers
+
+    @property
+    def is_loaded(self):
+        """Has the array already been built."""
+        return self._weights is not None
+
+    def get_weights(self, symbols):
+        """Array of weights for a sequence of element symbols.
+
+        Raises `KeyError` for symbols that are not element symbols.
+        """
+        atomic_numbers = self.atomic_numbers
+        return self.weights[[atomic_numbers[s] for s in symbols]]
+
+    def __repr__(self):
+        if not self.is_loaded:
+            return "{}(<not loaded>)".format(type(self).__name__)
+        return "{}({!r})".format(type(self).__name__, self._weights)
+
+
+"""
+Standard atomic weights (see `STANDARD_ATOMIC_WEIGHTS`) as a float64 array
+indexed by atomic number, along with a map of element symbol to atomic
+number.
+
+Built lazily, on first access.
+"""
+ATOMIC_WEIGHTS = AtomicWeights(STANDARD_ATOMIC_WEIGHTS)
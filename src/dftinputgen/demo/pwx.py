@@ -1,10 +1,21 @@
 """Demo generating input files for doing a calculation with pw.x."""
 
+import os
+import sys
 import json
 import argparse
+import multiprocessing
 
 from dftinputgen.utils import read_crystal_structure
 from dftinputgen.qe.pwx import PwxInputGenerator
+from dftinputgen.qe.bulk import write_pwx_input_files
+from dftinputgen.qe.bulk import write_pwx_input_files_from_frames
+from dftinputgen.qe.bulk import write_pwx_input_files_from_manifest
+from dftinputgen.qe.cost import estimate_pwx_cost
+from dftinputgen.qe.cost import recommend_pwx_layout
+from dftinputgen.qe.cost import format_pwx_cost_report
+from dftinputgen.archive import ARCHIVE_FORMATS
+from dftinputgen.profiling import TimingStats
 
 
 def _get_default_parser():
@@ -14,22 +25,59 @@ def _get_default_parser():
 
 def build_pwx_parser(parser):
     """Adds pw.x arguments to the input `argparse.ArgumentParser` object."""
-    # Required:
+    # Required (one of):
+    structure_group = parser.add_mutually_exclusive_group(required=True)
     crystal_structure = "(REQUIRED) File with the input crystal structure"
-    parser.add_argument(
+    structure_group.add_argument(
         "-i",
         "--crystal-structure",
         type=read_crystal_structure,
         help=crystal_structure,
-        required=True,
+    )
+
+    crystal_structures = """Files with input crystal structures to write
+    input files for in bulk (instead of "-i"). The input file for each
+    structure is written in a subdirectory of the write location named after
+    the structure file (without extension)"""
+    structure_group.add_argument(
+        "-bulk",
+        "--crystal-structures",
+        nargs="+",
+        default=None,
+        help=crystal_structures,
+    )
+
+    crystal_structure_frames = """Multi-frame crystal structure file (e.g.
+    extxyz, ASE trajectory or database) to write an input file for every
+    frame of (instead of "-i"). Frames are read one at a time. The input file
+    for each frame is written in a subdirectory of the write location named
+    after the index of the frame in the file, e.g. 000042"""
+    structure_group.add_argument(
+        "-frames",
+        "--crystal-structure-frames",
+        default=None,
+        help=crystal_structure_frames,
     )
 
     # Optional:
+    _add_settings_arguments(parser)
+    _add_output_arguments(parser)
+
+    frame_index = """Frames to use from the multi-frame crystal structure
+    file, e.g. "10:100:10". Default: all frames"""
+    parser.add_argument(
+        "-index", "--frame-index", default=":", help=frame_index
+    )
+
+    _add_bulk_arguments(parser)
+
+
+def _add_settings_arguments(parser):
     calculation_presets = "Preset group of tags and default values to use"
     parser.add_argument(
         "-pre",
         "--calculation-presets",
-        choices=["scf", "relax", "vc-relax"],
+        choices=["scf", "relax", "vc-relax", "nscf", "bands"],
         default=None,
         help=calculation_presets,
     )
@@ -61,15 +109,173 @@ def build_pwx_parser(parser):
         help=specify_potentials,
     )
 
+    reduce_structure = """Reduce crystal structures to their Niggli-reduced
+    primitive cells before generating input (requires spglib)"""
+    parser.add_argument(
+        "-reduce",
+        "--reduce-structure",
+        action="store_true",
+        help=reduce_structure,
+    )
+
+
+def _add_output_arguments(parser):
     write_location = "Directory to write the input file(s) in"
     parser.add_argument("-loc", "--write-location", help=write_location)
 
     pwx_input_file = "Name of the pw.x input file"
     parser.add_argument("-o", "--pwx-input-file", help=pwx_input_file)
 
+    use_input_cache = """Skip rewriting input files whose crystal structure
+    and settings are unchanged since they were last written (tracked in a
+    manifest file in the write location)"""
+    parser.add_argument(
+        "-cache",
+        "--use-input-cache",
+        action="store_true",
+        help=use_input_cache,
+    )
+
+    profile = """Record the wall time spent in, and the number of calls to,
+    every stage of input generation, and write them as JSON to the specified
+    file (or to stderr, if no file is specified)"""
+    parser.add_argument(
+        "-profile",
+        "--profile",
+        nargs="?",
+        const="-",
+        default=None,
+        metavar="FILE",
+        help=profile,
+    )
+
+
+def _add_bulk_arguments(parser):
+    num_workers = """Number of worker processes to write input files with in
+    bulk/frames/batch mode. Default: number of processors on the machine"""
+    parser.add_argument(
+        "-np", "--num-workers", type=int, default=None, help=num_workers
+    )
+
+    io_threads = """Number of threads (per worker process) to write input
+    files with in the background in bulk/frames/batch mode, e.g. on filesystems
+    with slow metadata operations. Default: write files one at a time"""
+    parser.add_argument(
+        "-io", "--io-threads", type=int, default=None, help=io_threads
+    )
+
+    archive_format = """Write the input files into a series of archives in
+    the write location (with an index of all archive members) instead of one
+    file per crystal structure, in bulk/frames/batch mode"""
+    parser.add_argument(
+        "-archive",
+        "--archive-format",
+        choices=sorted(ARCHIVE_FORMATS),
+        default=None,
+        help=archive_format,
+    )
+
+    shard_size = """Maximum number of input files per archive.
+    Default: 10000"""
+    parser.add_argument(
+        "-shard", "--shard-size", type=int, default=None, help=shard_size
+    )
+
+    chunk_size = """Number of crystal structures handed to a worker at a time
+    in bulk/frames/batch mode"""
+    parser.add_argument(
+        "-chunk", "--chunk-size", type=int, default=None, help=chunk_size
+    )
+
+
+def build_pwx_batch_parser(parser):
+    """Adds pw.x batch arguments to the input `argparse.ArgumentParser`."""
+    # Required:
+    manifest_file = """(REQUIRED) JSON-lines manifest file, with one item
+    per line: {"crystal_structure": path to a crystal structure file
+    (relative to the manifest file) or a dictionary of arrays ("symbols",
+    "cell", "positions" or "scaled_positions", "pbc"), "custom_sett_dict":
+    (optional) custom DFT settings for this item, "name": (optional) name of
+    the subdirectory of the write location to write the input file in}"""
+    parser.add_argument("manifest_file", help=manifest_file)
+
+    # Optional:
+    _add_settings_arguments(parser)
+    _add_output_arguments(parser)
+    _add_bulk_arguments(parser)
+
+    quiet = "Do not report progress"
+    parser.add_argument("-q", "--quiet", action="store_true", help=quiet)
+
+
+def build_pwx_cost_parser(parser):
+    """Adds pw.x cost report arguments to the input `argparse` parser."""
+    # Required:
+    crystal_structure = "(REQUIRED) File with the input crystal structure"
+    parser.add_argument(
+        "-i",
+        "--crystal-structure",
+        type=read_crystal_structure,
+        required=True,
+        help=crystal_structure,
+    )
+
+    # Optional:
+    _add_settings_arguments(parser)
+
+    cores_per_node = """Number of cores per node (one MPI process per core).
+    Default: number of processors on this machine"""
+    parser.add_argument(
+        "-cores",
+        "--cores-per-node",
+        type=int,
+        default=multiprocessing.cpu_count(),
+        help=cores_per_node,
+    )
+
+    num_nodes = "Number of nodes to run the calculation on. Default: 1"
+    parser.add_argument(
+        "-nodes", "--num-nodes", type=int, default=1, help=num_nodes
+    )
+
+    memory_per_node = """Memory available per node, in GiB. Default: do not
+    take memory into account"""
+    parser.add_argument(
+        "-mem",
+        "--memory-per-node",
+        type=float,
+        default=None,
+        help=memory_per_node,
+    )
+
+    valence_electrons = """JSON string with the number of valence electrons
+    of chemical species, overriding those read from pseudopotentials or
+    estimated. Example: '{"Fe": 16}'"""
+    parser.add_argument(
+        "-zval",
+        "--valence-electrons",
+        default="{}",
+        type=json.loads,
+        help=valence_electrons,
+    )
+
+    pwx_input_file = "Name of the pw.x input file, for the suggested command"
+    parser.add_argument("-o", "--pwx-input-file", help=pwx_input_file)
+
+    as_json = "Write the estimates and layout as JSON instead of a report"
+    parser.add_argument(
+        "-json", "--json", action="store_true", help=as_json, dest="as_json"
+    )
+
 
 def generate_pwx_input_files(args):
-    """Write input files for the input crystal structure."""
+    """Write input files for the input crystal structure(s)."""
+    if args.crystal_structures is not None:
+        _generate_pwx_input_files_in_bulk(args)
+        return
+    if args.crystal_structure_frames is not None:
+        _generate_pwx_input_files_from_frames(args)
+        return
     pwig = PwxInputGenerator(
         crystal_structure=args.crystal_structure,
         calculation_presets=args.calculation_presets,
@@ -78,8 +284,207 @@ def generate_pwx_input_files(args):
         specify_potentials=args.specify_potentials,
         write_location=args.write_location,
         pwx_input_file=args.pwx_input_file,
+        use_input_cache=args.use_input_cache,
+        profile=args.profile is not None,
+        reduce_structure=args.reduce_structure,
     )
+    if args.reduce_structure:
+        _report_reduction(pwig)
     pwig.write_input_files()
+    if args.profile is not None:
+        _dump_timing_stats(pwig.timing_stats, args.profile)
+
+
+def _get_generator_kwargs(args):
+    return {
+        "write_location": args.write_location,
+        "num_workers": args.num_workers,
+        "chunk_size": args.chunk_size,
+        "io_threads": args.io_threads,
+        "archive_format": args.archive_format,
+        "shard_size": args.shard_size,
+        "calculation_presets": args.calculation_presets,
+        "custom_sett_file": args.custom_settings_file,
+        "custom_sett_dict": args.custom_settings_dict,
+        "specify_potentials": args.specify_potentials,
+        "pwx_input_file": args.pwx_input_file,
+        "use_input_cache": args.use_input_cache,
+        "reduce_structure": args.reduce_structure,
+    }
+
+
+def _report_reduction(pwig):
+    sys.stderr.write(
+        "Reduced crystal structure from {} to {} atoms (factor {:g})\n".format(
+            len(pwig.input_crystal_structure),
+            len(pwig.crystal_structure),
+            pwig.reduction_factor,
+        )
+    )
+
+
+def _get_timing_stats(args):
+    if args.profile is None:
+        return None
+    return TimingStats()
+
+
+def _dump_timing_stats(timing_stats, profile):
+    timing_stats_json = timing_stats.to_json(indent=2)
+    if profile == "-":
+        sys.stderr.write("{}\n".format(timing_stats_json))
+        return
+    with open(profile, "w") as fw:
+        fw.write(timing_stats_json)
+
+
+def _report_failures(failures):
+    for name, error in failures:
+        sys.stderr.write("Failed [{}]: {}\n".format(name, error))
+
+
+def _report_summary(num_items, failures, skipped):
+    # skipped: input files up-to-date or existing (not overwritten)
+    num_written = num_items - len(failures) - len(skipped)
+    sys.stderr.write(
+        "Wrote {} of {} input files ({} skipped, {} failed)\n".format(
+            num_written, num_items, len(skipped), len(failures)
+        )
+    )
+
+
+def _get_bulk_names(crystal_structures):
+    """Names of the input file locations for crystal structure files.
+
+    The first of these that is unique for all files: file names without
+    extension, directories relative to the common directory of all files
+    (e.g. "a", "b" for "a/POSCAR b/POSCAR"), or the relative paths of the
+    files (without extension, or with it). Path separators are replaced by
+    underscores (e.g. "a_b" for "a/b/POSCAR").
+    """
+    paths = [os.path.abspath(cs) for cs in crystal_structures]
+    common_dir = os.path.dirname(os.path.commonprefix(paths))
+    relpaths = [os.path.relpath(path, common_dir) for path in paths]
+    candidates = [
+        [os.path.splitext(os.path.basename(path))[0] for path in paths],
+        [os.path.dirname(relpath) for relpath in relpaths],
+        [os.path.splitext(relpath)[0] for relpath in relpaths],
+        relpaths,
+    ]
+    for names in candidates:
+        names = [name.replace(os.sep, "_") for name in names]
+        if all(names) and len(set(names)) == len(names):
+            return names
+    return names
+
+
+def _generate_pwx_input_files_in_bulk(args):
+    names = _get_bulk_names(args.crystal_structures)
+    if len(set(names)) != len(names):
+        sys.stderr.write("Error: duplicate crystal structure files\n")
+        sys.exit(2)
+    timing_stats = _get_timing_stats(args)
+    skipped = []
+    failures = write_pwx_input_files(
+        args.crystal_structures,
+        names=names,
+        timing_stats=timing_stats,
+        skipped=skipped,
+        **_get_generator_kwargs(args)
+    )
+    _report_failures(failures)
+    if timing_stats is not None:
+        _dump_timing_stats(timing_stats, args.profile)
+    _report_summary(len(names), failures, skipped)
+    if failures:
+        sys.exit(1)
+
+
+def _generate_pwx_input_files_from_frames(args):
+    num_done = [0]
+
+    def _progress(n_done, n_failed):
+        num_done[0] = n_done
+
+    timing_stats = _get_timing_stats(args)
+    skipped = []
+    failures = write_pwx_input_files_from_frames(
+        args.crystal_structure_frames,
+        index=args.frame_index,
+        timing_stats=timing_stats,
+        progress=_progress,
+        skipped=skipped,
+        **_get_generator_kwargs(args)
+    )
+    _report_failures(failures)
+    if timing_stats is not None:
+        _dump_timing_stats(timing_stats, args.profile)
+    _report_summary(num_done[0], failures, skipped)
+    if failures:
+        sys.exit(1)
+
+
+def _report_progress(num_done, num_failed):
+    sys.stderr.write(
+        "\rProcessed {} items ({} failed)".format(num_done, num_failed)
+    )
+    sys.stderr.flush()
+
+
+def generate_pwx_input_files_from_manifest(args):
+    """Write input files for all items in the input manifest file."""
+    num_done = [0]
+
+    def _progress(n_done, n_failed):
+        num_done[0] = n_done
+        if not args.quiet:
+            _report_progress(n_done, n_failed)
+
+    timing_stats = _get_timing_stats(args)
+    skipped = []
+    failures = write_pwx_input_files_from_manifest(
+        args.manifest_file,
+        timing_stats=timing_stats,
+        progress=_progress,
+        skipped=skipped,
+        **_get_generator_kwargs(args)
+    )
+    if num_done[0] and not args.quiet:
+        sys.stderr.write("\n")
+    _report_failures(failures)
+    if timing_stats is not None:
+        _dump_timing_stats(timing_stats, args.profile)
+    _report_summary(num_done[0], failures, skipped)
+    if failures:
+        sys.exit(1)
+
+
+def report_pwx_cost(args):
+    """Print cost estimates and a parallelization layout for pw.x."""
+    pwig = PwxInputGenerator(
+        crystal_structure=args.crystal_structure,
+        calculation_presets=args.calculation_presets,
+        custom_sett_file=args.custom_settings_file,
+        custom_sett_dict=args.custom_settings_dict,
+        specify_potentials=args.specify_potentials,
+        pwx_input_file=args.pwx_input_file,
+        reduce_structure=args.reduce_structure,
+    )
+    if args.reduce_structure:
+        _report_reduction(pwig)
+    cost = estimate_pwx_cost(pwig, valence_electrons=args.valence_electrons)
+    layout = recommend_pwx_layout(
+        cost,
+        args.cores_per_node,
+        num_nodes=args.num_nodes,
+        memory_per_node=args.memory_per_node,
+        pwx_input_file=pwig.pwx_input_file,
+    )
+    if args.as_json:
+        report = json.dumps({"cost": cost, "layout": layout}, indent=2)
+    else:
+        report = format_pwx_cost_report(cost, layout=layout)
+    sys.stdout.write("{}\n".format(report))
 
 
 def run_demo(*sys_args):
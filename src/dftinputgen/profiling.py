@@ -0,0 +1,97 @@
+import json
+import time
+import functools
+import contextlib
+
+
+__all__ = ["TimingStats", "timed", "timer"]
+
+
+# wall-clock timer with the best available resolution
+_clock = getattr(time, "perf_counter", time.time)
+
+
+class TimingStats(object):
+    """Wall time and number of calls, per stage of input generation.
+
+    Times are inclusive: the time recorded for a stage includes the time
+    spent in any other (nested) stages it calls, e.g. the time to match
+    pseudopotentials is also part of the time to render the ATOMIC_SPECIES
+    card.
+    """
+
+    def __init__(self):
+        self._stats = {}
+
+    def record(self, stage, wall_time, calls=1):
+        """Add `calls` calls taking `wall_time` seconds in total to `stage`."""
+        stats = self._stats.setdefault(stage, {"calls": 0, "wall_time": 0.0})
+        stats["calls"] += calls
+        stats["wall_time"] += wall_time
+
+    @contextlib.contextmanager
+    def timer(self, stage):
+        """Context manager that records the time spent in its body."""
+        start = _clock()
+        try:
+            yield
+        finally:
+            self.record(stage, _clock() - start)
+
+    def merge(self, other):
+        """Add stats from another :class:`TimingStats` object or its dict."""
+        if isinstance(other, TimingStats):
+            other = other.as_dict()
+        for stage, stats in other.items():
+            self.record(stage, stats["wall_time"], calls=stats["calls"])
+
+    def reset(self):
+        """Discard all recorded stats."""
+        self._stats = {}
+
+    def as_dict(self):
+        """Dictionary of stage: {"calls": int, "wall_time": float}."""
+        return {stage: dict(stats) for stage, stats in self._stats.items()}
+
+    def to_json(self, **kwargs):
+        """Stats as a JSON string (`kwargs` are passed to `json.dumps`)."""
+        kwargs.setdefault("sort_keys", True)
+        return json.dumps(self.as_dict(), **kwargs)
+
+    def __contains__(self, stage):
+        return stage in self._stats
+
+    def __repr__(self):
+        return "{}({!r})".format(type(self).__name__, self._stats)
+
+
+@contextlib.contextmanager
+def timer(timing_stats, stage):
+    """Record time spent in the body in `timing_stats` (if not None)."""
+    if timing_stats is None:
+        yield
+        return
+    with timing_stats.timer(stage):
+        yield
+
+
+def timed(stage):
+    """Decorator to record the time spent in a method as `stage`.
+
+    Time is recorded in the `timing_stats` of the instance the method is
+    called on; if it is None (profiling is disabled, the default), the
+    method is called as is.
+    """
+
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            timing_stats = self.timing_stats
+            if timing_stats is None:
+                return method(self, *args, **kwargs)
+            with timing_stats.timer(stage):
+                return method(self, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
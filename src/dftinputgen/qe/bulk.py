@@ -0,0 +1,815 @@
+import os
+import six
+import json
+import time
+import itertools
+import collections
+import multiprocessing
+from concurrent import futures
+
+from ase.io.formats import string2index
+
+from dftinputgen.cache import InputCacheManifest
+from dftinputgen.archive import ShardedArchiveWriter
+from dftinputgen.profiling import timer
+from dftinputgen.profiling import TimingStats
+from dftinputgen.utils import read_crystal_structure
+from dftinputgen.utils import iread_crystal_structures
+from dftinputgen.utils import crystal_structure_from_dict
+from dftinputgen.qe.pwx import PwxInputGenerator
+from dftinputgen.qe.pwx import PwxInputGeneratorError
+
+
+__all__ = [
+    "write_pwx_input_files",
+    "write_pwx_input_files_from_frames",
+    "write_pwx_input_files_from_manifest",
+]
+
+
+_clock = getattr(time, "perf_counter", time.time)
+
+
+def _get_default_names(crystal_structures):
+    """Zero-padded indices, e.g. ["00", "01", ..., "10"] for 11 structures."""
+    width = len(str(max(len(crystal_structures) - 1, 0)))
+    return ["{:0{}d}".format(i, width) for i in range(len(crystal_structures))]
+
+
+def _check_name(name):
+    """Raise a ValueError unless `name` is a plain subdirectory name."""
+    if not isinstance(name, six.string_types) or name in ["", ".", ".."]:
+        raise ValueError('Invalid name "{}"'.format(name))
+    if "/" in name or os.sep in name:
+        msg = 'Name "{}" contains a path separator'.format(name)
+        raise ValueError(msg)
+
+
+def _write_file(filename, contents):
+    """Write `contents` into `filename`, creating directories as needed.
+
+    Returns the error raised, if any, and the wall time taken.
+    """
+    start = _clock()
+    try:
+        location = os.path.dirname(filename)
+        if not os.path.isdir(location):
+            os.makedirs(location)
+        with open(filename, "w") as fw:
+            fw.write(contents)
+    except Exception as err:
+        return err, _clock() - start
+    return None, _clock() - start
+
+
+class _FileWriter(object):
+    """Write files synchronously, or in the background in a thread pool.
+
+    With `num_threads` I/O threads, file creation and writing (dominated by
+    metadata operations on parallel filesystems) overlaps with rendering of
+    the next inputs. At most two writes per thread are pending at any time:
+    submitting more blocks until the oldest pending write completes, so that
+    memory use by rendered but not yet written inputs stays bounded.
+
+    `on_done(key, error, wall_time)` is called for every write, in order of
+    submission, in the thread that submits writes.
+    """
+
+    def __init__(self, on_done, num_threads=None):
+        self._on_done = on_done
+        self._executor = None
+        if num_threads:
+            self._executor = futures.ThreadPoolExecutor(num_threads)
+        self._max_pending = 2 * (num_threads or 0)
+        self._pending = collections.deque()
+
+    def submit(self, key, filename, contents):
+        if self._executor is None:
+            self._on_done(key, *_write_file(filename, contents))
+            return
+        future = self._executor.submit(_write_file, filename, contents)
+        self._pending.append((key, future))
+        if len(self._pending) >= self._max_pending:
+            self._complete_oldest()
+
+    def _complete_oldest(self):
+        key, future = self._pending.popleft()
+        self._on_done(key, *future.result())
+
+    def close(self):
+        """Wait for all pending writes to complete."""
+        while self._pending:
+            self._complete_oldest()
+        if self._executor is not None:
+            self._executor.shutdown()
+
+
+def _get_settings_key(custom_sett_dict):
+    """Hashable key for a dictionary of (JSON-serializable) settings."""
+    if not custom_sett_dict:
+        return None
+    return json.dumps(custom_sett_dict, sort_keys=True, default=repr)
+
+
+def _write_pwx_input_chunk(
+    chunk,
+    write_location,
+    generator_kwargs,
+    manifest_entries=None,
+    io_threads=None,
+    archive=False,
+):
+    """Write pw.x input files for a chunk of (name, crystal structure) pairs.
+
+    Items in the chunk can also be (name, crystal structure, custom settings)
+    triples, with custom settings (a dictionary) to use for that item on top
+    of the `custom_sett_dict` in `generator_kwargs`. One batch generator is
+    used per distinct set of custom settings in the chunk. Crystal
+    structures can be paths to files, `ase.Atoms` objects, dictionaries of
+    inline arrays (see `crystal_structure_from_dict`), or exceptions (e.g.
+    for invalid items in a manifest) to report as failures.
+
+    If `manifest_entries` (input cache manifest entries for the items in the
+    chunk) are specified, up-to-date input files are not rewritten. With
+    `io_threads`, files are written in the background (see `_FileWriter`).
+    With `archive`, input files are rendered but not written; they are
+    returned instead, to be added to archives by the caller.
+
+    Returns a dictionary with the number of items in the chunk
+    ("num_items"), a list of (name, error message) for items that failed
+    ("failures"), a list of names of items skipped because their input
+    files are up-to-date or exist ("skipped"), manifest entries recorded for
+    the files written ("manifest_entries"), timing stats (empty, unless
+    `profile` is set in `generator_kwargs`; "timing_stats"), and a list of
+    (archive member name, pw.x input) for the rendered input files
+    ("rendered"; empty, unless `archive`).
+    """
+    failures = {}
+    skipped = set()
+    recorded = {}
+    rendered = []
+    timing_stats = None
+    if generator_kwargs.get("profile"):
+        timing_stats = TimingStats()
+    manifest = None
+    if manifest_entries is not None:
+        manifest = InputCacheManifest(write_location, entries=manifest_entries)
+
+    # failures and skipped items are keyed by their position in the chunk:
+    # invalid manifest items can share the name of another item
+    def _fail(position, err):
+        failures[position] = "{}: {}".format(type(err).__name__, err)
+
+    # 1. read all crystal structures in the chunk, grouped by custom settings
+    groups = collections.OrderedDict()
+    for position, item in enumerate(chunk):
+        name, crystal_structure = item[:2]
+        custom_sett_dict = item[2] if len(item) > 2 else None
+        try:
+            if isinstance(crystal_structure, Exception):
+                raise crystal_structure
+            if isinstance(crystal_structure, six.string_types):
+                with timer(timing_stats, "read_crystal_structure"):
+                    crystal_structure = read_crystal_structure(
+                        crystal_structure
+                    )
+            elif isinstance(crystal_structure, dict):
+                crystal_structure = crystal_structure_from_dict(
+                    crystal_structure
+                )
+            key = _get_settings_key(custom_sett_dict)
+            group = groups.setdefault(key, (custom_sett_dict, []))
+            group[1].append((position, name, crystal_structure))
+        except Exception as err:
+            _fail(position, err)
+
+    def _on_written(key, err, wall_time):
+        position, relpath, input_hash = key
+        if timing_stats is not None:
+            timing_stats.record("write_pwx_input", wall_time)
+        if err is not None:
+            _fail(position, err)
+        elif manifest is not None:
+            recorded[relpath] = manifest.record(relpath, input_hash)
+
+    writer = _FileWriter(_on_written, num_threads=io_threads)
+    for custom_sett_dict, items in groups.values():
+        kwargs = generator_kwargs
+        if custom_sett_dict:
+            base_sett_dict = generator_kwargs.get("custom_sett_dict") or {}
+            kwargs = dict(
+                generator_kwargs,
+                custom_sett_dict=dict(base_sett_dict, **custom_sett_dict),
+            )
+
+        # 2. per group, one batch generator (from the first structure it
+        # can be set up with; items it fails for fail on their own), and
+        # k-point grids for all structures in the group at once
+        pwig = None
+        while items and pwig is None:
+            position, _, crystal_structure = items[0]
+            try:
+                pwig = PwxInputGenerator(
+                    crystal_structure=crystal_structure, **kwargs
+                )._get_batch_generator()
+            except Exception as err:
+                _fail(position, err)
+                items = items[1:]
+        if pwig is None:
+            continue
+        try:
+            kpoint_grids = pwig._get_batch_kpoint_grids([i[2] for i in items])
+        except Exception:
+            # errors are raised again (per item) when rendering
+            kpoint_grids = [None] * len(items)
+
+        # 3. render input files one at a time (unless up-to-date), and write
+        for item, kpoint_grid in zip(items, kpoint_grids):
+            position, name, crystal_structure = item
+            input_hash = None
+            try:
+                relpath = os.path.join(name, pwig.pwx_input_file)
+                filename = os.path.join(write_location, relpath)
+                if not archive and not pwig.overwrite_files:
+                    if os.path.exists(filename):
+                        skipped.add(position)
+                        continue
+                if manifest is not None:
+                    pwig._set_batch_structure(crystal_structure)
+                    input_hash = pwig.input_hash
+                    if manifest.is_unchanged(relpath, input_hash):
+                        skipped.add(position)
+                        continue
+                pwx_input = pwig._generate_batch_item(
+                    crystal_structure, kpoint_grid=kpoint_grid
+                )
+                if pwx_input.strip() == "":
+                    msg = "Nothing to write. No input settings found?"
+                    raise PwxInputGeneratorError(msg)
+                if archive:
+                    member_name = "{}/{}".format(name, pwig.pwx_input_file)
+                    rendered.append((member_name, pwx_input))
+                else:
+                    writer.submit(
+                        (position, relpath, input_hash), filename, pwx_input
+                    )
+            except Exception as err:
+                _fail(position, err)
+        if timing_stats is not None:
+            timing_stats.merge(pwig.timing_stats)
+    writer.close()
+    return {
+        "num_items": len(chunk),
+        "failures": [
+            (item[0], failures[i])
+            for i, item in enumerate(chunk)
+            if i in failures
+        ],
+        "skipped": [item[0] for i, item in enumerate(chunk) if i in skipped],
+        "manifest_entries": recorded,
+        "timing_stats": {} if timing_stats is None else timing_stats.as_dict(),
+        "rendered": rendered,
+    }
+
+
+def _group_entries_by_name(entries):
+    """Group manifest entries by the name of their subdirectory."""
+    grouped = collections.defaultdict(dict)
+    for relpath, entry in entries.items():
+        grouped[relpath.split(os.sep, 1)[0]][relpath] = entry
+    return grouped
+
+
+def _iter_chunks(items, chunk_size):
+    """Lazily split an iterable into lists of (up to) `chunk_size` items."""
+    items = iter(items)
+    while True:
+        chunk = list(itertools.islice(items, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _write_chunks(
+    chunks,
+    write_location,
+    num_workers,
+    generator_kwargs,
+    timing_stats=None,
+    io_threads=None,
+    archive_format=None,
+    shard_size=None,
+    progress=None,
+    skipped=None,
+):
+    """Write chunks of input files serially, or in a pool of processes.
+
+    Chunks are consumed lazily: at most two chunks per worker are in flight
+    at any time, so that memory use does not grow with the number of
+    chunks. Failures are returned in input order.
+
+    With `use_input_cache`, every chunk is handed the manifest entries for
+    its items, and the entries recorded by the workers are saved to the
+    manifest in `write_location` once all chunks are written.
+
+    If `timing_stats` is specified, the timing stats of all workers are
+    added to it. Every worker writes files using `io_threads` threads.
+
+    If an `archive_format` is specified, input files are rendered in the
+    workers, and added to archives (of `shard_size` files each) in this
+    process, in input order.
+
+    If specified, `progress(num_done, num_failed)` is called with the
+    number of items processed so far, and the number of them that failed,
+    as every chunk completes.
+
+    If `skipped` (a list) is specified, the names of items skipped because
+    their input files are up-to-date or exist are added to it.
+    """
+    archive_writer = None
+    if archive_format is not None:
+        if generator_kwargs.get("use_input_cache"):
+            msg = "Input cache is not supported for archive output"
+            raise PwxInputGeneratorError(msg)
+        overwrite_files = generator_kwargs.get("overwrite_files")
+        archive_writer = ShardedArchiveWriter(
+            write_location,
+            archive_format=archive_format,
+            shard_size=shard_size,
+            prefix="pwx_inputs",
+            overwrite_files=overwrite_files is not False,
+        )
+    if timing_stats is not None:
+        generator_kwargs = dict(generator_kwargs, profile=True)
+    manifest = None
+    if generator_kwargs.get("use_input_cache"):
+        manifest = InputCacheManifest(write_location)
+        entries_by_name = _group_entries_by_name(manifest.entries)
+
+    def _tasks():
+        for chunk in chunks:
+            entries = None
+            if manifest is not None:
+                entries = {}
+                for item in chunk:
+                    entries.update(entries_by_name.get(item[0], {}))
+            yield (
+                chunk,
+                write_location,
+                generator_kwargs,
+                entries,
+                io_threads,
+                archive_writer is not None,
+            )
+
+    failures = []
+    recorded = {}
+    num_done = [0]
+
+    def _collect(result):
+        failures.extend(result["failures"])
+        if skipped is not None:
+            skipped.extend(result["skipped"])
+        recorded.update(result["manifest_entries"])
+        if timing_stats is not None:
+            timing_stats.merge(result["timing_stats"])
+        for member_name, pwx_input in result["rendered"]:
+            with timer(timing_stats, "write_archive"):
+                archive_writer.add(member_name, pwx_input)
+        num_done[0] += result["num_items"]
+        if progress is not None:
+            progress(num_done[0], len(failures))
+
+    try:
+        if num_workers == 1:
+            for task in _tasks():
+                _collect(_write_pwx_input_chunk(*task))
+        else:
+            if num_workers is None:
+                num_workers = multiprocessing.cpu_count()
+            pending = collections.deque()
+            with futures.ProcessPoolExecutor(num_workers) as executor:
+                for task in _tasks():
+                    pending.append(
+                        executor.submit(_write_pwx_input_chunk, *task)
+                    )
+                    if len(pending) >= 2 * num_workers:
+                        _collect(pending.popleft().result())
+                while pending:
+                    _collect(pending.popleft().result())
+    finally:
+        if archive_writer is not None:
+            archive_writer.close()
+    if manifest is not None:
+        manifest.update(recorded)
+        manifest.save()
+    return failures
+
+
+def write_pwx_input_files(
+    crystal_structures,
+    names=None,
+    write_location=None,
+    num_workers=None,
+    chunk_size=None,
+    timing_stats=None,
+    io_threads=None,
+    archive_format=None,
+    shard_size=None,
+    progress=None,
+    skipped=None,
+    **kwargs
+):
+    """Write pw.x input files for many crystal structures in parallel.
+
+    Crystal structures are split into chunks of `chunk_size` and the chunks
+    are distributed over a pool of `num_workers` processes. Within each
+    chunk, a single batch generator is used (see
+    :meth:`PwxInputGenerator.generate_many
+    <dftinputgen.qe.pwx.PwxInputGenerator.generate_many>`), so that
+    structure-independent settings are resolved once per chunk.
+
+    The input file for the i-th crystal structure is written to
+    "`write_location`/`names[i]`/`pwx_input_file`".
+
+    Existing input files are left untouched if `overwrite_files` is False.
+    With `use_input_cache`, only input files whose inputs have changed since
+    they were last written are rewritten; a single manifest of input hashes
+    for all files is kept in `write_location`.
+
+    A failure for any structure (e.g. an unreadable structure file or a
+    missing pseudopotential) does not abort the batch; failures are
+    collected and returned instead.
+
+    Parameters
+    ----------
+    crystal_structures: list of :class:`ase.Atoms` objects or str
+        Crystal structures (:class:`ase.Atoms` or :class:`ArrayStructure
+        <dftinputgen.structure.ArrayStructure>` objects), or paths to
+        crystal structure files (read in the worker processes using
+        :func:`read_crystal_structure
+        <dftinputgen.utils.read_crystal_structure>`).
+
+    names: list of str, optional
+        Unique names of the subdirectories of `write_location` to write the
+        input file for each crystal structure in (without path separators).
+
+        Default: zero-padded indices of the structures, e.g. "000", "001".
+
+    write_location: str, optional
+        Path to the directory in which to write the input files.
+
+        Default: current working directory.
+
+    num_workers: int, optional
+        Number of worker processes. If set to 1, all input files are written
+        serially in the current process.
+
+        Default: number of processors on the machine.
+
+    chunk_size: int, optional
+        Number of crystal structures handed to a worker at a time.
+
+        Default: 100
+
+    timing_stats: :class:`dftinputgen.profiling.TimingStats`, optional
+        If specified, the wall time and number of calls per stage of input
+        generation in all worker processes (including reading crystal
+        structures, "read_crystal_structure") are recorded in it.
+
+    io_threads: int, optional
+        Number of threads (per worker process) to write files with in the
+        background, overlapping file creation and writing with rendering of
+        the next input files. Useful on filesystems with slow metadata
+        operations (e.g. Lustre, GPFS). At most two files per thread are
+        pending at any time. If not specified, files are written one at a
+        time as they are rendered.
+
+    archive_format: str, optional
+        Instead of one file per crystal structure, write all input files as
+        members "`names[i]`/`pwx_input_file`" of a series of archives in
+        `write_location`: "pwx_inputs_00000.tar", "pwx_inputs_00001.tar",
+        etc., along with an index of all members in "pwx_inputs_index.json"
+        (see :class:`ShardedArchiveWriter
+        <dftinputgen.archive.ShardedArchiveWriter>`). Input files are
+        rendered in the worker processes, and added to archives in the
+        current process, in input order.
+
+        One of "tar", "tar.gz", "tar.bz2", "tar.xz" (Python 3 only),
+        "tar.zst" (requires the `zstandard` package) or "zip". Cannot be
+        combined with `use_input_cache`.
+
+    shard_size: int, optional
+        Maximum number of input files per archive.
+
+        Default: 10000
+
+    progress: callable, optional
+        Function called as `progress(num_done, num_failed)` every time a
+        chunk of crystal structures is processed, with the number of
+        structures processed so far, and the number of them that failed.
+
+    skipped: list, optional
+        If specified, the names of crystal structures for which input files
+        were not written because they are up-to-date (see `use_input_cache`)
+        or exist (see `overwrite_files`) are appended to it, in input order.
+
+    **kwargs:
+        Other arguments passed on to the :class:`PwxInputGenerator
+        <dftinputgen.qe.pwx.PwxInputGenerator>` constructor (e.g.
+        `calculation_presets`, `custom_sett_dict`, `pwx_input_file`,
+        `overwrite_files`, `use_input_cache`).
+
+    Returns
+    -------
+    List of (name, error message) tuples for crystal structures for which
+    input files could not be written, in input order.
+
+    """
+    crystal_structures = list(crystal_structures)
+    if names is None:
+        names = _get_default_names(crystal_structures)
+    names = list(names)
+    if len(names) != len(crystal_structures):
+        msg = "Expected {} names; found {}".format(
+            len(crystal_structures), len(names)
+        )
+        raise PwxInputGeneratorError(msg)
+    if len(set(names)) != len(names):
+        msg = "Names of the input files locations must be unique"
+        raise PwxInputGeneratorError(msg)
+    for name in names:
+        # names are subdirectories of `write_location`, not paths
+        try:
+            _check_name(name)
+        except ValueError as err:
+            raise PwxInputGeneratorError(str(err))
+    if write_location is None:
+        write_location = os.getcwd()
+    if chunk_size is None:
+        chunk_size = 100
+
+    chunks = _iter_chunks(zip(names, crystal_structures), chunk_size)
+    return _write_chunks(
+        chunks,
+        write_location,
+        num_workers,
+        kwargs,
+        timing_stats=timing_stats,
+        io_threads=io_threads,
+        archive_format=archive_format,
+        shard_size=shard_size,
+        progress=progress,
+        skipped=skipped,
+    )
+
+
+def _iter_frame_indices(crystal_structures, index, read_kwargs):
+    """Indices in the file of the frames selected by `index`.
+
+    Negative start/stop/step (e.g. "-10:") are resolved using the number of
+    frames in the file, which is then read once more to count them.
+    """
+    if isinstance(index, six.string_types):
+        index = string2index(index)
+    if isinstance(index, int):
+        index = slice(index, index + 1 or None)
+    bounds = [index.start, index.stop, index.step]
+    if all(b is None or b >= 0 for b in bounds):
+        return itertools.count(index.start or 0, index.step or 1)
+    num_frames = sum(
+        1
+        for _ in iread_crystal_structures(
+            crystal_structures, index=":", **read_kwargs
+        )
+    )
+    return iter(range(*index.indices(num_frames)))
+
+
+def write_pwx_input_files_from_frames(
+    crystal_structures,
+    index=":",
+    read_kwargs=None,
+    name_format="{:06d}",
+    write_location=None,
+    num_workers=None,
+    chunk_size=None,
+    timing_stats=None,
+    io_threads=None,
+    archive_format=None,
+    shard_size=None,
+    progress=None,
+    skipped=None,
+    **kwargs
+):
+    """Write a pw.x input file for every frame in a multi-frame file.
+
+    Frames are read lazily, one at a time (see
+    :func:`iread_crystal_structures
+    <dftinputgen.utils.iread_crystal_structures>`), and are written in
+    chunks as in :func:`write_pwx_input_files`. Only a few chunks are held
+    in memory at any time, so that trajectories of any size can be
+    processed with constant memory.
+
+    The input file for the frame with index i in the file is written to
+    "`write_location`/`name_format.format(i)`/`pwx_input_file`", e.g. to
+    "000010", "000020", ... for `index` "10:100:10".
+
+    Parameters
+    ----------
+    crystal_structures: str
+        Path to a multi-frame crystal structure file, e.g. an extxyz file,
+        an ASE trajectory or an ASE database.
+
+    index: str or int, optional
+        Frame(s) to read, e.g. "10:100:10" (see `ase.io.iread`).
+
+        Default: ":" (all frames)
+
+    read_kwargs: dict, optional
+        Other arguments passed on to `ase.io.iread`, e.g. `format`.
+
+    name_format: str, optional
+        Format of the subdirectory names, given the index of the frame in
+        the file.
+
+        Default: "{:06d}", i.e. "000000", "000001", ...
+
+    write_location, num_workers, chunk_size, timing_stats, io_threads,
+    archive_format, shard_size, progress, skipped, **kwargs:
+        Same as in :func:`write_pwx_input_files`.
+
+    Returns
+    -------
+    List of (name, error message) tuples for frames for which input files
+    could not be written, in input order.
+
+    """
+    read_kwargs = read_kwargs or {}
+    frames = iread_crystal_structures(
+        crystal_structures, index=index, **read_kwargs
+    )
+    names = (
+        name_format.format(i)
+        for i in _iter_frame_indices(crystal_structures, index, read_kwargs)
+    )
+    if write_location is None:
+        write_location = os.getcwd()
+    if chunk_size is None:
+        chunk_size = 100
+    chunks = _iter_chunks(six.moves.zip(names, frames), chunk_size)
+    return _write_chunks(
+        chunks,
+        write_location,
+        num_workers,
+        kwargs,
+        timing_stats=timing_stats,
+        io_threads=io_threads,
+        archive_format=archive_format,
+        shard_size=shard_size,
+        progress=progress,
+        skipped=skipped,
+    )
+
+
+_MANIFEST_ITEM_KEYS = ["name", "crystal_structure", "custom_sett_dict"]
+
+
+def _parse_manifest_item(line, manifest_dir):
+    """(name, crystal structure, custom settings) from a line of a manifest."""
+    item = json.loads(line)
+    if not isinstance(item, dict):
+        msg = "Expected a JSON object; found {}".format(type(item).__name__)
+        raise ValueError(msg)
+    unknown = set(item) - set(_MANIFEST_ITEM_KEYS)
+    if unknown:
+        msg = "Unknown manifest keys: {}".format(sorted(unknown))
+        raise ValueError(msg)
+    name = item.get("name")
+    if name is not None:
+        _check_name(name)
+    crystal_structure = item.get("crystal_structure")
+    if isinstance(crystal_structure, six.string_types):
+        # relative paths are relative to the manifest file
+        crystal_structure = os.path.join(manifest_dir, crystal_structure)
+    elif not isinstance(crystal_structure, dict):
+        msg = (
+            'Expected "crystal_structure" to be a path to a crystal structure'
+            " file, or a dictionary of arrays"
+        )
+        raise ValueError(msg)
+    custom_sett_dict = item.get("custom_sett_dict")
+    if custom_sett_dict is not None and not isinstance(custom_sett_dict, dict):
+        msg = 'Expected "custom_sett_dict" to be a dictionary'
+        raise ValueError(msg)
+    return name, crystal_structure, custom_sett_dict
+
+
+def _iter_manifest_items(manifest_file, name_format):
+    """Lazily iterate over (name, crystal structure, custom settings).
+
+    Invalid items are yielded with the error in place of the structure, so
+    that they are reported as failures (with their default name).
+    """
+    manifest_dir = os.path.dirname(os.path.abspath(manifest_file))
+    names = set()
+    index = 0
+    with open(manifest_file, "r") as fr:
+        for line in fr:
+            if not line.strip():
+                continue
+            default_name = name_format.format(index)
+            index += 1
+            try:
+                item = _parse_manifest_item(line, manifest_dir)
+                name = default_name if item[0] is None else item[0]
+                if name in names:
+                    raise ValueError('Duplicate name "{}"'.format(name))
+                names.add(name)
+                item = (name,) + item[1:]
+            except Exception as err:
+                # reported under the default name, which may be taken
+                item = (default_name, err, None)
+            yield item
+
+
+def write_pwx_input_files_from_manifest(
+    manifest_file,
+    name_format="{:06d}",
+    write_location=None,
+    num_workers=None,
+    chunk_size=None,
+    timing_stats=None,
+    io_threads=None,
+    archive_format=None,
+    shard_size=None,
+    progress=None,
+    skipped=None,
+    **kwargs
+):
+    """Write pw.x input files for all items in a JSON-lines manifest file.
+
+    Every (non-blank) line of the manifest is a JSON object with:
+
+    - "crystal_structure": path to a crystal structure file (relative to
+      the directory of the manifest file), or a dictionary of arrays (see
+      :func:`crystal_structure_from_dict
+      <dftinputgen.utils.crystal_structure_from_dict>`)
+    - "custom_sett_dict" (optional): custom settings to use for this item,
+      on top of (and overriding) the `custom_sett_dict` specified
+    - "name" (optional): unique name of the subdirectory of
+      `write_location` to write the input file in
+
+    For example::
+
+        {"name": "feo", "crystal_structure": "feo_conv.vasp"}
+        {"crystal_structure": "al.vasp", "custom_sett_dict": {"ecutwfc": 40}}
+
+    The manifest is read lazily, and
+    items are written in chunks as in :func:`write_pwx_input_files`, so that
+    manifests of any size can be processed with constant memory. Items
+    with the same custom settings in a chunk share a batch generator.
+
+    Invalid items (e.g. malformed JSON or duplicate names) do not abort
+    the batch; they are reported as failures along with items for which
+    input files could not be written.
+
+    Parameters
+    ----------
+    manifest_file: str
+        Path to the JSON-lines manifest file.
+
+    name_format: str, optional
+        Format of the names of items without a "name", given the index of
+        the item in the manifest.
+
+        Default: "{:06d}", i.e. "000000", "000001", ...
+
+    write_location, num_workers, chunk_size, timing_stats, io_threads,
+    archive_format, shard_size, progress, skipped, **kwargs:
+        Same as in :func:`write_pwx_input_files`.
+
+    Returns
+    -------
+    List of (name, error message) tuples for items for which input files
+    could not be written, in input order.
+
+    """
+    items = _iter_manifest_items(manifest_file, name_format)
+    if write_location is None:
+        write_location = os.getcwd()
+    if chunk_size is None:
+        chunk_size = 100
+    chunks = _iter_chunks(items, chunk_size)
+    return _write_chunks(
+        chunks,
+        write_location,
+        num_workers,
+        kwargs,
+        timing_stats=timing_stats,
+        io_threads=io_threads,
+        archive_format=archive_format,
+        shard_size=shard_size,
+        progress=progress,
+        skipped=skipped,
+    )
@@ -0,0 +1,190 @@
+import six
+
+from dftinputgen.qe.pwx import PwxInputGenerator
+from dftinputgen.qe.pwx import PwxInputGeneratorError
+
+
+__all__ = ["PwxCalculationChain"]
+
+
+# calculations that converge the charge density self-consistently
+_SCF_CALCULATIONS = ["scf", "relax", "vc-relax", "md", "vc-md"]
+
+# calculations that read a converged charge density from a previous step
+_NSCF_CALCULATIONS = ["nscf", "bands"]
+
+_STEP_KEYS = [
+    "calculation_presets",
+    "custom_sett_dict",
+    "crystal_structure",
+    "pwx_input_file",
+]
+
+
+def _get_step(step):
+    """Step as a dictionary, from a preset name or a dictionary."""
+    if isinstance(step, six.string_types):
+        return {"calculation_presets": step}
+    if not isinstance(step, dict):
+        msg = 'Expected a preset name or a dictionary; found "{}"'.format(
+            type(step)
+        )
+        raise TypeError(msg)
+    unknown_keys = sorted(set(step) - set(_STEP_KEYS))
+    if unknown_keys:
+        msg = "Unknown step keys [{}]; expected any of [{}]".format(
+            ", ".join(unknown_keys), ", ".join(_STEP_KEYS)
+        )
+        raise ValueError(msg)
+    return step
+
+
+class PwxCalculationChain(object):
+    """Sequence of pw.x calculations that reuse each other's data.
+
+    All steps share the same `outdir` and `prefix`, so that every step can
+    read the data saved by the previous ones:
+
+    - self-consistent steps after the first one (e.g. "scf" after "relax")
+      start from the saved wavefunctions and potential (`startingwfc` and
+      `startingpot` set to "file") instead of from scratch,
+    - non-self-consistent steps ("nscf", "bands") read the converged charge
+      density, and must follow a self-consistent step.
+
+    `restart_mode` is set to "from_scratch" in all steps: every step is a
+    new calculation ("restart" is only meant for resuming an interrupted
+    calculation).
+
+    NB: pw.x reads the atomic positions and cell from the input of every
+    step. To continue from a relaxed structure, specify it as the crystal
+    structure of the later steps.
+    """
+
+    def __init__(
+        self,
+        crystal_structure,
+        steps,
+        prefix="pwscf",
+        outdir="./out",
+        custom_sett_dict=None,
+        **kwargs
+    ):
+        """
+        Constructor.
+
+        Parameters
+        ----------
+        crystal_structure: :class:`ase.Atoms` object
+            Crystal structure to use in all steps (unless specified for a
+            step).
+
+        steps: list of str or dict
+            Steps of the chain, in order. Every step is either the name of
+            calculation presets (e.g. "relax", "scf", "nscf", "bands"), or
+            a dictionary with the "calculation_presets", and optionally,
+            "custom_sett_dict" (custom settings for that step only),
+            "crystal_structure" and "pwx_input_file" of the step.
+
+        prefix: str, optional
+            Prefix of the files saved by pw.x, shared by all steps.
+
+            Default: "pwscf"
+
+        outdir: str, optional
+            Directory in which pw.x saves data, shared by all steps.
+
+            Default: "./out"
+
+        custom_sett_dict: dict, optional
+            Custom settings for all steps.
+
+            NB: Settings specified here or for a step OVERRIDE those set by
+            the chain (e.g. `prefix`, `startingwfc`).
+
+        **kwargs:
+            Other arguments of :class:`PwxInputGenerator
+            <dftinputgen.qe.pwx.PwxInputGenerator>` for all steps, e.g.
+            `custom_sett_file`, `specify_potentials` or `write_location`.
+
+        """
+        self._steps = [_get_step(step) for step in steps]
+        if not self._steps:
+            msg = "Expected at least one step"
+            raise ValueError(msg)
+        self._prefix = prefix
+        self._outdir = outdir
+        self._generators = []
+        has_scf = False
+        for i, step in enumerate(self._steps):
+            pwig = self._get_step_generator(
+                i, step, crystal_structure, custom_sett_dict or {}, kwargs
+            )
+            calculation = pwig.calculation_settings.get("calculation", "scf")
+            chain_sett = {
+                "prefix": prefix,
+                "outdir": outdir,
+                "restart_mode": "from_scratch",
+            }
+            if calculation in _NSCF_CALCULATIONS:
+                if not has_scf:
+                    msg = 'Step "{}" requires a preceding scf step'.format(
+                        calculation
+                    )
+                    raise PwxInputGeneratorError(msg)
+            elif i > 0:
+                chain_sett.update(
+                    {"startingwfc": "file", "startingpot": "file"}
+                )
+            has_scf = has_scf or calculation in _SCF_CALCULATIONS
+            chain_sett.update(pwig.custom_sett_dict)
+            pwig.custom_sett_dict = chain_sett
+            self._generators.append(pwig)
+
+    @staticmethod
+    def _get_step_generator(
+        index, step, crystal_structure, custom_sett_dict, kwargs
+    ):
+        """Input generator for a step (without the chain settings)."""
+        presets = step.get("calculation_presets")
+        pwx_input_file = step.get("pwx_input_file")
+        if pwx_input_file is None:
+            pwx_input_file = "{:02d}_{}.in".format(index + 1, presets or "pwx")
+        custom_sett_dict = dict(
+            custom_sett_dict, **step.get("custom_sett_dict", {})
+        )
+        return PwxInputGenerator(
+            crystal_structure=step.get("crystal_structure", crystal_structure),
+            calculation_presets=presets,
+            custom_sett_dict=custom_sett_dict,
+            pwx_input_file=pwx_input_file,
+            **kwargs
+        )
+
+    @property
+    def prefix(self):
+        """Prefix of the files saved by pw.x, shared by all steps."""
+        return self._prefix
+
+    @property
+    def outdir(self):
+        """Directory in which pw.x saves data, shared by all steps."""
+        return self._outdir
+
+    @property
+    def generators(self):
+        """Input generators of all steps, in order."""
+        return list(self._generators)
+
+    @property
+    def pwx_input_files(self):
+        """Names of the pw.x input files of all steps, in order."""
+        return [pwig.pwx_input_file for pwig in self._generators]
+
+    def write_input_files(self):
+        """Write the pw.x input files of all steps.
+
+        Returns a list with True for every input file written, and False
+        for every input file left untouched (see `overwrite_files` and
+        `use_input_cache` of the input generators).
+        """
+        return [pwig.write_input_files() for pwig in self._generators]
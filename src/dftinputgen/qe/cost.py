@@ -0,0 +1,448 @@
+import os
+import re
+import math
+import collections
+
+import numpy as np
+from ase.units import Bohr
+from ase.data import atomic_numbers
+
+from dftinputgen.utils import get_elem_symbol
+from dftinputgen.qe.fft import PWX_FFT_GRID_TAGS
+from dftinputgen.qe.fft import get_fft_grid
+from dftinputgen.qe.pwx import PwxInputGeneratorError
+
+
+__all__ = [
+    "estimate_pwx_cost",
+    "recommend_pwx_layout",
+    "format_pwx_cost_report",
+]
+
+
+_NOBLE_GAS_ATOMIC_NUMBERS = [0, 2, 10, 18, 36, 54, 86, 118]
+
+# "Z valence" in the header of UPF v1 files, `z_valence` attribute in v2
+_Z_VALENCE_RE = re.compile(
+    r'z_valence\s*=\s*"\s*([-+0-9.eEdD]+)\s*"'
+    r"|^\s*([-+0-9.eEdD]+)\s+Z\s+valence",
+    re.IGNORECASE | re.MULTILINE,
+)
+
+# bytes per complex/real double precision number
+_COMPLEX_SIZE = 16
+_REAL_SIZE = 8
+
+# memory used by every process regardless of the system (code, buffers)
+_PROCESS_OVERHEAD = 100 * 1024 ** 2
+
+
+def _read_z_valence(pseudo_file):
+    """Number of valence electrons from the header of a UPF file."""
+    with open(pseudo_file, "r") as fr:
+        header = fr.read(65536)
+    match = _Z_VALENCE_RE.search(header)
+    if not match:
+        return None
+    z_valence = match.group(1) or match.group(2)
+    return float(z_valence.lower().replace("d", "e"))
+
+
+def _estimate_z_valence(species):
+    """Electrons outside the nearest noble gas core (a rough estimate)."""
+    z = atomic_numbers[get_elem_symbol(species)]
+    core = max(zc for zc in _NOBLE_GAS_ATOMIC_NUMBERS if zc < z)
+    return float(z - core)
+
+
+def _get_valence_electrons(pwig, species, valence_electrons=None):
+    """Valence electrons and where the number came from, per species."""
+    z_valence = {}
+    sources = {}
+    pseudo_names = {}
+    if pwig.specify_potentials:
+        try:
+            pseudo_names = pwig._get_pseudo_names()
+        except Exception:
+            pass
+    pseudo_dir = pwig.calculation_settings.get("pseudo_dir") or ""
+    for sp in species:
+        if valence_electrons and sp in valence_electrons:
+            z_valence[sp] = float(valence_electrons[sp])
+            sources[sp] = "input"
+            continue
+        if pseudo_names.get(sp):
+            path = os.path.join(
+                os.path.expanduser(pseudo_dir), pseudo_names[sp]
+            )
+            try:
+                z_valence[sp] = _read_z_valence(path)
+            except (IOError, OSError, ValueError):
+                z_valence[sp] = None
+            if z_valence[sp] is not None:
+                sources[sp] = "pseudopotential"
+                continue
+        z_valence[sp] = _estimate_z_valence(sp)
+        sources[sp] = "estimate"
+    return z_valence, sources
+
+
+def _get_num_bands(settings, num_electrons, noncolin):
+    """Number of bands pw.x uses by default (unless `nbnd` is set)."""
+    if settings.get("nbnd"):
+        return int(settings["nbnd"])
+    num_states = num_electrons if noncolin else num_electrons / 2.0
+    if settings.get("occupations") in ["smearing", "tetrahedra"]:
+        return int(max(round(1.2 * num_states), math.ceil(num_states) + 4))
+    return int(max(math.ceil(num_states), 1))
+
+
+def _get_kpoint_grid(pwig):
+    """k-points scheme and grid (as written in the pw.x input)."""
+    scheme, grid = pwig._resolve_kpoints()
+    if scheme == "gamma":
+        return scheme, [1, 1, 1]
+    if scheme != "automatic":
+        msg = 'Unsupported k-points scheme "{}"'.format(scheme)
+        raise PwxInputGeneratorError(msg)
+    return scheme, [int(n) for n in grid]
+
+
+def _get_fft_grids(pwig, cell, ecutwfc, ecutrho):
+    """Dense and smooth FFT grids, as set in the pw.x input (if at all)."""
+    settings = pwig.calculation_settings
+    grids = dict(pwig._get_fft_grids())
+    grids.update((t, settings[t]) for t in PWX_FFT_GRID_TAGS if t in settings)
+    fft_grid = [grids.get(t) for t in PWX_FFT_GRID_TAGS[:3]]
+    if None in fft_grid:
+        fft_grid = get_fft_grid(cell, ecutrho)
+    smooth_fft_grid = [grids.get(t) for t in PWX_FFT_GRID_TAGS[3:]]
+    if None in smooth_fft_grid:
+        smooth_fft_grid = get_fft_grid(cell, min(ecutrho, 4 * ecutwfc))
+    return [int(n) for n in fft_grid], [int(n) for n in smooth_fft_grid]
+
+
+def _get_formula(counts):
+    """Chemical formula, e.g. "Fe2O2", from counts of every species."""
+    return "".join(
+        "{}{}".format(sp, counts[sp] if counts[sp] > 1 else "")
+        for sp in sorted(counts)
+    )
+
+
+def estimate_pwx_cost(pwig, valence_electrons=None):
+    """Estimate the size and cost of the pw.x calculation of a generator.
+
+    All numbers are order-of-magnitude estimates from the crystal structure
+    and the merged `calculation_settings` of the generator:
+
+    - valence electrons from the pseudopotential files (if potentials are
+      specified and found), else the number of electrons outside the
+      nearest noble gas core (pseudopotentials with semicore states have
+      more), unless specified in `valence_electrons`
+    - number of bands as pw.x chooses it by default (20% more than
+      occupied, for smearing), unless `nbnd` is set
+    - number of k-points for the Monkhorst-Pack grid, reduced by time
+      reversal symmetry only (an upper bound; crystal symmetry reduces it
+      further)
+    - number of plane waves (wavefunctions, `ecutwfc`) and G-vectors
+      (density, `ecutrho`, default 4 x `ecutwfc`) from the cell volume
+    - dense (density) and smooth (wavefunctions) FFT grids
+    - memory (in bytes) for wavefunctions of all k-points, the Davidson
+      workspace of one k-point, density/potential arrays and mixing
+      history, and subspace diagonalization, for a single process (see
+      :func:`recommend_pwx_layout` for distribution over processes)
+    - relative cost: floating point operations per SCF iteration (FFTs,
+      orthogonalization and subspace diagonalization) in units of 10^9,
+      only meaningful for comparing calculations with each other
+
+    Parameters
+    ----------
+    pwig: :class:`PwxInputGenerator <dftinputgen.qe.pwx.PwxInputGenerator>`
+        Generator with the crystal structure and settings of the
+        calculation.
+
+    valence_electrons: dict, optional
+        Number of valence electrons per species, overriding any read from
+        pseudopotentials or estimated.
+
+    Returns
+    -------
+    Dictionary with the estimates.
+
+    """
+    settings = pwig.calculation_settings
+    if "ecutwfc" not in settings:
+        msg = "Kinetic energy cutoff (ecutwfc) not specified"
+        raise PwxInputGeneratorError(msg)
+    ecutwfc = float(settings["ecutwfc"])
+    ecutrho = float(settings.get("ecutrho", 4 * ecutwfc))
+    structure = pwig.crystal_structure
+    counts = collections.Counter(structure.get_chemical_symbols())
+    species = sorted(counts)
+
+    z_valence, sources = _get_valence_electrons(
+        pwig, species, valence_electrons=valence_electrons
+    )
+    num_electrons = sum(z_valence[sp] * counts[sp] for sp in species)
+    num_electrons -= float(settings.get("tot_charge", 0))
+    noncolin = bool(settings.get("noncolin"))
+    nspin = 2 if settings.get("nspin") == 2 and not noncolin else 1
+    npol = 2 if noncolin else 1
+    num_bands = _get_num_bands(settings, num_electrons, noncolin)
+
+    scheme, kpoint_grid = _get_kpoint_grid(pwig)
+    gamma_only = scheme == "gamma"
+    num_kpoints = (int(np.prod(kpoint_grid)) + 1) // 2 * nspin
+
+    cell = np.array(structure.get_cell(), dtype=float)
+    volume = abs(np.linalg.det(cell))
+    volume_bohr = volume / Bohr ** 3
+    num_plane_waves = volume_bohr * ecutwfc ** 1.5 / (6 * math.pi ** 2)
+    num_g_vectors = volume_bohr * ecutrho ** 1.5 / (6 * math.pi ** 2)
+    if gamma_only:
+        # only half of the plane waves are stored for real wavefunctions
+        num_plane_waves /= 2
+    fft_grid, smooth_fft_grid = _get_fft_grids(pwig, cell, ecutwfc, ecutrho)
+    fft_size = int(np.prod(fft_grid))
+    smooth_fft_size = int(np.prod(smooth_fft_grid))
+
+    wfc_size = num_bands * num_plane_waves * npol * _COMPLEX_SIZE
+    mixing_ndim = int(settings.get("mixing_ndim", 8))
+    # density and potentials on the dense grid, and mixing history
+    density_size = 10 * fft_size * _REAL_SIZE
+    mixing_size = 2 * mixing_ndim * num_g_vectors * _COMPLEX_SIZE
+    memory = {
+        "wavefunctions": num_kpoints * wfc_size,
+        "davidson": 6 * wfc_size,
+        "density": nspin * (density_size + mixing_size),
+        "subspace": 3 * (2 * num_bands) ** 2 * _COMPLEX_SIZE,
+    }
+
+    fft_flops = 5 * smooth_fft_size * math.log(max(smooth_fft_size, 2), 2)
+    # H|psi>: two FFTs per band per Davidson iteration (~3 per SCF step)
+    hpsi_flops = 3 * 2 * num_bands * npol * fft_flops
+    # orthogonalization and subspace projections
+    ortho_flops = 3 * 8 * num_bands ** 2 * num_plane_waves * npol
+    # subspace diagonalization
+    diag_flops = 10 * (2 * num_bands) ** 3
+    flops_per_kpoint = hpsi_flops + ortho_flops + diag_flops
+    return {
+        "formula": _get_formula(counts),
+        "num_atoms": len(structure),
+        "volume": float(volume),
+        "valence_electrons": z_valence,
+        "valence_electrons_source": sources,
+        "num_electrons": num_electrons,
+        "nspin": nspin,
+        "npol": npol,
+        "num_bands": num_bands,
+        "kpoint_grid": kpoint_grid,
+        "gamma_only": gamma_only,
+        "num_kpoints": num_kpoints,
+        "num_plane_waves": int(round(num_plane_waves)),
+        "num_g_vectors": int(round(num_g_vectors)),
+        "fft_grid": fft_grid,
+        "smooth_fft_grid": smooth_fft_grid,
+        "memory": {k: int(v) for k, v in memory.items()},
+        "relative_cost": float(num_kpoints * flops_per_kpoint / 1e9),
+    }
+
+
+def _get_divisors(n):
+    return [d for d in range(1, n + 1) if n % d == 0]
+
+
+def _get_num_diag(procs_per_pool, num_bands):
+    """Square number of processes for parallel subspace diagonalization.
+
+    Parallel diagonalization only pays off for large subspaces: use up to
+    one process per ~100 bands along each side of the (square) grid.
+    """
+    side = min(int(math.sqrt(procs_per_pool)), num_bands // 100)
+    return side ** 2 if side > 1 else 1
+
+
+def _get_num_task_groups(procs_per_pool, num_planes):
+    """Task groups needed for FFT planes to be distributed over processes.
+
+    FFTs are distributed by planes of the grid: with more processes in a
+    pool than planes, processes are split into task groups instead.
+    """
+    for num_task_groups in _get_divisors(procs_per_pool):
+        if procs_per_pool // num_task_groups <= num_planes:
+            return num_task_groups
+
+
+def _get_memory_per_process(cost, num_pools, procs_per_pool, num_diag):
+    memory = cost["memory"]
+    kpoints_per_pool = -(-cost["num_kpoints"] // num_pools)
+    wavefunctions = memory["wavefunctions"] * kpoints_per_pool
+    wavefunctions /= cost["num_kpoints"]
+    distributed = wavefunctions + memory["davidson"] + memory["density"]
+    subspace = memory["subspace"] / num_diag
+    return int(distributed / procs_per_pool + subspace + _PROCESS_OVERHEAD)
+
+
+def recommend_pwx_layout(
+    cost,
+    cores_per_node,
+    num_nodes=1,
+    memory_per_node=None,
+    pwx_input_file="pwx.in",
+):
+    """Recommend a parallelization layout for a pw.x calculation.
+
+    k-point parallelization (pools, `-nk`) scales almost perfectly but
+    replicates the density and work arrays in every pool, so the largest
+    number of pools (up to the number of k-points) is chosen for which the
+    estimated memory per process fits in the memory available per core.
+    Within a pool, task groups (`-nt`) are used if there are more
+    processes than FFT planes, and parallel subspace diagonalization
+    (`-nd`) for calculations with many bands.
+
+    Parameters
+    ----------
+    cost: dict
+        Cost estimate from :func:`estimate_pwx_cost`.
+
+    cores_per_node: int
+        Number of cores per node (one MPI process per core).
+
+    num_nodes: int, optional
+        Number of nodes.
+
+        Default: 1
+
+    memory_per_node: float, optional
+        Memory available per node, in GiB. If not specified, memory use is
+        not taken into account.
+
+    pwx_input_file: str, optional
+        Name of the pw.x input file, for the suggested command line.
+
+        Default: "pwx.in"
+
+    Returns
+    -------
+    Dictionary with the number of processes ("num_procs"), pools ("nk"),
+    processes per pool ("procs_per_pool"), diagonalization group size
+    ("nd"), task groups ("nt"), estimated memory per process in bytes
+    ("memory_per_process"), the suggested command line ("command"), and a
+    list of warnings ("warnings").
+
+    """
+    num_procs = int(cores_per_node) * int(num_nodes)
+    if num_procs < 1:
+        msg = "Number of cores and nodes must be positive"
+        raise PwxInputGeneratorError(msg)
+    memory_per_process_available = None
+    if memory_per_node is not None:
+        memory_per_process_available = (
+            memory_per_node * 1024 ** 3 / float(cores_per_node)
+        )
+
+    warnings = []
+    layout = None
+    for num_pools in reversed(_get_divisors(num_procs)):
+        if num_pools > cost["num_kpoints"]:
+            continue
+        procs_per_pool = num_procs // num_pools
+        num_diag = _get_num_diag(procs_per_pool, cost["num_bands"])
+        memory_per_process = _get_memory_per_process(
+            cost, num_pools, procs_per_pool, num_diag
+        )
+        layout = (num_pools, procs_per_pool, num_diag, memory_per_process)
+        if memory_per_process_available is None:
+            break
+        if memory_per_process <= memory_per_process_available:
+            break
+    num_pools, procs_per_pool, num_diag, memory_per_process = layout
+    if memory_per_process_available is not None:
+        if memory_per_process > memory_per_process_available:
+            warnings.append(
+                "Estimated memory per process ({}) exceeds the memory "
+                "available per core ({}): use more nodes".format(
+                    _format_bytes(memory_per_process),
+                    _format_bytes(memory_per_process_available),
+                )
+            )
+    num_task_groups = _get_num_task_groups(procs_per_pool, cost["fft_grid"][2])
+    if procs_per_pool > 4 * cost["fft_grid"][2]:
+        warnings.append(
+            "More processes per pool ({}) than can be used efficiently for "
+            "a {}-plane FFT grid: use fewer nodes".format(
+                procs_per_pool, cost["fft_grid"][2]
+            )
+        )
+    command = "mpirun -np {} pw.x -nk {} -nd {} -nt {} -in {}".format(
+        num_procs, num_pools, num_diag, num_task_groups, pwx_input_file
+    )
+    return {
+        "num_procs": num_procs,
+        "nk": num_pools,
+        "procs_per_pool": procs_per_pool,
+        "nd": num_diag,
+        "nt": num_task_groups,
+        "memory_per_process": memory_per_process,
+        "command": command,
+        "warnings": warnings,
+    }
+
+
+def _format_bytes(num_bytes):
+    for unit in ["B", "KiB", "MiB", "GiB"]:
+        if num_bytes < 1024:
+            return "{:.1f} {}".format(num_bytes, unit)
+        num_bytes /= 1024.0
+    return "{:.1f} TiB".format(num_bytes)
+
+
+def format_pwx_cost_report(cost, layout=None):
+    """Human-readable report of a cost estimate and (optional) layout."""
+    valence = ", ".join(
+        "{} {:g} ({})".format(
+            sp,
+            cost["valence_electrons"][sp],
+            cost["valence_electrons_source"][sp],
+        )
+        for sp in sorted(cost["valence_electrons"])
+    )
+    lines = [
+        "Structure:         {} ({} atoms, {:.2f} A^3)".format(
+            cost["formula"], cost["num_atoms"], cost["volume"]
+        ),
+        "Valence electrons: {:g} [{}]".format(cost["num_electrons"], valence),
+        "Bands:             {} (nspin = {}, npol = {})".format(
+            cost["num_bands"], cost["nspin"], cost["npol"]
+        ),
+        "k-points:          {} grid, <= {} irreducible{}".format(
+            "x".join(str(n) for n in cost["kpoint_grid"]),
+            cost["num_kpoints"],
+            " (gamma only)" if cost["gamma_only"] else "",
+        ),
+        "Plane waves:       {} (wavefunctions), {} (density)".format(
+            cost["num_plane_waves"], cost["num_g_vectors"]
+        ),
+        "FFT grids:         {} (dense), {} (smooth)".format(
+            "x".join(str(n) for n in cost["fft_grid"]),
+            "x".join(str(n) for n in cost["smooth_fft_grid"]),
+        ),
+        "Memory (total):    {}".format(
+            _format_bytes(sum(cost["memory"].values()) + _PROCESS_OVERHEAD)
+        ),
+        "Relative cost:     {:.3g}".format(cost["relative_cost"]),
+    ]
+    if layout is not None:
+        lines += [
+            "",
+            "Recommended layout ({} processes, {} per pool):".format(
+                layout["num_procs"], layout["procs_per_pool"]
+            ),
+            "    {}".format(layout["command"]),
+            "Memory per process: {}".format(
+                _format_bytes(layout["memory_per_process"])
+            ),
+        ]
+        lines += ["Warning: {}".format(w) for w in layout["warnings"]]
+    return "\n".join(lines)
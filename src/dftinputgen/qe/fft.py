@@ -0,0 +1,105 @@
+import math
+
+import numpy as np
+from ase.units import Bohr
+
+
+__all__ = [
+    "PWX_FFT_GRID_TAGS",
+    "good_fft_order",
+    "get_fft_grid",
+    "get_pwx_fft_grids",
+]
+
+
+PWX_FFT_GRID_TAGS = ["nr1", "nr2", "nr3", "nr1s", "nr2s", "nr3s"]
+"""pw.x tags for the dimensions of the dense and smooth FFT grids."""
+
+
+def good_fft_order(n, factors=(2, 3, 5)):
+    """Smallest integer >= `n` with no prime factors other than `factors`.
+
+    FFTs of such lengths are efficient with all FFT libraries used by pw.x.
+    """
+    n = max(int(n), 1)
+    while True:
+        m = n
+        for factor in factors:
+            while m % factor == 0:
+                m //= factor
+        if m == 1:
+            return n
+        n += 1
+
+
+def get_fft_grid(cell, ecut, factors=(2, 3, 5)):
+    """FFT grid that pw.x uses for a cell and kinetic energy cutoff.
+
+    Along every lattice vector a_i, the grid must resolve all G-vectors with
+    |G|^2 <= `ecut` (i.e. Miller indices up to sqrt(ecut) |a_i| / 2pi), and
+    is then rounded up to a length with only `factors` as prime factors.
+
+    Parameters
+    ----------
+    cell: 3x3 array_like
+        Lattice vectors (rows), in Angstrom.
+
+    ecut: float
+        Kinetic energy cutoff in Ry, e.g. `ecutrho` for the dense grid.
+
+    factors: tuple of int, optional
+        Allowed prime factors of the grid dimensions.
+
+        Default: (2, 3, 5)
+
+    Returns
+    -------
+    FFT grid dimensions as a list of 3 integers.
+
+    """
+    lengths = np.linalg.norm(np.asarray(cell, dtype=float), axis=1) / Bohr
+    max_miller = [int(math.sqrt(ecut) * a / (2 * math.pi)) for a in lengths]
+    return [good_fft_order(2 * m + 1, factors=factors) for m in max_miller]
+
+
+def get_pwx_fft_grids(cell, ecutwfc, ecutrho=None, factors=(2, 3, 5, 7)):
+    """Dense and smooth FFT grids for pw.x, as pw.x tags and values.
+
+    The dense grid ("nr1", "nr2", "nr3") is computed for `ecutrho`. The
+    smooth grid ("nr1s", "nr2s", "nr3s") is computed for 4 x `ecutwfc`, and
+    only if it is coarser than the dense grid, i.e. for `ecutrho` > 4 x
+    `ecutwfc` (ultrasoft/PAW pseudopotentials); otherwise pw.x uses the
+    dense grid for both. Grids only depend on the lengths of the lattice
+    vectors, so that similar cells get the same grids.
+
+    Parameters
+    ----------
+    cell: 3x3 array_like
+        Lattice vectors (rows), in Angstrom.
+
+    ecutwfc: float
+        Kinetic energy cutoff for wavefunctions, in Ry.
+
+    ecutrho: float, optional
+        Kinetic energy cutoff for the charge density and potential, in Ry.
+
+        Default: 4 x `ecutwfc` (as in pw.x)
+
+    factors: tuple of int, optional
+        Allowed prime factors of the grid dimensions.
+
+        Default: (2, 3, 5, 7)
+
+    Returns
+    -------
+    Dictionary of pw.x tags and grid dimensions.
+
+    """
+    ecutwfc = float(ecutwfc)
+    ecutrho = 4 * ecutwfc if ecutrho is None else float(ecutrho)
+    tags = PWX_FFT_GRID_TAGS
+    grids = dict(zip(tags[:3], get_fft_grid(cell, ecutrho, factors=factors)))
+    if ecutrho > 4 * ecutwfc:
+        smooth_grid = get_fft_grid(cell, 4 * ecutwfc, factors=factors)
+        grids.update(zip(tags[3:], smooth_grid))
+    return grids
@@ -1,10 +1,23 @@
 import os
 import six
+import copy
+import json
 import itertools
+import numpy as np
 
-from dftinputgen.data import STANDARD_ATOMIC_WEIGHTS
+from dftinputgen.data import ATOMIC_WEIGHTS
 from dftinputgen.utils import get_elem_symbol
+from dftinputgen.utils import get_elem_symbols
+from dftinputgen.profiling import timed
 from dftinputgen.utils import get_kpoint_grid_from_spacing
+from dftinputgen.utils import get_kpoint_grids_from_spacing
+from dftinputgen.utils import get_vacuum_directions
+from dftinputgen.utils import DEFAULT_MIN_VACUUM
+from dftinputgen.utils import reduce_crystal_structure
+from dftinputgen.utils import replace_file
+from dftinputgen.utils import write_json_atomic
+from dftinputgen.qe.fft import PWX_FFT_GRID_TAGS
+from dftinputgen.qe.fft import get_pwx_fft_grids
 from dftinputgen.qe.settings import QE_TAGS
 from dftinputgen.qe.settings.calculation_presets import QE_PRESETS
 
@@ -22,12 +35,190 @@ def _qe_val_formatter(val):
         return str(val)
 
 
+def _format_rows(row_format, columns):
+    """Format columns of values into newline-separated rows, in bulk.
+
+    `row_format` is a %-style format string for a single row, applied to the
+    i-th value of every column. All rows are formatted in one %-formatting
+    operation instead of one `str.format` call per row.
+    """
+    nrows = len(columns[0])
+    values = tuple(itertools.chain.from_iterable(zip(*columns)))
+    return "\n".join([row_format] * nrows) % values
+
+
+def _settings_fingerprint(settings):
+    """Stable string fingerprint of a dictionary of settings."""
+    return json.dumps(settings, sort_keys=True, default=repr)
+
+
+def _get_structure_key(crystal_structure):
+    """Snapshot of the per-atom arrays, cell and pbc of a crystal structure.
+
+    Cheap to compute and compare (no copies of Python objects), to detect
+    in-place changes to the structure (e.g. `set_chemical_symbols`).
+    """
+    arrays = crystal_structure.arrays
+    return (
+        tuple((name, arrays[name].tobytes()) for name in sorted(arrays)),
+        np.asarray(crystal_structure.get_cell()).tobytes(),
+        np.asarray(crystal_structure.get_pbc()).tobytes(),
+    )
+
+
+def _compile_namelist(namelist, calc_sett, slots):
+    """Compile a namelist into a template for the given settings.
+
+    The template is a list of (tag, line) pairs for only the tags present in
+    `calc_sett` (plus the namelist header and footer), in pw.x order. Lines
+    are pre-formatted, except for tags in `slots` (e.g. structure-dependent
+    parameters), for which the line is None and the value is formatted at
+    render time.
+    """
+    template = [(None, "&{}".format(namelist.upper()))]
+    for tag in QE_TAGS["pw.x"]["namelist_tags"][namelist]:
+        if tag in slots:
+            template.append((tag, None))
+        elif tag in calc_sett:
+            value = _qe_val_formatter(calc_sett[tag])
+            template.append((tag, "    {} = {}".format(tag, value)))
+    template.append((None, "/"))
+    return template
+
+
+def _render_namelist(template, calc_sett):
+    """Render a compiled namelist template into a formatted string."""
+    lines = []
+    for tag, line in template:
+        if line is None:
+            if tag not in calc_sett:
+                continue
+            value = _qe_val_formatter(calc_sett[tag])
+            line = "    {} = {}".format(tag, value)
+        lines.append(line)
+    return "\n".join(lines)
+
+
+# number of structures handled together in batch mode, e.g. to compute
+# k-point grids for all of them at once
+_BATCH_CHUNK_SIZE = 1024
+
+
+# settings fingerprint -> {namelist: compiled namelist template}
+# shared by all generator instances; reset when it grows too large
+_NAMELIST_TEMPLATES = {}
+_NAMELIST_TEMPLATES_MAXSIZE = 256
+
+
 class PwxInputGeneratorError(DftInputGeneratorError):
     """Base class for pw.x input files generation errors."""
 
     pass
 
 
+# pseudo_dir -> (mtime of pseudo_dir, index of pseudopotentials in pseudo_dir)
+_PSEUDO_INDEX_CACHE = {}
+
+
+def _get_kpoints_min_vacuum(kpoints_sett):
+    """Minimum vacuum gap to detect (None if vacuum detection is off)."""
+    if not kpoints_sett.get("detect_vacuum"):
+        return None
+    return kpoints_sett.get("min_vacuum", DEFAULT_MIN_VACUUM)
+
+
+def _elem_from_pseudo_fname(fname):
+    """Lowercase element from the name of a pseudopotential file."""
+    bname = os.path.basename(fname)
+    return bname.partition(".")[0].partition("_")[0].lower()
+
+
+def _build_pseudo_index(pseudo_dir):
+    """Index *.UPF files in `pseudo_dir` by element (in listing order)."""
+    # Note: generic except here for py2/py3 compatibility
+    try:
+        pseudo_dir_files = os.listdir(pseudo_dir)
+    except:  # noqa: E722
+        msg = 'Failed to list contents in "{}"'.format(pseudo_dir)
+        raise PwxInputGeneratorError(msg)
+    index = {}
+    for p in pseudo_dir_files:
+        if os.path.splitext(p)[-1].lower() != ".upf":
+            continue
+        index.setdefault(_elem_from_pseudo_fname(p), []).append(p)
+    return index
+
+
+def _read_pseudo_index_file(index_file, pseudo_dir, mtime):
+    """Load a persisted index; None if missing, unreadable or stale."""
+    try:
+        with open(index_file, "r") as fr:
+            persisted = json.load(fr)
+    except (IOError, OSError, ValueError):
+        return None
+    if persisted.get("pseudo_dir") != pseudo_dir:
+        return None
+    if persisted.get("mtime") != mtime:
+        return None
+    return persisted.get("index")
+
+
+def _write_pseudo_index_file(index_file, pseudo_dir, mtime, index):
+    """Persist an index (atomically, via a temporary file).
+
+    The file is only a cache: errors writing it (e.g. in a read-only
+    directory) are ignored.
+    """
+    persisted = {"pseudo_dir": pseudo_dir, "mtime": mtime, "index": index}
+    try:
+        write_json_atomic(index_file, persisted)
+    except (IOError, OSError):
+        pass
+
+
+def get_pseudo_index(pseudo_dir, index_file=None):
+    """Get the index of pseudopotential files in a directory, by element.
+
+    The directory is listed only once, and the index is cached in-process
+    (keyed by the path and modification time of the directory). Adding,
+    removing or renaming files in the directory invalidates the index.
+
+    Parameters
+    ----------
+    pseudo_dir: str
+        Path to the directory with pseudopotential (*.UPF) files.
+
+    index_file: str, optional
+        Path to a JSON file to persist the index in, e.g. to share it across
+        processes. If the file has an up-to-date index for `pseudo_dir`, the
+        directory is not listed at all.
+
+    Returns
+    -------
+    Dictionary with lowercase element symbols as keys and lists of
+    pseudopotential file names as values.
+
+    """
+    pseudo_dir = os.path.expanduser(pseudo_dir)
+    try:
+        mtime = os.stat(pseudo_dir).st_mtime
+    except OSError:
+        msg = 'Failed to list contents in "{}"'.format(pseudo_dir)
+        raise PwxInputGeneratorError(msg)
+    cached = _PSEUDO_INDEX_CACHE.get(pseudo_dir)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    index = None
+    if index_file is not None:
+        index = _read_pseudo_index_file(index_file, pseudo_dir, mtime)
+    if index is None:
+        index = _build_pseudo_index(pseudo_dir)
+        if index_file is not None:
+            _write_pseudo_index_file(index_file, pseudo_dir, mtime, index)
+    _PSEUDO_INDEX_CACHE[pseudo_dir] = (mtime, index)
+    return index
+
+
 class PwxInputGenerator(DftInputGenerator):
     """Base class to generate input files for pw.x."""
 
@@ -41,6 +232,9 @@ class PwxInputGenerator(DftInputGenerator):
         write_location=None,
         pwx_input_file=None,
         overwrite_files=None,
+        use_input_cache=None,
+        profile=None,
+        reduce_structure=None,
         **kwargs
     ):
         """
@@ -50,7 +244,8 @@ class PwxInputGenerator(DftInputGenerator):
         ----------
         crystal_structure: :class:`ase.Atoms` object
             :class:`ase.Atoms` object from `ase.io.read([crystal structure
-            file])`.
+            file])`, or a lightweight
+            :class:`ArrayStructure <dftinputgen.structure.ArrayStructure>`.
 
         calculation_presets: str, optional
             The "base" calculation settings to use--must be one of the
@@ -89,6 +284,10 @@ class PwxInputGenerator(DftInputGenerator):
                species, an error is thrown.
                NB: If `pseudo_dir` is not provided as input, an error is
                thrown.
+               The contents of `pseudo_dir` are indexed once and cached (see
+               :func:`get_pseudo_index`); to persist the index to disk, set
+               `pseudo_index_file` to the path of a JSON file in any of the
+               previous settings arguments.
 
             NB: this above described matching is performed lazily, i.e.,
             only when a card or namelist that requires pseudopotential
@@ -116,8 +315,43 @@ class PwxInputGenerator(DftInputGenerator):
         overwrite_files: bool, optional
             To overwrite files or not, that is the question.
 
+            If set to False, an existing pw.x input file is never modified.
+
             Default: True
 
+        use_input_cache: bool, optional
+            Whether to skip rewriting the pw.x input file if it is
+            up-to-date, i.e. if the crystal structure, merged calculation
+            settings and pseudopotentials are unchanged since the file was
+            last written (as recorded in a manifest in `write_location`).
+
+            Default: False
+
+        profile: bool, optional
+            Whether to record the wall time spent in, and the number of calls
+            to, every stage of input generation in `timing_stats`: merging
+            settings ("calculation_settings"), matching pseudopotentials
+            ("pseudo_names"), computing k-point grids in batch mode
+            ("kpoint_grids"), formatting every namelist ("namelist_to_str";
+            and "all_namelists_as_str" for all of them at once) and every
+            card (e.g. "atomic_species_card"), and writing the input file
+            ("write_pwx_input").
+
+            Default: False
+
+        reduce_structure: bool, optional
+            Whether to reduce the input crystal structure to its
+            Niggli-reduced primitive cell before generating input (see
+            :func:`reduce_crystal_structure
+            <dftinputgen.utils.reduce_crystal_structure>`; requires the
+            `spglib` package). The input structure is kept as
+            `input_crystal_structure`, and the number of atoms is reduced by
+            `reduction_factor`. NB: k-point grids computed from a k-spacing
+            follow the reduced cell, but explicitly specified grids are
+            used as is.
+
+            Default: False
+
         **kwargs:
             Arbitrary keyword arguments.
 
@@ -126,6 +360,26 @@ class PwxInputGenerator(DftInputGenerator):
         # TODO(@hegdevinayi): Add default magnetism schemes (ferro/AFM G-type)
         # TODO(@hegdevinayi): Consider allowing psp location via config file
 
+        self._parameters_from_structure = None
+        # chemical symbols and sorted unique species of the current structure
+        self._chemical_symbols = None
+        self._species = None
+        self._custom_sett_dict_snapshot = None
+        # (species, pseudo_dir) -> matched pseudo name; used in batch mode
+        self._matched_pseudo_names = None
+        # compiled namelist templates for the current (user-input) settings
+        self._namelist_templates = None
+        # k-point grid precomputed for the current structure; used in batch
+        # mode
+        self._kpoint_grid = None
+        # FFT grids to set for the current structure and settings
+        self._fft_grids = None
+        # crystal structure as input (before any reduction), and a snapshot
+        # of its contents to detect in-place changes
+        self._input_crystal_structure = None
+        self._crystal_structure_key = None
+        self._reduce_structure = bool(reduce_structure)
+
         super(PwxInputGenerator, self).__init__(
             crystal_structure=crystal_structure,
             calculation_presets=calculation_presets,
@@ -133,11 +387,10 @@ class PwxInputGenerator(DftInputGenerator):
             custom_sett_dict=custom_sett_dict,
             write_location=write_location,
             overwrite_files=overwrite_files,
+            use_input_cache=use_input_cache,
+            profile=profile,
         )
 
-        self._parameters_from_structure = self._get_parameters_from_structure()
-        self._calculation_settings = self._get_calculation_settings()
-
         self._specify_potentials = False
         self.specify_potentials = specify_potentials
 
@@ -148,13 +401,69 @@ class PwxInputGenerator(DftInputGenerator):
         super(PwxInputGenerator, self)._set_crystal_structure(
             crystal_structure
         )
-        self._parameters_from_structure = self._get_parameters_from_structure()
+        self._input_crystal_structure = crystal_structure
+        self._crystal_structure_key = _get_structure_key(crystal_structure)
+        if self._reduce_structure:
+            self._crystal_structure = reduce_crystal_structure(
+                crystal_structure
+            )
+        self._kpoint_grid = None
+        self._fft_grids = None
+        self._chemical_symbols = self.crystal_structure.get_chemical_symbols()
+        self._species = sorted(set(self._chemical_symbols))
+        parameters_from_structure = self._get_parameters_from_structure()
+        if parameters_from_structure != self._parameters_from_structure:
+            # namelist templates do not depend on the structure: keep them
+            super(PwxInputGenerator, self)._invalidate_calculation_settings()
+        self._parameters_from_structure = parameters_from_structure
+
+    def _refresh_crystal_structure(self):
+        """Update data derived from the structure if it changed in place."""
+        crystal_structure = self._input_crystal_structure
+        key = None
+        if crystal_structure is not None:
+            key = _get_structure_key(crystal_structure)
+        if key != self._crystal_structure_key:
+            self._set_crystal_structure(crystal_structure)
+
+    def _invalidate_calculation_settings(self):
+        super(PwxInputGenerator, self)._invalidate_calculation_settings()
+        self._namelist_templates = None
+        self._fft_grids = None
 
     @property
     def parameters_from_structure(self):
         """DFT parameters auto-determined for the input crystal structure."""
+        self._refresh_crystal_structure()
         return self._parameters_from_structure
 
+    @property
+    def input_crystal_structure(self):
+        """Crystal structure as input, i.e. before any reduction."""
+        return self._input_crystal_structure
+
+    @property
+    def reduce_structure(self):
+        """Should the crystal structure be reduced to a primitive cell."""
+        return self._reduce_structure
+
+    @reduce_structure.setter
+    def reduce_structure(self, reduce_structure):
+        if reduce_structure is None:
+            return
+        changed = bool(reduce_structure) != self._reduce_structure
+        self._reduce_structure = bool(reduce_structure)
+        if changed and self._input_crystal_structure is not None:
+            self.crystal_structure = self._input_crystal_structure
+
+    @property
+    def reduction_factor(self):
+        """Ratio of the number of atoms in the input and reduced structure."""
+        num_atoms = len(self.crystal_structure)
+        if not num_atoms:
+            return 1.0
+        return float(len(self._input_crystal_structure)) / num_atoms
+
     @property
     def specify_potentials(self):
         """Should potentials be specified for each chemical species."""
@@ -193,36 +502,36 @@ class PwxInputGenerator(DftInputGenerator):
         """
         return {
             "nat": len(self.crystal_structure),
-            "ntyp": len(set(self.crystal_structure.get_chemical_symbols())),
+            "ntyp": len(self._species),
         }
 
     @staticmethod
-    def _get_pseudo_name(species, pseudo_dir):
+    def _get_pseudo_name(species, pseudo_dir, index_file=None):
         """Match chemical species::pseudopotential in a given directory."""
-        # filler for black/flake8 compatibility
-        # empty line after docstring relaxed in pydocstyle>5.0
-        # this will have to stay due to py2 (pydocstyle ceil = 3.0.0)
-        def _elem_from_fname(fname):
-            bname = os.path.basename(fname)
-            elem = bname.partition(".")[0].partition("_")[0].lower()
-            return elem
-
-        elem_low = get_elem_symbol(species).lower()
         # match pseudo iff a *.UPF filename matches element symbol in structure
-        # Note: generic except here for py2/py3 compatibility
-        try:
-            pseudo_dir_files = os.listdir(os.path.expanduser(pseudo_dir))
-        except:  # noqa: E722
-            msg = 'Failed to list contents in "{}"'.format(pseudo_dir)
-            raise PwxInputGeneratorError(msg)
-        for p in pseudo_dir_files:
-            ext = os.path.splitext(p)[-1].lower()
-            if _elem_from_fname(p) == elem_low and ext == ".upf":
-                return os.path.basename(p)
+        elem_low = get_elem_symbol(species).lower()
+        index = get_pseudo_index(pseudo_dir, index_file=index_file)
+        candidates = index.get(elem_low)
+        if candidates:
+            return candidates[0]
+
+    def _match_pseudo_name(self, species, pseudo_dir):
+        """Match a pseudopotential for species, reusing earlier matches."""
+        index_file = self.calculation_settings.get("pseudo_index_file")
+        if self._matched_pseudo_names is None:
+            return self._get_pseudo_name(species, pseudo_dir, index_file)
+        key = (species, pseudo_dir)
+        if key not in self._matched_pseudo_names:
+            self._matched_pseudo_names[key] = self._get_pseudo_name(
+                species, pseudo_dir, index_file
+            )
+        return self._matched_pseudo_names[key]
 
+    @timed("pseudo_names")
     def _get_pseudo_names(self):
         """Get names of pseudopotentials to use for each chemical species."""
-        species = sorted(set(self.crystal_structure.get_chemical_symbols()))
+        self._refresh_crystal_structure()
+        species = self._species
         pseudo_names = {sp: None for sp in species}
         if not self.specify_potentials:
             return pseudo_names
@@ -239,7 +548,7 @@ class PwxInputGenerator(DftInputGenerator):
             msg = "Pseudopotential directory not specified"
             raise PwxInputGeneratorError(msg)
         matched_pseudo_names = {
-            sp: self._get_pseudo_name(sp, pseudo_dir) for sp in species
+            sp: self._match_pseudo_name(sp, pseudo_dir) for sp in species
         }
         # 4. overwrite with any user-specified pseudos
         for sp in pseudo_names:
@@ -256,21 +565,58 @@ class PwxInputGenerator(DftInputGenerator):
 
     @property
     def calculation_settings(self):
-        """Dictionary of all calculation settings to use as input pw.x."""
-        return self._get_calculation_settings()
+        """Dictionary of all calculation settings to use as input pw.x.
+
+        The merged settings are cached, and rebuilt only when the crystal
+        structure, `calculation_presets`, `custom_sett_file` or
+        `custom_sett_dict` change (including in-place updates to the
+        crystal structure and `custom_sett_dict`). Treat the returned
+        dictionary as read-only.
+        """
+        self._refresh_crystal_structure()
+        if self._custom_sett_dict != self._custom_sett_dict_snapshot:
+            self._invalidate_calculation_settings()
+        if self._calculation_settings is None:
+            self._custom_sett_dict_snapshot = copy.deepcopy(
+                self._custom_sett_dict
+            )
+            self._calculation_settings = self._get_calculation_settings()
+        return self._calculation_settings
 
+    @timed("calculation_settings")
     def _get_calculation_settings(self):
         """Load all calculation settings: user-input and auto-determined."""
-        calc_sett = {}
+        calc_sett = self._get_user_settings()
+        calc_sett.update(self.parameters_from_structure)
+        return calc_sett
+
+    def _get_user_settings(self):
+        """Merge user-input settings: presets, custom file, custom dict."""
+        user_sett = {}
         if self.calculation_presets is not None:
-            calc_sett.update(QE_PRESETS[self.calculation_presets])
+            user_sett.update(QE_PRESETS[self.calculation_presets])
         if self.custom_sett_from_file is not None:
-            calc_sett.update(self.custom_sett_from_file)
+            user_sett.update(self.custom_sett_from_file)
         if self.custom_sett_dict is not None:
-            calc_sett.update(self.custom_sett_dict)
-        calc_sett.update(self.parameters_from_structure)
-        return calc_sett
+            user_sett.update(self.custom_sett_dict)
+        return user_sett
+
+    def _get_namelist_templates(self):
+        """Compiled namelist templates for the current user-input settings.
 
+        Templates are shared across generator instances with the same
+        presets and custom settings (by settings fingerprint).
+        """
+        if self._namelist_templates is None:
+            key = _settings_fingerprint(self._get_user_settings())
+            if key not in _NAMELIST_TEMPLATES:
+                if len(_NAMELIST_TEMPLATES) >= _NAMELIST_TEMPLATES_MAXSIZE:
+                    _NAMELIST_TEMPLATES.clear()
+                _NAMELIST_TEMPLATES[key] = {}
+            self._namelist_templates = _NAMELIST_TEMPLATES[key]
+        return self._namelist_templates
+
+    @timed("namelist_to_str")
     def _namelist_to_str(self, namelist):
         """Convert (tags, values) from a namelist into a formatted string."""
         if namelist.lower() == "control":
@@ -278,93 +624,181 @@ class PwxInputGenerator(DftInputGenerator):
                 if self.specify_potentials:
                     msg = "Pseudopotentials directory not specified"
                     raise PwxInputGeneratorError(msg)
-        lines = ["&{}".format(namelist.upper())]
-        for tag in QE_TAGS["pw.x"]["namelist_tags"][namelist]:
-            if tag not in self.calculation_settings:
-                continue
-            lines.append(
-                "    {} = {}".format(
-                    tag, _qe_val_formatter(self.calculation_settings.get(tag)),
-                )
+        # access settings first: picks up in-place updates to custom settings
+        calc_sett = self.calculation_settings
+        templates = self._get_namelist_templates()
+        if namelist not in templates:
+            # structure-dependent tags are formatted at render time
+            slots = set(self.parameters_from_structure)
+            slots.update(PWX_FFT_GRID_TAGS)
+            templates[namelist] = _compile_namelist(
+                namelist, calc_sett, slots=slots
             )
-        lines.append("/")
-        return "\n".join(lines)
+        if namelist.lower() == "system" and self._get_fft_grids():
+            calc_sett = dict(calc_sett, **self._get_fft_grids())
+        return _render_namelist(templates[namelist], calc_sett)
+
+    def _get_fft_grids(self):
+        """FFT grids to set in the "system" namelist (if switched on).
+
+        If "fft_grids" is set in the settings, FFT-friendly dense and smooth
+        grids for the current cell and cutoffs are computed (see
+        :func:`get_pwx_fft_grids <dftinputgen.qe.fft.get_pwx_fft_grids>`),
+        with dimensions that only have "fft_grid_factors" as prime factors.
+        Grids specified explicitly in the settings are used as is.
+        """
+        self._refresh_crystal_structure()
+        if self._fft_grids is None:
+            calc_sett = self.calculation_settings
+            fft_grids = {}
+            if calc_sett.get("fft_grids"):
+                if "ecutwfc" not in calc_sett:
+                    msg = 'FFT grids require "ecutwfc" to be specified'
+                    raise PwxInputGeneratorError(msg)
+                fft_grids = get_pwx_fft_grids(
+                    self.crystal_structure.get_cell(),
+                    calc_sett["ecutwfc"],
+                    ecutrho=calc_sett.get("ecutrho"),
+                    factors=calc_sett.get("fft_grid_factors", (2, 3, 5, 7)),
+                )
+            self._fft_grids = {
+                tag: n for tag, n in fft_grids.items() if tag not in calc_sett
+            }
+        return self._fft_grids
 
     @property
+    @timed("all_namelists_as_str")
     def all_namelists_as_str(self):
         """All pw.x namelists as one formatted string."""
-        blocks = []
-        for namelist in QE_TAGS["pw.x"]["namelists"]:
-            if namelist in self.calculation_settings.get("namelists", []):
-                blocks.append(self._namelist_to_str(namelist))
-        return "\n".join(blocks)
+        return "\n".join(self._iter_namelists())
+
+    def _get_namelists(self):
+        """Names of the namelists to write, in pw.x input order."""
+        namelists = self.calculation_settings.get("namelists", [])
+        return [nl for nl in QE_TAGS["pw.x"]["namelists"] if nl in namelists]
+
+    def _iter_namelists(self):
+        """Formatted pw.x namelists, one at a time."""
+        for namelist in self._get_namelists():
+            yield self._namelist_to_str(namelist)
 
     @property
+    @timed("atomic_species_card")
     def atomic_species_card(self):
         """pw.x ATOMIC_SPECIES card as a string."""
-        species = sorted(set(self.crystal_structure.get_chemical_symbols()))
+        self._refresh_crystal_structure()
+        species = self._species
         pseudo_names = self._get_pseudo_names()
+        # species labels (e.g. "Fe1") have the weights of their elements
+        elements = get_elem_symbols(species)
+        weights = ATOMIC_WEIGHTS.get_weights(elements).tolist()
         lines = ["ATOMIC_SPECIES"]
-        for sp in species:
+        for sp, weight in zip(species, weights):
             lines.append(
-                "{:4s}  {:12.8f}  {}".format(
-                    sp,
-                    STANDARD_ATOMIC_WEIGHTS[sp]["standard_atomic_weight"],
-                    pseudo_names[sp],
-                )
+                "{:4s}  {:12.8f}  {}".format(sp, weight, pseudo_names[sp])
             )
         return "\n".join(lines)
 
     @property
+    @timed("atomic_positions_card")
     def atomic_positions_card(self):
         """pw.x ATOMIC_POSITIONS card as a string."""
-        symbols = self.crystal_structure.get_chemical_symbols()
+        self._refresh_crystal_structure()
+        symbols = self._chemical_symbols
         positions = self.crystal_structure.get_scaled_positions()
         lines = ["ATOMIC_POSITIONS {crystal}"]
-        for s, p in zip(symbols, positions):
-            lines.append("{:4s}  {:12.8f}  {:12.8f}  {:12.8f}".format(s, *p))
+        if len(symbols):
+            lines.append(
+                _format_rows(
+                    "%-4s  %12.8f  %12.8f  %12.8f",
+                    [symbols] + positions.T.tolist(),
+                )
+            )
         return "\n".join(lines)
 
     @property
+    @timed("kpoints_card")
     def kpoints_card(self):
         """pw.x KPOINTS card as a string."""
         kpoints_sett = self.calculation_settings.get("kpoints", {})
-        scheme = kpoints_sett.get("scheme")
-        if scheme not in ["gamma", "automatic"]:
+        scheme, grid = self._resolve_kpoints()
+        if scheme not in ["gamma", "automatic", "crystal_b", "tpiba_b"]:
             raise NotImplementedError
         if scheme == "gamma":
             return "K_POINTS {gamma}"
         elif scheme == "automatic":
             lines = ["K_POINTS {automatic}"]
-            grid = kpoints_sett.get("grid", [])
             shift = kpoints_sett["shift"]
-            if not grid:
-                grid = get_kpoint_grid_from_spacing(
-                    self.crystal_structure, kpoints_sett["spacing"],
-                )
             _l = "{} {} {} {} {} {}".format(*itertools.chain(grid, shift))
             lines.append(_l)
+        else:
+            # band structure path: [k1, k2, k3, number of points] per vertex
+            path = kpoints_sett.get("path")
+            if not path:
+                msg = 'k-point path ("path") not specified'
+                raise PwxInputGeneratorError(msg)
+            lines = ["K_POINTS {{{}}}".format(scheme), str(len(path))]
+            for k1, k2, k3, npoints in path:
+                lines.append(
+                    "{:12.8f}  {:12.8f}  {:12.8f}  {:d}".format(
+                        k1, k2, k3, int(npoints)
+                    )
+                )
         return "\n".join(lines)
 
+    def _resolve_kpoints(self):
+        """k-points scheme to use, and the k-point grid (if "automatic").
+
+        For the "automatic" scheme without an explicit grid, the grid is
+        computed from the k-spacing. If vacuum detection is switched on
+        ("detect_vacuum" in the "kpoints" settings), a single k-point is
+        used along vacuum directions, and isolated systems (vacuum in all
+        directions) are switched to the "gamma" scheme.
+        """
+        kpoints_sett = self.calculation_settings.get("kpoints", {})
+        scheme = kpoints_sett.get("scheme")
+        if scheme != "automatic":
+            return scheme, None
+        if kpoints_sett.get("grid"):
+            return scheme, kpoints_sett["grid"]
+        min_vacuum = _get_kpoints_min_vacuum(kpoints_sett)
+        grid = self._kpoint_grid
+        if not grid:
+            grid = get_kpoint_grid_from_spacing(
+                self.crystal_structure,
+                kpoints_sett["spacing"],
+                min_vacuum=min_vacuum,
+            )
+        if min_vacuum is not None and list(grid) == [1, 1, 1]:
+            if all(get_vacuum_directions(self.crystal_structure, min_vacuum)):
+                return "gamma", None
+        return scheme, grid
+
     @property
+    @timed("cell_parameters_card")
     def cell_parameters_card(self):
         """pw.x CELL_PARAMETERS card as a string."""
-        lines = ["CELL_PARAMETERS {angstrom}"]
-        for cv in self.crystal_structure.cell:
-            lines.append("{:12.8f}  {:12.8f}  {:12.8f}".format(*cv))
+        cell_columns = list(zip(*self.crystal_structure.cell))
+        lines = [
+            "CELL_PARAMETERS {angstrom}",
+            _format_rows("%12.8f  %12.8f  %12.8f", cell_columns),
+        ]
         return "\n".join(lines)
 
     @property
+    @timed("occupations_card")
     def occupations_card(self):
         """pw.x OCCUPATIONS card as a string."""
         raise NotImplementedError
 
     @property
+    @timed("constraints_card")
     def constraints_card(self):
         """pw.x CONSTRAINTS card as a string."""
         raise NotImplementedError
 
     @property
+    @timed("atomic_forces_card")
     def atomic_forces_card(self):
         """pw.x ATOMIC_FORCES card as a string."""
         raise NotImplementedError
@@ -372,20 +806,159 @@ class PwxInputGenerator(DftInputGenerator):
     @property
     def all_cards_as_str(self):
         """All pw.x cards as one formatted string."""
-        blocks = []
-        for card in QE_TAGS["pw.x"]["cards"]:
-            if card in self.calculation_settings.get("cards", []):
-                blocks.append(getattr(self, "{}_card".format(card)))
-        return "\n".join(blocks)
+        return "\n".join(self._iter_cards())
+
+    def _get_cards(self):
+        """Names of the cards to write, in pw.x input order."""
+        cards = self.calculation_settings.get("cards", [])
+        return [card for card in QE_TAGS["pw.x"]["cards"] if card in cards]
+
+    def _iter_cards(self):
+        """Formatted pw.x cards, one at a time."""
+        for card in self._get_cards():
+            yield getattr(self, "{}_card".format(card))
 
     @property
     def pwx_input_as_str(self):
         """pw.x input (all namelists + cards) as a formatted string."""
-        return "\n".join([self.all_namelists_as_str, self.all_cards_as_str])
+        return "".join(self.iter_pwx_input())
+
+    def iter_pwx_input(self):
+        """Generate the pw.x input in chunks, one namelist/card at a time.
 
+        Joining all chunks gives `pwx_input_as_str`, but only one namelist
+        or card is formatted and held in memory at a time.
+        """
+        for i, namelist in enumerate(self._iter_namelists()):
+            yield namelist if i == 0 else "\n" + namelist
+        yield "\n"
+        for i, card in enumerate(self._iter_cards()):
+            yield card if i == 0 else "\n" + card
+
+    @property
+    def has_pwx_input(self):
+        """Are there any namelists or cards to write (without formatting)."""
+        return bool(self._get_namelists() or self._get_cards())
+
+    def stream_pwx_input(self, stream):
+        """Write the pw.x input, chunk by chunk, into a writable stream.
+
+        Parameters
+        ----------
+        stream: file-like object
+            Any object with a `write` method accepting strings, e.g. an open
+            text file or :class:`io.StringIO`.
+
+        """
+        if not self.has_pwx_input:
+            msg = "Nothing to write. No input settings found?"
+            raise PwxInputGeneratorError(msg)
+        for chunk in self.iter_pwx_input():
+            stream.write(chunk)
+
+    def generate_many(self, crystal_structures):
+        """Generate pw.x input for many crystal structures, same settings.
+
+        Structure-independent parts of the input are resolved only once for
+        the whole batch: custom settings are not re-read from file, merged
+        settings are reused, pseudopotentials are matched once per species,
+        and namelists are rendered once per unique set of
+        structure-dependent parameters (`nat`, `ntyp`). Only the cards are
+        rendered for every crystal structure.
+
+        The generator itself is left unmodified.
+
+        Parameters
+        ----------
+        crystal_structures: iterable of :class:`ase.Atoms` objects
+            Crystal structures to generate pw.x input for (or
+            :class:`ArrayStructure <dftinputgen.structure.ArrayStructure>`
+            objects, e.g. from :func:`iter_array_structures
+            <dftinputgen.structure.iter_array_structures>`).
+
+        Yields
+        ------
+        pw.x input (all namelists + cards) as a formatted string for each
+        crystal structure, in the order of `crystal_structures`.
+
+        """
+        pwig = self._get_batch_generator()
+        structures = iter(crystal_structures)
+        while True:
+            chunk = list(itertools.islice(structures, _BATCH_CHUNK_SIZE))
+            if not chunk:
+                break
+            kpoint_grids = pwig._get_batch_kpoint_grids(chunk)
+            for crystal_structure, kpoint_grid in zip(chunk, kpoint_grids):
+                yield pwig._generate_batch_item(
+                    crystal_structure, kpoint_grid=kpoint_grid
+                )
+
+    def _get_batch_generator(self):
+        """Copy of the generator that reuses resolved settings across calls."""
+        pwig = copy.copy(self)
+        pwig._matched_pseudo_names = {}
+        pwig._batch_namelists_as_str = {}
+        return pwig
+
+    @timed("kpoint_grids")
+    def _get_batch_kpoint_grids(self, crystal_structures):
+        """k-point grids for many structures at once (None if not needed).
+
+        Grids are computed only for the "automatic" scheme with a k-spacing
+        (and no explicit grid), and only if structures are not reduced
+        (grids of reduced structures are computed one at a time). If the
+        grids cannot be computed together (e.g. a singular cell), None is
+        returned for all structures, and any errors are raised when
+        rendering the individual structures instead.
+        """
+        nones = [None] * len(crystal_structures)
+        if self.reduce_structure:
+            return nones
+        kpoints_sett = self.calculation_settings.get("kpoints", {})
+        if kpoints_sett.get("scheme") != "automatic":
+            return nones
+        if kpoints_sett.get("grid") or "spacing" not in kpoints_sett:
+            return nones
+        try:
+            return get_kpoint_grids_from_spacing(
+                crystal_structures,
+                kpoints_sett["spacing"],
+                min_vacuum=_get_kpoints_min_vacuum(kpoints_sett),
+            )
+        except (ValueError, np.linalg.LinAlgError):
+            # `LinAlgError` is not a `ValueError` in older numpy versions
+            return nones
+
+    def _set_batch_structure(self, crystal_structure):
+        """Set the structure of a batch item, unless it is already set.
+
+        Avoids reducing the same structure again, e.g. when it was set to get
+        the input hash (in-place changes are picked up regardless).
+        """
+        if crystal_structure is not self._input_crystal_structure:
+            self.crystal_structure = crystal_structure
+
+    def _generate_batch_item(self, crystal_structure, kpoint_grid=None):
+        """pw.x input for one structure (call on a batch generator only)."""
+        self._set_batch_structure(crystal_structure)
+        self._kpoint_grid = kpoint_grid
+        key = tuple(sorted(self.parameters_from_structure.items()))
+        key += tuple(sorted(self._get_fft_grids().items()))
+        if key not in self._batch_namelists_as_str:
+            self._batch_namelists_as_str[key] = self.all_namelists_as_str
+        namelists = self._batch_namelists_as_str[key]
+        return "\n".join([namelists, self.all_cards_as_str])
+
+    @timed("write_pwx_input")
     def write_pwx_input(self, write_location=None, filename=None):
-        """Write the pw.x input file to disk at the specified location."""
-        if self.pwx_input_as_str.strip() == "":
+        """Write the pw.x input file to disk at the specified location.
+
+        The input is streamed into a temporary file in the same directory
+        (see `stream_pwx_input`), which then replaces the input file; if
+        formatting fails midway, any existing input file is left untouched.
+        """
+        if not self.has_pwx_input:
             msg = "Nothing to write. No input settings found?"
             raise PwxInputGeneratorError(msg)
         if write_location is None:
@@ -394,11 +967,32 @@ class PwxInputGenerator(DftInputGenerator):
         if filename is None:
             msg = "Name of the input file to write into not specified"
             raise PwxInputGeneratorError(msg)
-        with open(os.path.join(write_location, filename), "w") as fw:
-            fw.write(self.pwx_input_as_str)
+        pwx_input_file = os.path.join(write_location, filename)
+        tmp_path = "{}.{}.tmp".format(pwx_input_file, os.getpid())
+        try:
+            with open(tmp_path, "w") as fw:
+                self.stream_pwx_input(fw)
+            replace_file(tmp_path, pwx_input_file)
+        except Exception:
+            if os.path.isfile(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _get_input_hash_extra(self):
+        extra = super(PwxInputGenerator, self)._get_input_hash_extra()
+        extra["pseudo_names"] = self._get_pseudo_names()
+        return extra
 
     def write_input_files(self):
-        """Write pw.x input files to the user-specified location/file."""
-        self.write_pwx_input(
-            write_location=self.write_location, filename=self.pwx_input_file,
+        """Write pw.x input files to the user-specified location/file.
+
+        Respects `overwrite_files` and `use_input_cache`: returns True if the
+        input file was written, False if it was left untouched.
+        """
+        return self._write_input_file(
+            self.pwx_input_file,
+            lambda: self.write_pwx_input(
+                write_location=self.write_location,
+                filename=self.pwx_input_file,
+            ),
         )
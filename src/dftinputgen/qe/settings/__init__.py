@@ -1,12 +1,13 @@
-import json
-import pkg_resources
+from dftinputgen.data import LazyMapping
+from dftinputgen.data import load_json_resource
 
 
 __all__ = ["QE_TAGS"]
 
 
-tags_file = pkg_resources.resource_filename(
-    "dftinputgen.qe.settings", "tags_and_groups.json"
+# loaded lazily, on first access
+QE_TAGS = LazyMapping(
+    lambda: load_json_resource(
+        "dftinputgen.qe.settings", "tags_and_groups.json"
+    )
 )
-with open(tags_file, "r") as fr:
-    QE_TAGS = json.load(fr)
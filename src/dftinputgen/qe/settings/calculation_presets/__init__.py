@@ -1,23 +1,23 @@
 import os
-import json
-import pkg_resources
+
+from dftinputgen.data import LazyMapping
+from dftinputgen.data import list_resources
+from dftinputgen.data import load_json_resource
 
 
 __all__ = ["QE_PRESETS"]
 
 
-QE_PRESETS = {}
+def _load_qe_presets():
+    package = "dftinputgen.qe.settings.calculation_presets"
+    presets = {}
+    for filename in list_resources(package):
+        root, ext = os.path.splitext(filename)
+        if not ext == ".json":
+            continue
+        presets[root] = load_json_resource(package, filename)
+    return presets
 
 
-preset_listdir = pkg_resources.resource_listdir(
-    "dftinputgen.qe.settings", "calculation_presets"
-)
-for filename in preset_listdir:
-    root, ext = os.path.splitext(filename)
-    if not ext == ".json":
-        continue
-    resource = pkg_resources.resource_filename(
-        "dftinputgen.qe.settings.calculation_presets", filename
-    )
-    with open(resource, "r") as fr:
-        QE_PRESETS[root] = json.load(fr)
+# loaded lazily, on first access
+QE_PRESETS = LazyMapping(_load_qe_presets)
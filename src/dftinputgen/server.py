@@ -0,0 +1,301 @@
+"""Long-lived server to generate input files without per-call startup cost.
+
+The server reads requests as JSON lines from stdin (or from connections to
+a Unix socket), runs each one as a regular ``dftinputgen`` command line in
+the same (warm) process, and writes one JSON line in response.
+
+Requests are JSON objects with the arguments of the command line, and
+optionally the directory relative to which they should be interpreted::
+
+    {"args": ["pw.x", "-i", "POSCAR", "-pre", "scf"], "cwd": "/path/to/calc"}
+
+Responses report whether the command succeeded, and any output::
+
+    {"ok": true, "exit_code": 0, "stdout": "", "stderr": "", "error": null}
+
+The requests ``{"command": "ping"}`` and ``{"command": "shutdown"}`` check
+that the server is alive, and stop the server, respectively.
+
+NB: only the standard library is imported at module level, so that the
+client starts up quickly.
+"""
+
+import os
+import sys
+import json
+import stat
+import time
+import errno
+import socket
+import argparse
+
+
+__all__ = [
+    "handle_request",
+    "serve_stream",
+    "serve_unix_socket",
+    "serve",
+    "send_request",
+    "client_main",
+]
+
+
+def _warm_up():
+    """Load packages and data used for generating input files."""
+    from dftinputgen.cli import get_parser
+    from dftinputgen.data import STANDARD_ATOMIC_WEIGHTS
+    from dftinputgen.qe.settings import QE_TAGS
+    from dftinputgen.qe.settings.calculation_presets import QE_PRESETS
+
+    get_parser()
+    for mapping in [STANDARD_ATOMIC_WEIGHTS, QE_TAGS, QE_PRESETS]:
+        mapping.data
+
+
+def _run_command(args):
+    """Run a command line in this process; return exit code and output."""
+    import six
+    from dftinputgen.cli import driver
+
+    stdout, stderr = six.StringIO(), six.StringIO()
+    sys_stdout, sys_stderr = sys.stdout, sys.stderr
+    sys.stdout, sys.stderr = stdout, stderr
+    try:
+        driver(args)
+        exit_code = 0
+    except SystemExit as err:
+        # raised by argparse for invalid arguments (and for "-h")
+        if err.code is None:
+            exit_code = 0
+        else:
+            exit_code = err.code if isinstance(err.code, int) else 1
+    finally:
+        sys.stdout, sys.stderr = sys_stdout, sys_stderr
+    return exit_code, stdout.getvalue(), stderr.getvalue()
+
+
+def handle_request(request):
+    """Handle a single request (a dictionary); return the response."""
+    response = {"ok": False, "exit_code": 1, "error": None}
+    if "id" in request:
+        response["id"] = request["id"]
+    command = request.get("command", "run")
+    if command in ["ping", "shutdown"]:
+        response.update({"ok": True, "exit_code": 0})
+        return response
+    args = request.get("args")
+    if command != "run" or not isinstance(args, list):
+        response["error"] = "Invalid request"
+        return response
+    if args[:1] in [["serve"], ["client"]]:
+        response["error"] = "Cannot run server/client commands on the server"
+        return response
+    start = time.time()
+    cwd = os.getcwd()
+    try:
+        os.chdir(request.get("cwd", cwd))
+        exit_code, stdout, stderr = _run_command(request["args"])
+        response.update(
+            {"exit_code": exit_code, "stdout": stdout, "stderr": stderr}
+        )
+        response["ok"] = exit_code == 0
+    except Exception as err:
+        response["error"] = "{}: {}".format(type(err).__name__, err)
+    finally:
+        os.chdir(cwd)
+    response["elapsed"] = time.time() - start
+    return response
+
+
+def _parse_request(line):
+    try:
+        request = json.loads(line)
+    except ValueError:
+        return None
+    return request if isinstance(request, dict) else None
+
+
+def serve_stream(rfile, wfile):
+    """Serve JSON-lines requests from `rfile` until EOF or "shutdown".
+
+    Responses are written to `wfile`. Both files can be in text or binary
+    mode (e.g. stdin/stdout, or socket files).
+
+    Returns True if a "shutdown" request was received, else False.
+    """
+    while True:
+        line = rfile.readline()
+        if not line:
+            return False
+        binary = isinstance(line, bytes)
+        if binary:
+            line = line.decode("utf-8")
+        if not line.strip():
+            continue
+        request = _parse_request(line)
+        if request is None:
+            response = {"ok": False, "exit_code": 1, "error": "Invalid JSON"}
+        else:
+            response = handle_request(request)
+        data = json.dumps(response, sort_keys=True) + "\n"
+        wfile.write(data.encode("utf-8") if binary else data)
+        wfile.flush()
+        if request is not None and request.get("command") == "shutdown":
+            return True
+
+
+def _remove_stale_socket(socket_path):
+    """Remove a socket left behind at `socket_path` by a stopped server.
+
+    Raises an error if a server is still listening on the socket. Anything
+    other than a socket at `socket_path` is left alone.
+    """
+    try:
+        if not stat.S_ISSOCK(os.stat(socket_path).st_mode):
+            return
+    except (IOError, OSError):
+        return
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(socket_path)
+    except (IOError, OSError) as err:
+        if err.errno != errno.ECONNREFUSED:
+            raise
+        os.remove(socket_path)
+        return
+    finally:
+        client.close()
+    msg = "A server is already listening on {}".format(socket_path)
+    raise OSError(errno.EADDRINUSE, msg)
+
+
+def serve_unix_socket(socket_path):
+    """Serve requests from connections to a Unix socket until "shutdown".
+
+    Connections are served one at a time, each until the client closes it
+    (a client can send any number of requests on the same connection).
+
+    The socket is accessible to the current user only: requests run
+    commands that write files as this user.
+    """
+    if not hasattr(socket, "AF_UNIX"):  # pragma: no cover
+        raise OSError("Unix sockets are not supported on this platform")
+    _remove_stale_socket(socket_path)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    bound = False
+    try:
+        umask = os.umask(0o077)
+        try:
+            server.bind(socket_path)
+        finally:
+            os.umask(umask)
+        bound = True
+        server.listen(8)
+        shutdown = False
+        while not shutdown:
+            conn, _ = server.accept()
+            try:
+                rfile = conn.makefile("rb")
+                wfile = conn.makefile("wb")
+                shutdown = serve_stream(rfile, wfile)
+                rfile.close()
+                wfile.close()
+            except (IOError, OSError):
+                # e.g. client disconnected before reading the response
+                pass
+            finally:
+                conn.close()
+    finally:
+        server.close()
+        # only remove the socket bound here (not that of another server)
+        if bound and os.path.exists(socket_path):
+            os.remove(socket_path)
+
+
+def serve(socket_path=None):
+    """Warm up, and serve requests from stdin/stdout or a Unix socket."""
+    _warm_up()
+    if socket_path is None:
+        serve_stream(sys.stdin, sys.stdout)
+    else:
+        serve_unix_socket(socket_path)
+
+
+def send_request(socket_path, request, timeout=None):
+    """Send a request to the server at `socket_path`; return the response."""
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    client.settimeout(timeout)
+    try:
+        client.connect(socket_path)
+        data = json.dumps(request) + "\n"
+        client.sendall(data.encode("utf-8"))
+        rfile = client.makefile("rb")
+        line = rfile.readline()
+        rfile.close()
+    finally:
+        client.close()
+    if not line:
+        return {"ok": False, "exit_code": 1, "error": "No response"}
+    return json.loads(line.decode("utf-8"))
+
+
+def build_client_parser(parser):
+    """Add arguments of the client command to the input parser."""
+    socket_path = "Path to the Unix socket the server is listening on"
+    parser.add_argument(
+        "-s", "--socket", required=True, help=socket_path, dest="socket_path"
+    )
+
+    timeout = "Seconds to wait for the server to respond. Default: no limit"
+    parser.add_argument("-t", "--timeout", type=float, help=timeout)
+
+    command = """Command line to run on the server, e.g. "pw.x -i POSCAR -pre
+    scf", or "ping"/"shutdown" to check that the server is alive/stop it"""
+    parser.add_argument("command", nargs=argparse.REMAINDER, help=command)
+
+
+def build_serve_parser(parser):
+    """Add arguments of the serve command to the input parser."""
+    socket_path = """Path to a Unix socket to listen on. Default: serve
+    JSON-lines requests on stdin/stdout"""
+    parser.add_argument(
+        "-s", "--socket", default=None, help=socket_path, dest="socket_path"
+    )
+
+
+def run_client(args):
+    """Send a command to the server, and relay its response.
+
+    Returns the exit code of the command.
+    """
+    if args.command in [["ping"], ["shutdown"]]:
+        request = {"command": args.command[0]}
+    else:
+        request = {"args": args.command, "cwd": os.getcwd()}
+    response = send_request(args.socket_path, request, timeout=args.timeout)
+    sys.stdout.write(response.get("stdout", ""))
+    sys.stderr.write(response.get("stderr", ""))
+    if response.get("error"):
+        sys.stderr.write("Error: {}\n".format(response["error"]))
+    return response.get("exit_code", 1)
+
+
+def serve_command(args):
+    """Run the server with parsed command line arguments."""
+    serve(socket_path=args.socket_path)
+
+
+def client_command(args):
+    """Run the client with parsed command line arguments."""
+    exit_code = run_client(args)
+    if exit_code:
+        sys.exit(exit_code)
+
+
+def client_main(*sys_args):
+    """Entry point of the (lightweight) `dftinputgen-client` command."""
+    description = "Send a command to a running dftinputgen server."
+    parser = argparse.ArgumentParser(description=description)
+    build_client_parser(parser)
+    args = parser.parse_args(*sys_args)
+    client_command(args)
@@ -0,0 +1,168 @@
+import ase
+import numpy as np
+
+
+__all__ = ["ArrayStructure", "iter_array_structures"]
+
+
+class ArrayStructure(object):
+    """Crystal structure backed by NumPy arrays, without `ase.Atoms`.
+
+    Provides the subset of the `ase.Atoms` interface that input generators
+    use (`len`, `cell`, `get_cell`, `get_pbc`, `get_chemical_symbols`,
+    `get_scaled_positions`, `arrays`), so that it can be used as the
+    `crystal_structure` of any input generator. Structures that already
+    live in arrays (e.g. read from a database, or predicted by a model) can
+    thus be used without the per-object overhead of building `ase.Atoms`.
+
+    The arrays are stored as is, i.e. they are not copied if they already
+    have the expected type (float for the cell and positions), and should
+    not be modified while the structure is in use. Unlike
+    `ase.Atoms.get_scaled_positions`, scaled positions are returned as input
+    (not wrapped back into the unit cell).
+    """
+
+    def __init__(self, symbols, cell, scaled_positions, pbc=True):
+        """
+        Constructor.
+
+        Parameters
+        ----------
+        symbols: list or array of str
+            Chemical symbols (or species labels, e.g. "Fe1") of all atoms.
+
+        cell: 3x3 array_like
+            Lattice vectors (rows), in Angstrom.
+
+        scaled_positions: Nx3 array_like
+            Positions of all atoms in fractional coordinates of the cell.
+
+        pbc: bool or list of 3 bools, optional
+            Periodicity along each lattice vector.
+
+            Default: True
+
+        """
+        symbols = np.asarray(symbols)
+        cell = np.asarray(cell, dtype=float)
+        scaled_positions = np.asarray(scaled_positions, dtype=float)
+        if symbols.ndim != 1:
+            msg = "Expected a 1D sequence of symbols; found shape {}".format(
+                symbols.shape
+            )
+            raise ValueError(msg)
+        if cell.shape != (3, 3):
+            msg = "Expected cell of shape (3, 3); found {}".format(cell.shape)
+            raise ValueError(msg)
+        if scaled_positions.shape != (len(symbols), 3):
+            msg = "Expected positions of shape ({}, 3); found {}".format(
+                len(symbols), scaled_positions.shape
+            )
+            raise ValueError(msg)
+        self._symbols = symbols
+        self._cell = cell
+        self._scaled_positions = scaled_positions
+        self._pbc = np.zeros(3, dtype=bool)
+        self._pbc[:] = pbc
+
+    @classmethod
+    def from_atoms(cls, atoms):
+        """Array structure with the same atoms as an `ase.Atoms` object."""
+        return cls(
+            atoms.get_chemical_symbols(),
+            np.array(atoms.get_cell()),
+            atoms.get_scaled_positions(),
+            pbc=atoms.get_pbc(),
+        )
+
+    def to_atoms(self):
+        """The crystal structure as an `ase.Atoms` object."""
+        return ase.Atoms(
+            symbols=self.get_chemical_symbols(),
+            cell=self._cell,
+            scaled_positions=self._scaled_positions,
+            pbc=self._pbc,
+        )
+
+    @property
+    def cell(self):
+        """Lattice vectors (rows) as a 3x3 array."""
+        return self._cell
+
+    @property
+    def arrays(self):
+        """Per-atom arrays by name: chemical symbols and scaled positions."""
+        return {
+            "symbols": self._symbols,
+            "scaled_positions": self._scaled_positions,
+        }
+
+    def get_cell(self):
+        """Lattice vectors (rows) as a 3x3 array (not copied)."""
+        return self._cell
+
+    def get_pbc(self):
+        """Periodicity along each lattice vector as an array of 3 bools."""
+        return self._pbc
+
+    def get_chemical_symbols(self):
+        """Chemical symbols of all atoms as a list."""
+        return self._symbols.tolist()
+
+    def get_scaled_positions(self):
+        """Fractional coordinates of all atoms as an Nx3 array (not copied)."""
+        return self._scaled_positions
+
+    def get_positions(self):
+        """Cartesian coordinates of all atoms as an Nx3 array."""
+        return np.dot(self._scaled_positions, self._cell)
+
+    def __len__(self):
+        return len(self._symbols)
+
+    def __repr__(self):
+        return "{}(symbols={!r}, pbc={!r})".format(
+            type(self).__name__, self.get_chemical_symbols(), self._pbc
+        )
+
+
+def iter_array_structures(symbols, cells, scaled_positions, pbc=True):
+    """Iterate over crystal structures stored in stacked arrays.
+
+    Every structure is an :class:`ArrayStructure` with views into the input
+    arrays (no data is copied).
+
+    Parameters
+    ----------
+    symbols: array_like of str
+        Chemical symbols, either of shape (M,) (the same for all structures)
+        or (N, M).
+
+    cells: array_like of shape (N, 3, 3)
+        Lattice vectors of all structures.
+
+    scaled_positions: array_like of shape (N, M, 3)
+        Positions of all atoms in all structures, in fractional coordinates.
+
+    pbc: bool or list of 3 bools, optional
+        Periodicity along each lattice vector, for all structures.
+
+        Default: True
+
+    Yields
+    ------
+    :class:`ArrayStructure` objects, one per structure.
+
+    """
+    symbols = np.asarray(symbols)
+    cells = np.asarray(cells, dtype=float)
+    scaled_positions = np.asarray(scaled_positions, dtype=float)
+    if symbols.ndim == 1:
+        symbols = np.broadcast_to(symbols, scaled_positions.shape[:-1])
+    if not (len(symbols) == len(cells) == len(scaled_positions)):
+        msg = "Expected the same number of symbols, cells and positions"
+        raise ValueError(msg)
+    for i in range(len(cells)):
+        yield ArrayStructure(
+            symbols[i], cells[i], scaled_positions[i], pbc=pbc
+        )
@@ -1,10 +1,15 @@
+import os
 import re
 import six
+import json
 import numpy as np
 
+from ase import Atoms
 from ase import io as ase_io
+from ase.build.tools import niggli_reduce_cell
 
 from dftinputgen.data import STANDARD_ATOMIC_WEIGHTS
+from dftinputgen.structure import ArrayStructure
 
 
 class DftInputGeneratorUtilsError(Exception):
@@ -13,20 +18,63 @@ class DftInputGeneratorUtilsError(Exception):
     pass
 
 
+_ELEM_SYMBOL_RE = re.compile("([A-Z][a-z]?)")
+
+# species label -> element symbol, for labels other than element symbols
+# (e.g. "Fe1", "Fe_up"); bounded, cleared when full
+_ELEM_SYMBOL_MEMO = {}
+_ELEM_SYMBOL_MEMO_MAXSIZE = 4096
+
+
+def _parse_elem_symbol(species_label):
+    for symbol in _ELEM_SYMBOL_RE.findall(species_label):
+        if symbol in STANDARD_ATOMIC_WEIGHTS:
+            return symbol
+    msg = "No valid element symbol found"
+    raise DftInputGeneratorUtilsError(msg)
+
+
 def get_elem_symbol(species_label):
     """Get element symbol from species label, e.g. "Fe" from "Fe1", "Fe-2".
 
     NB: Returns the first valid element symbol encountered.
 
+    Element symbols are looked up directly in the table of elements; other
+    labels are parsed once and memoized.
+
     Raises `DftInputGeneratorError` if no valid element symbol was found.
     """
-    re_formula = re.compile("([A-Z][a-z]?)")
-    symbols = re_formula.findall(species_label)
-    for symbol in symbols:
-        if symbol in STANDARD_ATOMIC_WEIGHTS:
-            return symbol
-    msg = "No valid element symbol found"
-    raise DftInputGeneratorUtilsError(msg)
+    if species_label in STANDARD_ATOMIC_WEIGHTS:
+        return species_label
+    try:
+        return _ELEM_SYMBOL_MEMO[species_label]
+    except KeyError:
+        pass
+    symbol = _parse_elem_symbol(species_label)
+    if len(_ELEM_SYMBOL_MEMO) >= _ELEM_SYMBOL_MEMO_MAXSIZE:
+        _ELEM_SYMBOL_MEMO.clear()
+    _ELEM_SYMBOL_MEMO[species_label] = symbol
+    return symbol
+
+
+def get_elem_symbols(species_labels):
+    """Get element symbols for a sequence of species labels in one call.
+
+    Vectorized version of :func:`get_elem_symbol`, e.g. for the output of
+    `ase.Atoms.get_chemical_symbols()`: every unique label is resolved only
+    once, and the symbols are mapped back onto all labels in one step.
+
+    Returns a list of element symbols, one for every label.
+
+    Raises `DftInputGeneratorError` if no valid element symbol was found for
+    any of the labels.
+    """
+    labels = np.asarray(species_labels, dtype=str)
+    if not labels.size:
+        return []
+    unique_labels, inverse = np.unique(labels, return_inverse=True)
+    symbols = np.array([get_elem_symbol(label) for label in unique_labels])
+    return symbols[inverse].tolist()
 
 
 def read_crystal_structure(crystal_structure, **kwargs):
@@ -38,11 +86,281 @@ def read_crystal_structure(crystal_structure, **kwargs):
         raise TypeError(msg)
 
 
-def get_kpoint_grid_from_spacing(crystal_structure, spacing):
+def iread_crystal_structures(crystal_structures, index=":", **kwargs):
+    """Use `ase.io.iread` to lazily iterate over frames in the file specified.
+
+    Frames are read one at a time, so that multi-frame files of any size
+    (e.g. extxyz, ASE trajectory or ASE database files) can be processed
+    with constant memory.
+
+    Parameters
+    ----------
+    crystal_structures: str
+        Path to a (multi-frame) crystal structure file.
+
+    index: str or int, optional
+        Frame(s) to read, e.g. "10:100:10" or -1 (see `ase.io.iread`).
+
+        Default: ":" (all frames)
+
+    **kwargs:
+        Other arguments passed on to `ase.io.iread`, e.g. `format`.
+
+    Returns
+    -------
+    An iterator over the selected frames as `ase.Atoms` objects.
+
+    """
+    if isinstance(crystal_structures, six.string_types):
+        return ase_io.iread(crystal_structures, index=index, **kwargs)
+    else:
+        msg = "Expected type str; found {}".format(type(crystal_structures))
+        raise TypeError(msg)
+
+
+def replace_file(src, dst):
+    """Rename `src` to `dst`, replacing `dst` if it exists (atomically)."""
+    # `os.rename` does not replace existing files on Windows
+    replace = getattr(os, "replace", os.rename)
+    replace(src, dst)
+
+
+def write_json_atomic(path, data, **kwargs):
+    """Write `data` as JSON into `path`, atomically via a temporary file.
+
+    Readers (e.g. other processes) see either the previous file or the new
+    one, never a partially written file. The temporary file is removed if
+    writing fails. Other arguments are passed on to `json.dump`.
+    """
+    tmp_path = "{}.{}.tmp".format(path, os.getpid())
+    try:
+        with open(tmp_path, "w") as fw:
+            json.dump(data, fw, **kwargs)
+        replace_file(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+_CRYSTAL_STRUCTURE_DICT_KEYS = [
+    "symbols",
+    "positions",
+    "scaled_positions",
+    "cell",
+    "pbc",
+]
+
+
+def crystal_structure_from_dict(crystal_structure):
+    """Build an `ase.Atoms` object from a dictionary of (inline) arrays.
+
+    Parameters
+    ----------
+    crystal_structure: dict
+        Dictionary with the chemical "symbols" (a list, or a formula such as
+        "Fe2O2"), the "cell" (3x3 nested lists), and either the Cartesian
+        "positions" or the "scaled_positions" (Nx3 nested lists) of all
+        atoms, and optionally the periodicity "pbc" (default: True), e.g. as
+        read from JSON.
+
+    Returns
+    -------
+    The crystal structure as an `ase.Atoms` object.
+
+    """
+    if not isinstance(crystal_structure, dict):
+        msg = "Expected type dict; found {}".format(type(crystal_structure))
+        raise TypeError(msg)
+    unknown = set(crystal_structure) - set(_CRYSTAL_STRUCTURE_DICT_KEYS)
+    if unknown:
+        msg = "Unknown crystal structure keys: {}".format(sorted(unknown))
+        raise ValueError(msg)
+    missing = {"symbols", "cell"} - set(crystal_structure)
+    if missing:
+        msg = "Missing crystal structure keys: {}".format(sorted(missing))
+        raise ValueError(msg)
+    positions_keys = {"positions", "scaled_positions"} & set(crystal_structure)
+    if len(positions_keys) != 1:
+        msg = 'Expected exactly one of "positions" or "scaled_positions"'
+        raise ValueError(msg)
+    kwargs = {"pbc": True}
+    kwargs.update(crystal_structure)
+    return Atoms(**kwargs)
+
+
+def _find_primitive_cell(cell, scaled_positions, kinds, symprec):
+    """Primitive cell, positions and kinds of atoms (using spglib)."""
+    # optional dependency: imported here, only if needed
+    try:
+        import spglib
+    except ImportError:
+        msg = 'Finding the primitive cell requires the "spglib" package'
+        raise DftInputGeneratorUtilsError(msg)
+    unique_kinds = sorted(set(kinds))
+    numbers = [unique_kinds.index(k) + 1 for k in kinds]
+    primitive = spglib.standardize_cell(
+        (cell, scaled_positions, numbers),
+        to_primitive=True,
+        no_idealize=True,
+        symprec=symprec,
+    )
+    if primitive is None:
+        msg = "Could not find the primitive cell (spglib)"
+        raise DftInputGeneratorUtilsError(msg)
+    cell, scaled_positions, numbers = primitive
+    kinds = [unique_kinds[n - 1] for n in numbers]
+    return cell, scaled_positions, kinds
+
+
+def reduce_crystal_structure(
+    crystal_structure, primitive=True, niggli=True, symprec=1e-5
+):
+    """Reduce a crystal structure to its (Niggli-reduced) primitive cell.
+
+    Conventional cells and supercells are reduced to the smallest cell
+    with the same crystal structure, i.e. the primitive cell, which is then
+    transformed to the unique Niggli-reduced cell (with the shortest, most
+    orthogonal lattice vectors). Atoms with the same chemical symbol but
+    different initial magnetic moments are not considered equivalent.
+
+    Parameters
+    ----------
+    crystal_structure: `ase.Atoms` object
+        Crystal structure (or :class:`ArrayStructure
+        <dftinputgen.structure.ArrayStructure>`) to reduce. Must be periodic
+        along all lattice vectors.
+
+    primitive: bool, optional
+        Whether to find the primitive cell. Requires the `spglib` package.
+
+        Default: True
+
+    niggli: bool, optional
+        Whether to Niggli-reduce the cell.
+
+        Default: True
+
+    symprec: float, optional
+        Tolerance (in Angstrom) for atoms to be considered equivalent when
+        finding the primitive cell.
+
+        Default: 1e-5
+
+    Returns
+    -------
+    The reduced crystal structure, of the same type as `crystal_structure`
+    (positions are wrapped into the reduced cell).
+
+    """
+    if not all(crystal_structure.get_pbc()):
+        msg = "Can only reduce crystal structures periodic in 3D"
+        raise DftInputGeneratorUtilsError(msg)
+    cell = np.array(crystal_structure.get_cell(), dtype=float)
+    scaled_positions = np.array(crystal_structure.get_scaled_positions())
+    kinds = list(crystal_structure.get_chemical_symbols())
+    has_magmoms = isinstance(crystal_structure, Atoms) and (
+        crystal_structure.has("initial_magmoms")
+    )
+    if has_magmoms:
+        magmoms = crystal_structure.get_initial_magnetic_moments()
+        kinds = [
+            (symbol, tuple(np.ravel(magmom).tolist()))
+            for symbol, magmom in zip(kinds, magmoms)
+        ]
+    if primitive:
+        cell, scaled_positions, kinds = _find_primitive_cell(
+            cell, scaled_positions, kinds, symprec
+        )
+    if niggli:
+        cell, op = niggli_reduce_cell(cell)
+        scaled_positions = np.dot(scaled_positions, np.linalg.inv(op).T)
+    scaled_positions = scaled_positions % 1.0 % 1.0
+    if isinstance(crystal_structure, ArrayStructure):
+        return ArrayStructure(kinds, cell, scaled_positions)
+    if not has_magmoms:
+        return Atoms(
+            symbols=kinds,
+            cell=cell,
+            scaled_positions=scaled_positions,
+            pbc=True,
+        )
+    # magnetic moments of shape (N,) (collinear) or (N, 3) (non-collinear)
+    shape = (len(kinds),) + magmoms.shape[1:]
+    return Atoms(
+        symbols=[k[0] for k in kinds],
+        cell=cell,
+        scaled_positions=scaled_positions,
+        magmoms=np.reshape([k[1] for k in kinds], shape),
+        pbc=True,
+    )
+
+
+DEFAULT_MIN_VACUUM = 6.0
+"""Minimum empty space (in Angstrom) along a lattice vector for vacuum."""
+
+
+def get_vacuum_directions(crystal_structure, min_vacuum=None):
+    """Find the lattice directions along which a structure is not periodic.
+
+    Along every lattice vector, the largest gap between (periodic images
+    of) atoms is measured perpendicular to the planes spanned by the other
+    two lattice vectors. Directions with a gap of at least `min_vacuum`
+    (e.g. the surface normal of a slab model, or all directions for a
+    molecule in a box), and directions that are not periodic (`pbc`), are
+    considered vacuum directions.
+
+    Parameters
+    ----------
+    crystal_structure: `ase.Atoms` object
+        Crystal structure (or :class:`ArrayStructure
+        <dftinputgen.structure.ArrayStructure>`) to check for vacuum.
+
+    min_vacuum: float, optional
+        Minimum gap, in Angstrom, for a direction to be considered vacuum.
+
+        Default: :data:`DEFAULT_MIN_VACUUM` (6 Angstrom)
+
+    Returns
+    -------
+    List of 3 bools, True for every vacuum lattice direction.
+
+    """
+    if min_vacuum is None:
+        min_vacuum = DEFAULT_MIN_VACUUM
+    cell = np.array(crystal_structure.get_cell(), dtype=float)
+    # distance between lattice planes = 1/|reciprocal lattice vector|
+    plane_spacings = 1.0 / np.linalg.norm(np.linalg.inv(cell).T, axis=1)
+    frac = np.asarray(crystal_structure.get_scaled_positions()) % 1.0
+    pbc = crystal_structure.get_pbc()
+    vacuum = []
+    for i in range(3):
+        if not len(frac):
+            vacuum.append(True)
+            continue
+        coords = np.sort(frac[:, i])
+        gaps = np.diff(np.append(coords, coords[0] + 1.0))
+        gap = gaps.max() * plane_spacings[i]
+        vacuum.append(bool(not pbc[i] or gap >= min_vacuum))
+    return vacuum
+
+
+def get_dimensionality(crystal_structure, min_vacuum=None):
+    """Number of periodic directions (no vacuum) of a crystal structure.
+
+    3 for bulk, 2 for slabs, 1 for wires, 0 for isolated molecules/clusters
+    (see :func:`get_vacuum_directions`).
+    """
+    return 3 - sum(get_vacuum_directions(crystal_structure, min_vacuum))
+
+
+def get_kpoint_grid_from_spacing(crystal_structure, spacing, min_vacuum=None):
     """Get k-point grid for an input crystal structure and k-spacing.
 
     Returns a list [k1, k2, k3] with the dimensions of a uniform
-    k-point grid corresponding to the input `spacing`.
+    k-point grid corresponding to the input `spacing`. If `min_vacuum` is
+    specified, a single k-point is used along vacuum directions (see
+    :func:`get_vacuum_directions`).
 
     Parameters
     ----------
@@ -53,10 +371,66 @@ def get_kpoint_grid_from_spacing(crystal_structure, spacing):
         Maximum distance between two k-points on a uniform grid in reciprocal
         space.
 
+    min_vacuum: float, optional
+        Minimum gap, in Angstrom, for a lattice direction to be considered
+        vacuum (and get a single k-point). If not specified, vacuum is not
+        detected.
+
     Returns
     -------
     k-point grid as a 3 x 1 list of integers.
 
     """
     rcell = 2 * np.pi * (np.linalg.inv(crystal_structure.cell).T)
-    return list(map(int, np.ceil(np.linalg.norm(rcell, axis=1) / spacing)))
+    grid = list(map(int, np.ceil(np.linalg.norm(rcell, axis=1) / spacing)))
+    if min_vacuum is not None:
+        vacuum = get_vacuum_directions(crystal_structure, min_vacuum)
+        grid = [1 if v else n for n, v in zip(grid, vacuum)]
+    return grid
+
+
+def get_kpoint_grids_from_spacing(
+    crystal_structures, spacing, min_vacuum=None
+):
+    """Get k-point grids for many crystal structures with the same k-spacing.
+
+    Vectorized version of :func:`get_kpoint_grid_from_spacing`: the cells of
+    all crystal structures are inverted in a single call.
+
+    Parameters
+    ----------
+    crystal_structures: list of `ase.Atoms` objects, or array of cells
+        Crystal structures for which to calculate k-point grids, or their
+        cells as an array of shape (N, 3, 3).
+
+    spacing: float
+        Maximum distance between two k-points on a uniform grid in reciprocal
+        space.
+
+    min_vacuum: float, optional
+        Minimum gap, in Angstrom, for a lattice direction to be considered
+        vacuum (and get a single k-point). Requires crystal structures (not
+        cells). If not specified, vacuum is not detected.
+
+    Returns
+    -------
+    k-point grids as a N x 3 list of integers.
+
+    """
+    if min_vacuum is not None and isinstance(crystal_structures, np.ndarray):
+        msg = "Vacuum detection requires crystal structures, not cells"
+        raise TypeError(msg)
+    if isinstance(crystal_structures, np.ndarray):
+        cells = crystal_structures.reshape(-1, 3, 3)
+    else:
+        cells = np.array(
+            [getattr(cs, "cell", cs) for cs in crystal_structures], dtype=float
+        ).reshape(-1, 3, 3)
+    rcells = 2 * np.pi * np.linalg.inv(cells).transpose(0, 2, 1)
+    grids = np.ceil(np.linalg.norm(rcells, axis=2) / spacing)
+    grids = grids.astype(int).tolist()
+    if min_vacuum is not None:
+        for grid, crystal_structure in zip(grids, crystal_structures):
+            vacuum = get_vacuum_directions(crystal_structure, min_vacuum)
+            grid[:] = [1 if v else n for n, v in zip(grid, vacuum)]
+    return grids
@@ -6,6 +6,10 @@ import argparse
 from dftinputgen.utils import read_crystal_structure
 from dftinputgen.demo.pwx import _get_default_parser
 from dftinputgen.demo.pwx import build_pwx_parser
+from dftinputgen.demo.pwx import build_pwx_batch_parser
+from dftinputgen.demo.pwx import generate_pwx_input_files_from_manifest
+from dftinputgen.demo.pwx import build_pwx_cost_parser
+from dftinputgen.demo.pwx import report_pwx_cost
 from dftinputgen.demo.pwx import run_demo
 
 
@@ -41,6 +45,15 @@ def test_get_parser_default_args():
     assert args.custom_settings_file is None
     assert args.custom_settings_dict == {}
     assert not args.specify_potentials
+    assert args.crystal_structures is None
+    assert args.num_workers is None
+    assert args.chunk_size is None
+    assert not args.use_input_cache
+    assert args.profile is None
+    assert args.io_threads is None
+    assert args.archive_format is None
+    assert args.shard_size is None
+    assert not args.reduce_structure
 
 
 def test_get_parser_input_args(capsys):
@@ -53,6 +66,12 @@ def test_get_parser_input_args(capsys):
     stderr = capsys.readouterr().err
     assert "invalid choice" in stderr
 
+    # single and bulk crystal structure inputs are mutually exclusive
+    with pytest.raises(SystemExit):
+        parser.parse_args(["-i", feo_file, "-bulk", feo_file])
+    stderr = capsys.readouterr().err
+    assert "not allowed with" in stderr
+
     # all ok
     args = parser.parse_args(
         [
@@ -104,3 +123,222 @@ def test_run_demo():
     with open(feo_scf_ref_in, "r") as fr:
         reference = fr.read().rstrip("\n")
     assert test == reference
+
+
+def test_run_demo_bulk(capsys):
+    import shutil
+    import tempfile
+
+    write_location = tempfile.mkdtemp()
+    args = [
+        "-bulk",
+        feo_file,
+        "missing.vasp",
+        "-pre",
+        "scf",
+        "-file",
+        sett_file,
+        "-dict",
+        '{"ecutwfc": 45}',
+        "-loc",
+        write_location,
+        "-np",
+        "1",
+        "-io",
+        "2",
+    ]
+    with pytest.raises(SystemExit) as exc_info:
+        run_demo(args)
+    assert exc_info.value.code == 1
+    stderr = capsys.readouterr().err
+    assert "Failed [missing]" in stderr
+    assert "Wrote 1 of 2 input files" in stderr
+
+    with open(os.path.join(write_location, "feo_poscar", "scf.in")) as fr:
+        test = fr.read()
+    with open(feo_scf_ref_in, "r") as fr:
+        reference = fr.read().rstrip("\n")
+    assert test == reference
+    shutil.rmtree(write_location)
+
+
+def test_run_demo_bulk_same_file_names(capsys, tmpdir):
+    import shutil
+
+    write_location = str(tmpdir.mkdir("out"))
+    structures = []
+    for subdir in ["a", "b", os.path.join("c", "d")]:
+        structure = str(tmpdir.join(subdir, "POSCAR"))
+        os.makedirs(os.path.dirname(structure))
+        shutil.copy(feo_file, structure)
+        structures.append(structure)
+    args = ["-bulk"] + structures + ["-pre", "scf", "-loc", write_location]
+    run_demo(args + ["-np", "1"])
+    assert "Wrote 3 of 3 input files" in capsys.readouterr().err
+    assert sorted(os.listdir(write_location)) == ["a", "b", "c_d"]
+    assert os.path.isfile(os.path.join(write_location, "c_d", "scf.in"))
+
+    # the same file twice
+    with pytest.raises(SystemExit) as exc_info:
+        run_demo(["-bulk", feo_file, feo_file, "-pre", "scf"])
+    assert exc_info.value.code == 2
+    assert "duplicate" in capsys.readouterr().err
+
+
+def test_run_demo_frames(capsys, tmpdir):
+    from ase import io as ase_io
+
+    write_location = str(tmpdir)
+    frames_file = os.path.join(write_location, "frames.extxyz")
+    ase_io.write(frames_file, [read_crystal_structure(feo_file)] * 3)
+    args = [
+        "-frames",
+        frames_file,
+        "-index",
+        "::2",
+        "-pre",
+        "scf",
+        "-file",
+        sett_file,
+        "-loc",
+        write_location,
+        "-np",
+        "1",
+    ]
+    run_demo(args + ["-cache"])
+    stderr = capsys.readouterr().err
+    assert "Wrote 2 of 2 input files (0 skipped, 0 failed)" in stderr
+    assert os.path.isfile(os.path.join(write_location, "000000", "scf.in"))
+    assert os.path.isfile(os.path.join(write_location, "000002", "scf.in"))
+    assert not os.path.exists(os.path.join(write_location, "000001"))
+    # up-to-date input files are skipped
+    run_demo(args + ["-cache"])
+    stderr = capsys.readouterr().err
+    assert "Wrote 0 of 2 input files (2 skipped, 0 failed)" in stderr
+
+    # frames that cannot be reduced: failure exit code
+    molecule = read_crystal_structure(feo_file)
+    molecule.pbc = False
+    ase_io.write(frames_file, [molecule])
+    with pytest.raises(SystemExit) as exc_info:
+        run_demo(args + ["-reduce"])
+    assert exc_info.value.code == 1
+    stderr = capsys.readouterr().err
+    assert "Wrote 0 of 1 input files (0 skipped, 1 failed)" in stderr
+
+
+def test_run_demo_profile(capsys, tmpdir):
+    write_location = str(tmpdir)
+    args = ["-i", feo_file, "-pre", "scf", "-loc", write_location]
+    # stats are written to stderr
+    run_demo(args + ["-profile"])
+    stats = json.loads(capsys.readouterr().err)
+    assert stats["write_pwx_input"]["calls"] == 1
+    # stats are written to the specified file, in bulk mode too
+    profile_file = str(tmpdir.join("profile.json"))
+    run_demo(
+        ["-bulk", feo_file, "-pre", "scf", "-loc", write_location, "-np", "1"]
+        + ["--profile", profile_file]
+    )
+    with open(profile_file, "r") as fr:
+        stats = json.load(fr)
+    assert stats["read_crystal_structure"]["calls"] == 1
+    frames_file = str(tmpdir.join("frames.extxyz"))
+    read_crystal_structure(feo_file).write(frames_file)
+    run_demo(
+        ["-frames", frames_file, "-pre", "scf", "-loc", write_location]
+        + ["-np", "1", "--profile", profile_file]
+    )
+    with open(profile_file, "r") as fr:
+        stats = json.load(fr)
+    assert stats["write_pwx_input"]["calls"] == 1
+
+
+def test_run_demo_archive(capsys, tmpdir):
+    write_location = str(tmpdir)
+    args = ["-bulk", feo_file, "-pre", "scf", "-loc", write_location]
+    run_demo(args + ["-np", "1", "-archive", "zip", "-shard", "10"])
+    assert "Wrote 1 of 1 input files" in capsys.readouterr().err
+    assert sorted(os.listdir(write_location)) == [
+        "pwx_inputs_00000.zip",
+        "pwx_inputs_index.json",
+    ]
+
+
+def test_generate_pwx_input_files_from_manifest(capsys, tmpdir):
+    write_location = str(tmpdir)
+    manifest_file = str(tmpdir.join("manifest.jsonl"))
+    with open(manifest_file, "w") as fw:
+        item = {
+            "name": "feo",
+            "crystal_structure": feo_file,
+            "custom_sett_dict": {"ecutwfc": 45},
+        }
+        fw.write(json.dumps(item))
+        fw.write("\n{}\n".format(json.dumps({"crystal_structure": "x"})))
+    parser = _get_default_parser()
+    build_pwx_batch_parser(parser)
+    args = [manifest_file, "-pre", "scf", "-file", sett_file]
+    args += ["-loc", write_location, "-np", "1"]
+    with pytest.raises(SystemExit) as exc_info:
+        generate_pwx_input_files_from_manifest(parser.parse_args(args))
+    assert exc_info.value.code == 1
+    stderr = capsys.readouterr().err
+    assert "\rProcessed 2 items (1 failed)\n" in stderr
+    assert "Failed [000001]" in stderr
+    assert "Wrote 1 of 2 input files" in stderr
+    with open(os.path.join(write_location, "feo", "scf.in")) as fr:
+        test = fr.read()
+    with open(feo_scf_ref_in, "r") as fr:
+        reference = fr.read().rstrip("\n")
+    assert test == reference
+    # no progress reported in quiet mode
+    profile_file = str(tmpdir.join("profile.json"))
+    args += ["-q", "-profile", profile_file]
+    with pytest.raises(SystemExit) as exc_info:
+        generate_pwx_input_files_from_manifest(parser.parse_args(args))
+    assert exc_info.value.code == 1
+    stderr = capsys.readouterr().err
+    assert "Processed" not in stderr
+    assert "Wrote 1 of 2 input files (0 skipped, 1 failed)" in stderr
+    with open(profile_file, "r") as fr:
+        assert json.load(fr)["write_pwx_input"]["calls"] == 1
+    # up-to-date input files are skipped, not reported as written
+    for _ in range(2):
+        with pytest.raises(SystemExit):
+            generate_pwx_input_files_from_manifest(
+                parser.parse_args(args + ["-cache"])
+            )
+    stderr = capsys.readouterr().err
+    assert "Wrote 0 of 2 input files (1 skipped, 1 failed)" in stderr
+
+
+def test_report_pwx_cost(capsys):
+    parser = _get_default_parser()
+    build_pwx_cost_parser(parser)
+    args = ["-i", feo_file, "-pre", "scf", "-cores", "16", "-nodes", "2"]
+    report_pwx_cost(parser.parse_args(args))
+    stdout = capsys.readouterr().out
+    assert "Valence electrons" in stdout
+    assert "mpirun -np 32 pw.x" in stdout
+    assert "-in scf.in" in stdout
+    args += ["-mem", "64", "-zval", '{"Fe": 16}', "-o", "pw.in", "-json"]
+    report_pwx_cost(parser.parse_args(args))
+    report = json.loads(capsys.readouterr().out)
+    assert report["cost"]["valence_electrons"]["Fe"] == 16
+    assert report["layout"]["command"].endswith("-in pw.in")
+
+
+def test_run_demo_reduce_structure(capsys, tmpdir):
+    args = ["-i", feo_file, "-pre", "scf", "-reduce"]
+    run_demo(args + ["-loc", str(tmpdir)])
+    stderr = capsys.readouterr().err
+    assert "from 2 to 2 atoms (factor 1)" in stderr
+    assert tmpdir.join("scf.in").check()
+
+    parser = _get_default_parser()
+    build_pwx_cost_parser(parser)
+    report_pwx_cost(parser.parse_args(args))
+    captured = capsys.readouterr()
+    assert "from 2 to 2 atoms" in captured.err
+    assert "Valence electrons" in captured.out
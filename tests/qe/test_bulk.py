@@ -0,0 +1,628 @@
+"""Unit tests for bulk pw.x input generation in :mod:`dftinputgen.qe.bulk`."""
+
+import os
+import json
+import shutil
+import tarfile
+import pytest
+import tempfile
+
+from ase import io as ase_io
+
+from dftinputgen.qe.pwx import PwxInputGeneratorError
+from dftinputgen.archive import ArchiveWriterError
+from dftinputgen.profiling import TimingStats
+from dftinputgen.structure import iter_array_structures
+from dftinputgen.qe.bulk import _FileWriter
+from dftinputgen.qe.bulk import _get_default_names
+from dftinputgen.qe.bulk import write_pwx_input_files
+from dftinputgen.qe.bulk import write_pwx_input_files_from_frames
+from dftinputgen.qe.bulk import write_pwx_input_files_from_manifest
+
+
+test_data_dir = os.path.join(os.path.dirname(__file__), "files")
+pseudo_dir = test_data_dir
+feo_file = os.path.join(test_data_dir, "feo_conv.vasp")
+al_fcc_file = os.path.join(test_data_dir, "al_fcc_conv.vasp")
+al_fcc_struct = ase_io.read(al_fcc_file)
+feo_struct = ase_io.read(feo_file)
+with open(os.path.join(test_data_dir, "TEST_feo_conv_scf.in"), "r") as fr:
+    feo_scf_in = fr.read().format(pseudo_dir=pseudo_dir).rstrip("\n")
+with open(os.path.join(test_data_dir, "TEST_al_fcc_conv_scf.in"), "r") as fr:
+    al_fcc_scf_in = fr.read().format(pseudo_dir=pseudo_dir).rstrip("\n")
+
+
+@pytest.fixture
+def write_location():
+    tmp_dir = tempfile.mkdtemp()
+    yield tmp_dir
+    shutil.rmtree(tmp_dir)
+
+
+def _read(*path):
+    with open(os.path.join(*path), "r") as fr:
+        return fr.read()
+
+
+def test_get_default_names():
+    assert _get_default_names([]) == []
+    assert _get_default_names(["a"]) == ["0"]
+    assert _get_default_names(list(range(11)))[:2] == ["00", "01"]
+
+
+def test_write_pwx_input_files_bad_names():
+    with pytest.raises(PwxInputGeneratorError, match="Expected 2 names"):
+        write_pwx_input_files([feo_file, al_fcc_file], names=["a"])
+    with pytest.raises(PwxInputGeneratorError, match="unique"):
+        write_pwx_input_files([feo_file, al_fcc_file], names=["a", "a"])
+    # names are subdirectory names: nothing is written outside
+    for name, match in [
+        ("a/b", "path separator"),
+        ("../a", "path separator"),
+        (os.path.abspath("a"), "path separator"),
+        ("..", "Invalid name"),
+        ("", "Invalid name"),
+        (1, "Invalid name"),
+    ]:
+        with pytest.raises(PwxInputGeneratorError, match=match):
+            write_pwx_input_files([feo_file, al_fcc_file], names=["a", name])
+
+
+@pytest.mark.parametrize("num_workers", [1, 2])
+def test_write_pwx_input_files(write_location, num_workers):
+    structures = [feo_file, al_fcc_struct, "missing.vasp", feo_file]
+    failures = write_pwx_input_files(
+        structures,
+        write_location=write_location,
+        num_workers=num_workers,
+        chunk_size=2,
+        calculation_presets="scf",
+        custom_sett_dict={"pseudo_dir": pseudo_dir},
+        specify_potentials=True,
+    )
+    # failures are reported, without aborting the rest of the batch
+    assert len(failures) == 1
+    assert failures[0][0] == "2"
+    assert sorted(os.listdir(write_location)) == ["0", "1", "3"]
+    assert _read(write_location, "0", "scf.in") == feo_scf_in
+    assert _read(write_location, "1", "scf.in") == al_fcc_scf_in
+    assert _read(write_location, "3", "scf.in") == feo_scf_in
+
+
+def test_write_pwx_input_files_array_structures(write_location):
+    structures = iter_array_structures(
+        al_fcc_struct.get_chemical_symbols(),
+        [al_fcc_struct.get_cell()] * 2,
+        [al_fcc_struct.get_scaled_positions()] * 2,
+    )
+    failures = write_pwx_input_files(
+        structures,
+        write_location=write_location,
+        num_workers=2,
+        chunk_size=1,
+        calculation_presets="scf",
+        custom_sett_dict={"pseudo_dir": pseudo_dir},
+        specify_potentials=True,
+    )
+    assert not failures
+    assert _read(write_location, "0", "scf.in") == al_fcc_scf_in
+    assert _read(write_location, "1", "scf.in") == al_fcc_scf_in
+
+
+def test_write_pwx_input_files_errors(write_location):
+    # no input settings: nothing to write
+    failures = write_pwx_input_files(
+        [feo_file], names=["feo"], write_location=write_location, num_workers=1
+    )
+    assert len(failures) == 1
+    assert failures[0][0] == "feo"
+    assert "Nothing to write" in failures[0][1]
+    # missing pseudopotentials
+    failures = write_pwx_input_files(
+        [feo_file, al_fcc_file],
+        names=["feo", "al"],
+        write_location=write_location,
+        num_workers=1,
+        calculation_presets="scf",
+        custom_sett_dict={"pseudo_dir": os.path.dirname(pseudo_dir)},
+        specify_potentials=True,
+    )
+    assert [f[0] for f in failures] == ["feo", "al"]
+    assert "Failed to find potential" in failures[0][1]
+    # failure to set up the generator for every item: error for every item
+    failures = write_pwx_input_files(
+        ["missing.vasp", feo_file, al_fcc_file],
+        write_location=write_location,
+        num_workers=1,
+        custom_sett_file="missing_settings.json",
+    )
+    assert [f[0] for f in failures] == ["0", "1", "2"]
+    assert "missing_settings.json" in failures[1][1]
+
+
+def test_write_pwx_input_files_bad_first_item(write_location):
+    # generator cannot be set up with the first structure: only that fails
+    slab = feo_struct.copy()
+    slab.set_pbc([True, True, False])
+    failures = write_pwx_input_files(
+        [slab, al_fcc_struct, feo_struct],
+        names=["slab", "al", "feo"],
+        write_location=write_location,
+        num_workers=1,
+        calculation_presets="scf",
+        custom_sett_dict={"pseudo_dir": pseudo_dir},
+        reduce_structure=True,
+    )
+    assert [f[0] for f in failures] == ["slab"]
+    assert "periodic" in failures[0][1]
+    assert not os.path.exists(os.path.join(write_location, "slab"))
+    assert "nat = 1" in _read(write_location, "al", "scf.in")
+    assert "nat = 2" in _read(write_location, "feo", "scf.in")
+
+
+def test_write_pwx_input_files_singular_cell(write_location, monkeypatch):
+    import ase
+    import numpy as np
+
+    # singular cell in a chunk: only that structure fails
+    bad_struct = ase.Atoms("Fe", cell=np.zeros((3, 3)), pbc=True)
+    kwargs = {
+        "write_location": write_location,
+        "num_workers": 1,
+        "calculation_presets": "scf",
+        "custom_sett_dict": {"pseudo_dir": pseudo_dir},
+    }
+    names = ["al", "bad", "feo"]
+    structures = [al_fcc_struct, bad_struct, feo_struct]
+    failures = write_pwx_input_files(structures, names=names, **kwargs)
+    assert [f[0] for f in failures] == ["bad"]
+    assert os.path.isfile(os.path.join(write_location, "feo", "scf.in"))
+
+    # any error computing the grids in a batch: grids computed per item
+    def _fail(*args, **kwargs):
+        raise RuntimeError("batch grids")
+
+    monkeypatch.setattr(
+        "dftinputgen.qe.pwx.get_kpoint_grids_from_spacing", _fail
+    )
+    failures = write_pwx_input_files(structures, names=names, **kwargs)
+    assert [f[0] for f in failures] == ["bad"]
+    assert "9 9 9 0 0 0" in _read(write_location, "feo", "scf.in")
+
+
+def test_write_pwx_input_files_defaults(write_location, monkeypatch):
+    monkeypatch.chdir(write_location)
+    failures = write_pwx_input_files(
+        [feo_file], calculation_presets="scf", pwx_input_file="pw.in"
+    )
+    assert not failures
+    assert os.path.isfile(os.path.join(write_location, "0", "pw.in"))
+
+
+@pytest.mark.parametrize("num_workers", [1, 2])
+def test_write_pwx_input_files_from_frames(write_location, num_workers):
+    frames_file = os.path.join(write_location, "frames.extxyz")
+    ase_io.write(frames_file, [feo_struct, al_fcc_struct] * 3)
+    failures = write_pwx_input_files_from_frames(
+        frames_file,
+        index="1:",
+        write_location=write_location,
+        num_workers=num_workers,
+        chunk_size=1,
+        calculation_presets="scf",
+        custom_sett_dict={"pseudo_dir": pseudo_dir},
+        specify_potentials=True,
+    )
+    assert not failures
+    # named after the index of the frame in the file
+    names = ["{:06d}".format(i) for i in range(1, 6)]
+    assert sorted(os.listdir(write_location)) == names + ["frames.extxyz"]
+    assert "Al" in _read(write_location, "000001", "scf.in")
+    assert "Fe" in _read(write_location, "000002", "scf.in")
+
+
+@pytest.mark.parametrize(
+    "index,names",
+    [
+        ("::2", ["0", "2", "4"]),
+        ("1:4", ["1", "2", "3"]),
+        (3, ["3"]),
+        ("-2:", ["4", "5"]),
+        (-1, ["5"]),
+    ],
+)
+def test_write_pwx_input_files_from_frames_index(
+    write_location, index, names
+):
+    frames_file = os.path.join(write_location, "frames.extxyz")
+    ase_io.write(frames_file, [feo_struct, al_fcc_struct] * 3)
+    failures = write_pwx_input_files_from_frames(
+        frames_file, index=index, name_format="{}", num_workers=1
+    )
+    # no input settings: nothing to write
+    assert [f[0] for f in failures] == names
+
+
+def test_write_pwx_input_files_from_frames_defaults(
+    write_location, monkeypatch
+):
+    frames_file = os.path.join(write_location, "frames.extxyz")
+    ase_io.write(frames_file, [feo_struct] * 2)
+    monkeypatch.chdir(write_location)
+    failures = write_pwx_input_files_from_frames(
+        frames_file,
+        read_kwargs={"format": "extxyz"},
+        name_format="frame_{}",
+        num_workers=1,
+    )
+    # no input settings: nothing to write
+    assert [f[0] for f in failures] == ["frame_0", "frame_1"]
+    assert "Nothing to write" in failures[0][1]
+
+
+@pytest.mark.parametrize("num_workers", [1, 2])
+def test_write_pwx_input_files_cache(write_location, num_workers):
+    kwargs = {
+        "write_location": write_location,
+        "num_workers": num_workers,
+        "chunk_size": 1,
+        "calculation_presets": "scf",
+        "custom_sett_dict": {"pseudo_dir": pseudo_dir},
+        "specify_potentials": True,
+        "use_input_cache": True,
+    }
+    names = ["feo", "al"]
+    structures = [feo_file, al_fcc_struct]
+    assert not write_pwx_input_files(structures, names=names, **kwargs)
+    manifest_file = os.path.join(write_location, ".dftinputgen_manifest.json")
+    assert os.path.isfile(manifest_file)
+    feo_mtime = os.stat(os.path.join(write_location, "feo", "scf.in"))
+    al_mtime = os.stat(os.path.join(write_location, "al", "scf.in"))
+
+    # only the changed structure is rewritten
+    os.remove(os.path.join(write_location, "al", "scf.in"))
+    structures = [feo_file, al_fcc_struct.copy()]
+    structures[1].positions[0, 0] += 0.1
+    skipped = []
+    assert not write_pwx_input_files(
+        structures, names=names, skipped=skipped, **kwargs
+    )
+    assert skipped == ["feo"]
+    assert os.stat(os.path.join(write_location, "feo", "scf.in")) == feo_mtime
+    assert os.path.isfile(os.path.join(write_location, "al", "scf.in"))
+    with open(manifest_file, "r") as fr:
+        entries = json.load(fr)["entries"]
+    assert sorted(entries) == [
+        os.path.join("al", "scf.in"),
+        os.path.join("feo", "scf.in"),
+    ]
+    assert entries[os.path.join("al", "scf.in")]["mtime"] != al_mtime.st_mtime
+
+    # changed settings: everything is rewritten
+    kwargs["custom_sett_dict"] = {"pseudo_dir": pseudo_dir, "ecutwfc": 45}
+    assert not write_pwx_input_files(structures, names=names, **kwargs)
+    assert "ecutwfc = 45" in _read(write_location, "feo", "scf.in")
+    assert "ecutwfc = 45" in _read(write_location, "al", "scf.in")
+
+
+def test_write_pwx_input_files_cache_reduce_once(write_location, monkeypatch):
+    from dftinputgen.qe import pwx
+
+    # structures are reduced only once, also when hashed for the cache
+    num_calls = []
+    reduce_crystal_structure = pwx.reduce_crystal_structure
+
+    def _reduce(crystal_structure):
+        num_calls.append(1)
+        return reduce_crystal_structure(crystal_structure)
+
+    monkeypatch.setattr(pwx, "reduce_crystal_structure", _reduce)
+    failures = write_pwx_input_files(
+        [feo_struct, al_fcc_struct],
+        names=["feo", "al"],
+        write_location=write_location,
+        num_workers=1,
+        calculation_presets="scf",
+        custom_sett_dict={"pseudo_dir": pseudo_dir},
+        reduce_structure=True,
+        use_input_cache=True,
+    )
+    assert not failures
+    assert len(num_calls) == 2
+    assert "nat = 2" in _read(write_location, "feo", "scf.in")
+
+
+def test_write_pwx_input_files_no_overwrite(write_location):
+    os.makedirs(os.path.join(write_location, "feo"))
+    with open(os.path.join(write_location, "feo", "scf.in"), "w") as fw:
+        fw.write("existing")
+    skipped = []
+    failures = write_pwx_input_files(
+        [feo_file, feo_file],
+        names=["feo", "feo_new"],
+        write_location=write_location,
+        num_workers=1,
+        calculation_presets="scf",
+        custom_sett_dict={"pseudo_dir": pseudo_dir},
+        specify_potentials=True,
+        overwrite_files=False,
+        skipped=skipped,
+    )
+    assert not failures
+    assert skipped == ["feo"]
+    assert _read(write_location, "feo", "scf.in") == "existing"
+    assert _read(write_location, "feo_new", "scf.in") == feo_scf_in
+
+
+@pytest.mark.parametrize("num_workers", [1, 2])
+def test_write_pwx_input_files_timing_stats(write_location, num_workers):
+    timing_stats = TimingStats()
+    failures = write_pwx_input_files(
+        [feo_file, al_fcc_struct, "missing.vasp"],
+        write_location=write_location,
+        num_workers=num_workers,
+        chunk_size=2,
+        timing_stats=timing_stats,
+        calculation_presets="scf",
+        custom_sett_dict={"pseudo_dir": pseudo_dir},
+        specify_potentials=True,
+    )
+    assert len(failures) == 1
+    stats = timing_stats.as_dict()
+    assert stats["read_crystal_structure"]["calls"] == 2
+    assert stats["write_pwx_input"]["calls"] == 2
+    assert stats["atomic_positions_card"]["calls"] == 2
+    assert stats["kpoint_grids"]["calls"] == 1
+
+
+@pytest.mark.parametrize("num_threads", [None, 1, 3])
+def test_file_writer(write_location, num_threads):
+    done = []
+
+    def _on_done(key, err, wall_time):
+        assert wall_time >= 0
+        done.append((key, err))
+
+    # a file in place of a directory to write in: error
+    with open(os.path.join(write_location, "blocked"), "w") as fw:
+        fw.write("")
+    writer = _FileWriter(_on_done, num_threads=num_threads)
+    for i in range(10):
+        name = "blocked" if i == 4 else "dir_{}".format(i)
+        filename = os.path.join(write_location, name, "pwx.in")
+        writer.submit(i, filename, "input {}".format(i))
+        # pending writes are bounded
+        assert i - len(done) < 2 * (num_threads or 0) + 1
+    writer.close()
+    # completion is reported for every write, in order
+    assert [d[0] for d in done] == list(range(10))
+    errors = [(d[0], d[1]) for d in done if d[1] is not None]
+    assert len(errors) == 1
+    assert errors[0][0] == 4
+    assert isinstance(errors[0][1], (IOError, OSError))
+    assert _read(write_location, "dir_9", "pwx.in") == "input 9"
+
+
+def test_write_pwx_input_files_io_threads(write_location):
+    timing_stats = TimingStats()
+    with open(os.path.join(write_location, "blocked"), "w") as fw:
+        fw.write("")
+    failures = write_pwx_input_files(
+        [feo_file, al_fcc_struct, feo_file],
+        names=["feo", "blocked", "feo_2"],
+        write_location=write_location,
+        num_workers=1,
+        io_threads=2,
+        timing_stats=timing_stats,
+        use_input_cache=True,
+        calculation_presets="scf",
+        custom_sett_dict={"pseudo_dir": pseudo_dir},
+        specify_potentials=True,
+    )
+    assert [f[0] for f in failures] == ["blocked"]
+    assert _read(write_location, "feo", "scf.in") == feo_scf_in
+    assert _read(write_location, "feo_2", "scf.in") == feo_scf_in
+    assert timing_stats.as_dict()["write_pwx_input"]["calls"] == 3
+    # only files written successfully are recorded in the manifest
+    manifest_file = os.path.join(write_location, ".dftinputgen_manifest.json")
+    with open(manifest_file, "r") as fr:
+        entries = json.load(fr)["entries"]
+    assert sorted(entries) == [
+        os.path.join("feo", "scf.in"),
+        os.path.join("feo_2", "scf.in"),
+    ]
+
+
+@pytest.mark.parametrize("num_workers", [1, 2])
+def test_write_pwx_input_files_archive(write_location, num_workers):
+    timing_stats = TimingStats()
+    failures = write_pwx_input_files(
+        [feo_file, "missing.vasp", al_fcc_struct, feo_struct],
+        names=["feo", "missing", "al", "feo_2"],
+        write_location=write_location,
+        num_workers=num_workers,
+        chunk_size=1,
+        archive_format="tar.gz",
+        shard_size=2,
+        timing_stats=timing_stats,
+        calculation_presets="scf",
+        custom_sett_dict={"pseudo_dir": pseudo_dir},
+        specify_potentials=True,
+    )
+    assert [f[0] for f in failures] == ["missing"]
+    assert sorted(os.listdir(write_location)) == [
+        "pwx_inputs_00000.tar.gz",
+        "pwx_inputs_00001.tar.gz",
+        "pwx_inputs_index.json",
+    ]
+    with open(os.path.join(write_location, "pwx_inputs_index.json")) as fr:
+        assert json.load(fr) == {
+            "feo/scf.in": "pwx_inputs_00000.tar.gz",
+            "al/scf.in": "pwx_inputs_00000.tar.gz",
+            "feo_2/scf.in": "pwx_inputs_00001.tar.gz",
+        }
+    shard = os.path.join(write_location, "pwx_inputs_00000.tar.gz")
+    with tarfile.open(shard) as tf:
+        assert tf.getnames() == ["feo/scf.in", "al/scf.in"]
+        feo_in = tf.extractfile("feo/scf.in").read().decode("utf-8")
+        assert feo_in == feo_scf_in
+    assert timing_stats.as_dict()["write_archive"]["calls"] == 3
+
+
+def test_write_pwx_input_files_archive_errors(write_location):
+    with pytest.raises(PwxInputGeneratorError, match="not supported"):
+        write_pwx_input_files(
+            [feo_file],
+            write_location=write_location,
+            archive_format="zip",
+            use_input_cache=True,
+        )
+    # failed items are not written; no archives if nothing was written
+    failures = write_pwx_input_files(
+        [feo_file],
+        write_location=write_location,
+        num_workers=1,
+        archive_format="zip",
+    )
+    assert "Nothing to write" in failures[0][1]
+    assert os.listdir(write_location) == []
+    # existing archives are not overwritten, if so specified
+    kwargs = {
+        "write_location": write_location,
+        "num_workers": 1,
+        "archive_format": "zip",
+        "calculation_presets": "scf",
+    }
+    assert not write_pwx_input_files([feo_file], **kwargs)
+    with pytest.raises(ArchiveWriterError, match="already exists"):
+        write_pwx_input_files([feo_file], overwrite_files=False, **kwargs)
+
+
+def _write_manifest(manifest_file, items):
+    with open(manifest_file, "w") as fw:
+        for item in items:
+            line = item if isinstance(item, str) else json.dumps(item)
+            fw.write("{}\n".format(line))
+
+
+@pytest.mark.parametrize("num_workers", [1, 2])
+def test_write_pwx_input_files_from_manifest(write_location, num_workers):
+    shutil.copy(feo_file, write_location)
+    al_fcc_inline = {
+        "symbols": al_fcc_struct.get_chemical_symbols(),
+        "cell": al_fcc_struct.get_cell().tolist(),
+        "positions": al_fcc_struct.get_positions().tolist(),
+    }
+    manifest_file = os.path.join(write_location, "manifest.jsonl")
+    _write_manifest(
+        manifest_file,
+        [
+            # path relative to the manifest file
+            {"name": "feo", "crystal_structure": "feo_conv.vasp"},
+            {"crystal_structure": al_fcc_inline},
+            "",
+            {
+                "name": "al_45",
+                "crystal_structure": al_fcc_file,
+                "custom_sett_dict": {"ecutwfc": 45},
+            },
+        ],
+    )
+    progress = []
+    failures = write_pwx_input_files_from_manifest(
+        manifest_file,
+        write_location=write_location,
+        num_workers=num_workers,
+        chunk_size=2,
+        progress=lambda *args: progress.append(args),
+        calculation_presets="scf",
+        custom_sett_dict={"pseudo_dir": pseudo_dir},
+        specify_potentials=True,
+    )
+    assert not failures
+    assert progress == [(2, 0), (3, 0)]
+    assert _read(write_location, "feo", "scf.in") == feo_scf_in
+    assert _read(write_location, "000001", "scf.in") == al_fcc_scf_in
+    # per-item custom settings override the common ones
+    al_45_scf_in = _read(write_location, "al_45", "scf.in")
+    assert "ecutwfc = 45" in al_45_scf_in
+    assert 'pseudo_dir = "{}"'.format(pseudo_dir) in al_45_scf_in
+
+
+def test_write_pwx_input_files_from_manifest_errors(
+    write_location, monkeypatch
+):
+    manifest_file = os.path.join(write_location, "manifest.jsonl")
+    _write_manifest(
+        manifest_file,
+        [
+            "not json",
+            "[1, 2]",
+            {"crystal_structure": feo_file, "charge": 1},
+            {"crystal_structure": 42},
+            {"crystal_structure": feo_file, "custom_sett_dict": "{}"},
+            {"name": "../feo", "crystal_structure": feo_file},
+            {"name": "", "crystal_structure": feo_file},
+            {"crystal_structure": {"symbols": "Al", "positions": [[0] * 3]}},
+            {"name": "feo", "crystal_structure": feo_file},
+            {"name": "feo", "crystal_structure": feo_file},
+            {"crystal_structure": "missing.vasp"},
+        ],
+    )
+    monkeypatch.chdir(write_location)
+    failures = write_pwx_input_files_from_manifest(
+        manifest_file,
+        name_format="item_{}",
+        num_workers=1,
+        calculation_presets="scf",
+    )
+    # invalid items are reported as failures, with their default names
+    assert [f[0] for f in failures] == [
+        "item_{}".format(i) for i in range(8)
+    ] + ["item_9", "item_10"]
+    messages = [f[1] for f in failures]
+    assert messages[0].split(":")[0] in ["ValueError", "JSONDecodeError"]
+    assert "Expected a JSON object" in messages[1]
+    assert "Unknown manifest keys" in messages[2]
+    assert '"crystal_structure"' in messages[3]
+    assert '"custom_sett_dict"' in messages[4]
+    assert "path separator" in messages[5]
+    assert "Invalid name" in messages[6]
+    assert "Missing crystal structure keys" in messages[7]
+    assert "Duplicate name" in messages[8]
+    assert "missing.vasp" in messages[9]
+    assert os.path.isfile(os.path.join(write_location, "feo", "scf.in"))
+
+
+def test_write_pwx_input_files_from_manifest_name_collision(write_location):
+    # invalid items reported under a default name taken by another item
+    manifest_file = os.path.join(write_location, "manifest.jsonl")
+    _write_manifest(
+        manifest_file,
+        [
+            {"name": "000001", "crystal_structure": feo_file},
+            {"crystal_structure": 42},
+            {"name": "000001", "crystal_structure": feo_file},
+            {"crystal_structure": 42},
+            {"name": "000003", "crystal_structure": feo_file},
+        ],
+    )
+    skipped = []
+    failures = write_pwx_input_files_from_manifest(
+        manifest_file,
+        write_location=write_location,
+        num_workers=1,
+        skipped=skipped,
+        calculation_presets="scf",
+        custom_sett_dict={"pseudo_dir": pseudo_dir},
+        specify_potentials=True,
+    )
+    assert [f[0] for f in failures] == ["000001", "000002", "000003"]
+    messages = [f[1] for f in failures]
+    assert '"crystal_structure"' in messages[0]
+    assert "Duplicate name" in messages[1]
+    assert '"crystal_structure"' in messages[2]
+    assert not skipped
+    assert _read(write_location, "000001", "scf.in") == feo_scf_in
+    # names of invalid items are not taken
+    assert _read(write_location, "000003", "scf.in") == feo_scf_in
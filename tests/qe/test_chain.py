@@ -0,0 +1,111 @@
+"""Unit tests for chained pw.x calculations in :mod:`dftinputgen.qe.chain`."""
+
+import os
+import pytest
+
+from ase import io as ase_io
+
+from dftinputgen.qe.pwx import PwxInputGeneratorError
+from dftinputgen.qe.chain import PwxCalculationChain
+
+test_data_dir = os.path.join(os.path.dirname(__file__), "files")
+feo_struct = ase_io.read(os.path.join(test_data_dir, "feo_conv.vasp"))
+al_fcc_struct = ase_io.read(os.path.join(test_data_dir, "al_fcc_conv.vasp"))
+
+band_path = [[0, 0, 0, 20], [0.5, 0, 0.5, 1]]
+
+
+def test_chain_settings():
+    steps = [
+        "relax",
+        "scf",
+        "nscf",
+        {
+            "calculation_presets": "bands",
+            "custom_sett_dict": {
+                "kpoints": {"scheme": "crystal_b", "path": band_path}
+            },
+        },
+    ]
+    chain = PwxCalculationChain(feo_struct, steps, prefix="feo")
+    assert chain.prefix == "feo"
+    assert chain.outdir == "./out"
+    assert chain.pwx_input_files == [
+        "01_relax.in",
+        "02_scf.in",
+        "03_nscf.in",
+        "04_bands.in",
+    ]
+    settings = [pwig.calculation_settings for pwig in chain.generators]
+    # shared data location, every step a new calculation
+    for sett in settings:
+        assert sett["prefix"] == "feo"
+        assert sett["outdir"] == "./out"
+        assert sett["restart_mode"] == "from_scratch"
+    # first step from scratch
+    assert "startingwfc" not in settings[0]
+    # follow-up scf: wavefunctions and potential from the previous step
+    assert settings[1]["startingwfc"] == "file"
+    assert settings[1]["startingpot"] == "file"
+    # nscf/bands: converged density from the scf step
+    assert settings[2]["calculation"] == "nscf"
+    assert settings[3]["calculation"] == "bands"
+    assert "startingpot" not in settings[2]
+    assert "startingwfc" not in settings[3]
+    pwx_input = chain.generators[3].pwx_input_as_str
+    assert 'prefix = "feo"' in pwx_input
+    assert "K_POINTS {crystal_b}" in pwx_input
+
+
+def test_chain_overrides():
+    relaxed = al_fcc_struct.copy()
+    relaxed.set_cell(al_fcc_struct.cell * 1.01, scale_atoms=True)
+    chain = PwxCalculationChain(
+        al_fcc_struct,
+        [
+            "vc-relax",
+            {
+                "calculation_presets": "scf",
+                "crystal_structure": relaxed,
+                "custom_sett_dict": {"startingwfc": "atomic+random"},
+                "pwx_input_file": "final.in",
+            },
+        ],
+        outdir="/scratch/al",
+        custom_sett_dict={"ecutwfc": 50},
+    )
+    assert chain.pwx_input_files == ["01_vc-relax.in", "final.in"]
+    scf = chain.generators[1]
+    assert scf.crystal_structure is relaxed
+    assert scf.calculation_settings["ecutwfc"] == 50
+    assert scf.calculation_settings["outdir"] == "/scratch/al"
+    # custom settings take precedence over the chain settings
+    assert scf.calculation_settings["startingwfc"] == "atomic+random"
+    assert scf.calculation_settings["startingpot"] == "file"
+
+
+def test_chain_errors():
+    # non-self-consistent steps need a converged density
+    with pytest.raises(PwxInputGeneratorError, match="preceding scf"):
+        PwxCalculationChain(feo_struct, ["nscf", "scf"])
+    with pytest.raises(ValueError, match="at least one"):
+        PwxCalculationChain(feo_struct, [])
+    with pytest.raises(ValueError, match="Unknown step keys"):
+        PwxCalculationChain(feo_struct, [{"presets": "scf"}])
+    with pytest.raises(TypeError):
+        PwxCalculationChain(feo_struct, [("scf", {})])
+
+
+def test_chain_write_input_files(tmpdir):
+    chain = PwxCalculationChain(
+        feo_struct,
+        ["scf", "nscf"],
+        write_location=str(tmpdir),
+        overwrite_files=False,
+    )
+    assert chain.write_input_files() == [True, True]
+    assert sorted(os.listdir(str(tmpdir))) == ["01_scf.in", "02_nscf.in"]
+    with open(str(tmpdir.join("02_nscf.in"))) as fr:
+        assert 'calculation = "nscf"' in fr.read()
+    # existing files are not overwritten
+    assert chain.write_input_files() == [False, False]
@@ -0,0 +1,208 @@
+"""Unit tests for pw.x cost estimates in :mod:`dftinputgen.qe.cost`."""
+
+import os
+import json
+import pytest
+import numpy as np
+
+from ase import Atoms
+from ase import io as ase_io
+
+from dftinputgen.qe.pwx import PwxInputGenerator
+from dftinputgen.qe.pwx import PwxInputGeneratorError
+from dftinputgen.qe.cost import _read_z_valence
+from dftinputgen.qe.cost import _estimate_z_valence
+from dftinputgen.qe.cost import estimate_pwx_cost
+from dftinputgen.qe.cost import recommend_pwx_layout
+from dftinputgen.qe.cost import format_pwx_cost_report
+
+
+test_data_dir = os.path.join(os.path.dirname(__file__), "files")
+pseudo_dir = test_data_dir
+feo_struct = ase_io.read(os.path.join(test_data_dir, "feo_conv.vasp"))
+
+
+def _feo_pwig(**kwargs):
+    kwargs.setdefault("custom_sett_dict", {"pseudo_dir": pseudo_dir})
+    return PwxInputGenerator(
+        crystal_structure=feo_struct,
+        calculation_presets="scf",
+        specify_potentials=True,
+        **kwargs
+    )
+
+
+def test_z_valence(tmpdir):
+    fe_pseudo = os.path.join(pseudo_dir, "fe_pbe_v1.5.uspp.F.UPF")
+    assert _read_z_valence(fe_pseudo) == 16.0
+    upf_v2 = tmpdir.join("o.UPF")
+    upf_v2.write('<PP_HEADER\n  element="O"\n  z_valence="6.0d0"\n/>\n')
+    assert _read_z_valence(str(upf_v2)) == 6.0
+    upf_v2.write("<PP_HEADER/>\n")
+    assert _read_z_valence(str(upf_v2)) is None
+    assert _estimate_z_valence("Fe1") == 8.0
+    assert _estimate_z_valence("O") == 6.0
+    assert _estimate_z_valence("H") == 1.0
+
+
+def test_estimate_pwx_cost():
+    cost = estimate_pwx_cost(_feo_pwig())
+    assert cost["formula"] == "Fe2O2"
+    assert cost["num_atoms"] == 4
+    assert cost["valence_electrons"] == {"Fe": 16.0, "O": 6.0}
+    assert set(cost["valence_electrons_source"].values()) == {
+        "pseudopotential"
+    }
+    assert cost["num_electrons"] == 44.0
+    # smearing: 20% more bands than occupied
+    assert cost["num_bands"] == 26
+    assert cost["kpoint_grid"] == [9, 9, 9]
+    assert cost["num_kpoints"] == 365
+    assert cost["fft_grid"] == [54, 54, 54]
+    # ecutrho > 4 x ecutwfc: smaller smooth grid for wavefunctions
+    assert cost["smooth_fft_grid"] == [45, 45, 45]
+    assert cost["num_plane_waves"] < cost["num_g_vectors"]
+    assert cost["relative_cost"] > 0
+    assert set(cost["memory"]) == {
+        "wavefunctions",
+        "davidson",
+        "density",
+        "subspace",
+    }
+    # all estimates can be serialized
+    json.dumps(cost)
+
+
+def test_estimate_pwx_cost_settings():
+    base = estimate_pwx_cost(_feo_pwig())
+    # more k-points, spin polarization, higher cutoffs: more expensive
+    for sett in [
+        {"kpoints": {"scheme": "automatic", "grid": [12] * 3, "shift": [0]}},
+        {"nspin": 2},
+        {"ecutwfc": 60, "ecutrho": 480},
+    ]:
+        sett = dict(sett, pseudo_dir=pseudo_dir)
+        cost = estimate_pwx_cost(_feo_pwig(custom_sett_dict=sett))
+        assert cost["relative_cost"] > base["relative_cost"]
+    cost = estimate_pwx_cost(
+        _feo_pwig(custom_sett_dict={"pseudo_dir": pseudo_dir, "nspin": 2})
+    )
+    assert cost["num_kpoints"] == 2 * base["num_kpoints"]
+    # gamma point only: half the plane waves
+    sett = {"pseudo_dir": pseudo_dir, "kpoints": {"scheme": "gamma"}}
+    cost = estimate_pwx_cost(_feo_pwig(custom_sett_dict=sett))
+    assert cost["gamma_only"]
+    assert cost["num_kpoints"] == 1
+    assert abs(2 * cost["num_plane_waves"] - base["num_plane_waves"]) <= 1
+    # FFT grids as set in the input
+    sett = {"pseudo_dir": pseudo_dir, "fft_grids": True, "nr3": 60}
+    cost = estimate_pwx_cost(_feo_pwig(custom_sett_dict=sett))
+    assert cost["fft_grid"] == [54, 54, 60]
+    assert cost["smooth_fft_grid"] == [45, 45, 45]
+    # isolated system with vacuum detection: gamma point only
+    sett = {
+        "pseudo_dir": pseudo_dir,
+        "kpoints": {
+            "scheme": "automatic",
+            "spacing": 0.15,
+            "shift": [0, 0, 0],
+            "detect_vacuum": True,
+            "min_vacuum": 0.1,
+        },
+    }
+    cost = estimate_pwx_cost(_feo_pwig(custom_sett_dict=sett))
+    assert cost["gamma_only"]
+    assert cost["kpoint_grid"] == [1, 1, 1]
+    # non-collinear: bands for all electrons, two-component spinors
+    sett = {"pseudo_dir": pseudo_dir, "noncolin": True, "nbnd": 60}
+    cost = estimate_pwx_cost(_feo_pwig(custom_sett_dict=sett))
+    assert (cost["npol"], cost["num_bands"]) == (2, 60)
+    sett = {"pseudo_dir": pseudo_dir, "occupations": "fixed"}
+    cost = estimate_pwx_cost(_feo_pwig(custom_sett_dict=sett))
+    assert cost["num_bands"] == 22
+    # no pseudopotentials found: estimated, unless specified
+    pwig = _feo_pwig(custom_sett_dict={"pseudo_dir": "missing"})
+    cost = estimate_pwx_cost(pwig, valence_electrons={"O": 6.5})
+    assert cost["valence_electrons"] == {"Fe": 8.0, "O": 6.5}
+    assert cost["valence_electrons_source"] == {
+        "Fe": "estimate",
+        "O": "input",
+    }
+    # potentials not specified: "None" pseudo names
+    pwig = _feo_pwig()
+    pwig.specify_potentials = False
+    assert estimate_pwx_cost(pwig)["num_electrons"] == 28.0
+
+
+def test_estimate_pwx_cost_errors(tmpdir):
+    pwig = PwxInputGenerator(crystal_structure=feo_struct)
+    with pytest.raises(PwxInputGeneratorError, match="ecutwfc"):
+        estimate_pwx_cost(pwig)
+    sett = {"ecutwfc": 30, "kpoints": {"scheme": "tpiba"}}
+    pwig = PwxInputGenerator(
+        crystal_structure=feo_struct, custom_sett_dict=sett
+    )
+    with pytest.raises(PwxInputGeneratorError, match="tpiba"):
+        estimate_pwx_cost(pwig)
+    # unreadable pseudopotential files: estimated
+    pseudo_names = {"Fe": "fe.UPF", "O": "o.UPF"}
+    sett = {"pseudo_dir": str(tmpdir), "pseudo_names": pseudo_names}
+    cost = estimate_pwx_cost(_feo_pwig(custom_sett_dict=sett))
+    assert cost["valence_electrons"] == {"Fe": 8.0, "O": 6.0}
+
+
+def test_recommend_pwx_layout():
+    cost = estimate_pwx_cost(_feo_pwig())
+    # plenty of k-points and memory: one pool per process
+    layout = recommend_pwx_layout(cost, 32, num_nodes=2, memory_per_node=64)
+    assert (layout["num_procs"], layout["nk"]) == (64, 64)
+    assert (layout["nd"], layout["nt"]) == (1, 1)
+    assert not layout["warnings"]
+    assert layout["command"] == (
+        "mpirun -np 64 pw.x -nk 64 -nd 1 -nt 1 -in pwx.in"
+    )
+    # limited memory: fewer pools, with wavefunctions distributed
+    layout = recommend_pwx_layout(cost, 32, memory_per_node=4)
+    assert (layout["nk"], layout["procs_per_pool"]) == (8, 4)
+    assert layout["memory_per_process"] <= 4 * 1024 ** 3 / 32
+    assert recommend_pwx_layout(cost, 32)["nk"] == 32
+    # too little memory, too many processes: warnings
+    layout = recommend_pwx_layout(
+        cost, 128, num_nodes=16, memory_per_node=0.5, pwx_input_file="scf.in"
+    )
+    assert layout["nk"] == 1
+    assert layout["nt"] == 64
+    assert len(layout["warnings"]) == 2
+    assert layout["command"].endswith("-in scf.in")
+    with pytest.raises(PwxInputGeneratorError, match="positive"):
+        recommend_pwx_layout(cost, 0)
+
+
+def test_recommend_pwx_layout_diag():
+    # large supercell at the gamma point: many bands, parallel diagonalization
+    atoms = Atoms("Si64", cell=np.eye(3) * 21.7, pbc=True)
+    atoms.set_scaled_positions(np.random.RandomState(0).rand(64, 3))
+    sett = {"ecutwfc": 30, "kpoints": {"scheme": "gamma"}}
+    pwig = PwxInputGenerator(crystal_structure=atoms, custom_sett_dict=sett)
+    cost = estimate_pwx_cost(pwig, valence_electrons={"Si": 4})
+    assert cost["num_bands"] == 128
+    layout = recommend_pwx_layout(cost, 64)
+    assert (layout["nk"], layout["nd"]) == (1, 1)
+    cost["num_bands"] = 1000
+    assert recommend_pwx_layout(cost, 64)["nd"] == 64
+    assert recommend_pwx_layout(cost, 48)["nd"] == 36
+
+
+def test_format_pwx_cost_report():
+    cost = estimate_pwx_cost(_feo_pwig())
+    report = format_pwx_cost_report(cost)
+    assert "Fe2O2 (4 atoms" in report
+    assert "Fe 16 (pseudopotential)" in report
+    assert "9x9x9 grid, <= 365 irreducible" in report
+    assert "Recommended" not in report
+    layout = recommend_pwx_layout(cost, 128, num_nodes=16, memory_per_node=1)
+    report = format_pwx_cost_report(cost, layout=layout)
+    assert layout["command"] in report
+    assert report.count("Warning: ") == 2
+    cost["memory"]["wavefunctions"] = 2 * 1024 ** 4
+    assert "TiB" in format_pwx_cost_report(cost)
@@ -0,0 +1,34 @@
+"""Unit tests for FFT grids in :mod:`dftinputgen.qe.fft`."""
+
+import numpy as np
+
+from dftinputgen.qe.fft import good_fft_order
+from dftinputgen.qe.fft import get_fft_grid
+from dftinputgen.qe.fft import get_pwx_fft_grids
+
+
+def test_good_fft_order():
+    assert good_fft_order(0) == 1
+    assert good_fft_order(45) == 45
+    assert good_fft_order(49) == 50
+    assert good_fft_order(49, factors=(2, 3, 5, 7)) == 49
+    assert good_fft_order(97) == 100
+
+
+def test_get_fft_grid():
+    # 10 A cubic cell, ecutrho = 100 Ry: Miller indices up to 30
+    assert get_fft_grid(np.eye(3) * 10.0, 100) == [64, 64, 64]
+    assert get_fft_grid(np.diag([5.0, 10.0, 20.0]), 100) == [32, 64, 125]
+
+
+def test_get_pwx_fft_grids():
+    cell = np.eye(3) * 10.0
+    # norm-conserving (ecutrho = 4 ecutwfc): no separate smooth grid
+    grids = get_pwx_fft_grids(cell, 25)
+    assert grids == {"nr1": 63, "nr2": 63, "nr3": 63}
+    assert get_pwx_fft_grids(cell, 25, ecutrho=100) == grids
+    assert get_pwx_fft_grids(cell, 25, factors=(2, 3, 5))["nr1"] == 64
+    # ultrasoft/PAW (ecutrho > 4 ecutwfc): coarser smooth grid
+    grids = get_pwx_fft_grids(cell, 25, ecutrho=200)
+    assert [grids[t] for t in ["nr1", "nr2", "nr3"]] == [90] * 3
+    assert [grids[t] for t in ["nr1s", "nr2s", "nr3s"]] == [63] * 3
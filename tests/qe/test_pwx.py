@@ -1,6 +1,7 @@
 """Unit tests for the `PwxInputGenerator` class."""
 
 import os
+import json
 import pytest
 
 from ase import io as ase_io
@@ -8,6 +9,12 @@ from ase import io as ase_io
 from dftinputgen.qe.pwx import PwxInputGenerator
 from dftinputgen.qe.pwx import PwxInputGeneratorError
 from dftinputgen.qe.pwx import _qe_val_formatter
+from dftinputgen.qe.pwx import _build_pseudo_index
+from dftinputgen.qe.pwx import _PSEUDO_INDEX_CACHE
+from dftinputgen.qe.pwx import get_pseudo_index
+from dftinputgen.qe.pwx import _compile_namelist
+from dftinputgen.qe.pwx import _render_namelist
+from dftinputgen.qe.pwx import _NAMELIST_TEMPLATES
 
 
 # define module-level variables used for testing
@@ -145,6 +152,52 @@ def test_relax_base_calculation_settings():
     assert cs["namelists"] == ["control", "system", "electrons", "ions"]
 
 
+def test_calculation_settings_cache():
+    pwig = PwxInputGenerator(
+        crystal_structure=feo_struct, calculation_presets="scf"
+    )
+    cs = pwig.calculation_settings
+    # repeated access: cached settings are reused
+    assert pwig.calculation_settings is cs
+    # setters that do not change anything keep the cache
+    pwig.calculation_presets = "scf"
+    pwig.custom_sett_dict = {}
+    pwig.custom_sett_file = None
+    pwig.crystal_structure = feo_struct.copy()
+    assert pwig.calculation_settings is cs
+    # changed inputs invalidate the cache
+    pwig.calculation_presets = "relax"
+    assert pwig.calculation_settings["calculation"] == "relax"
+    pwig.custom_sett_dict = {"ecutwfc": 50}
+    assert pwig.calculation_settings["ecutwfc"] == 50
+    pwig.crystal_structure = al_fcc_struct
+    assert pwig.calculation_settings["ntyp"] == 1
+    # in-place updates to `custom_sett_dict` are picked up as well
+    pwig.custom_sett_dict["ecutwfc"] = 60
+    assert pwig.calculation_settings["ecutwfc"] == 60
+    pwig.custom_sett_dict.update({"kpoints": {"scheme": "gamma"}})
+    assert pwig.calculation_settings["kpoints"] == {"scheme": "gamma"}
+    pwig.custom_sett_dict["kpoints"]["scheme"] = "automatic"
+    assert pwig.calculation_settings["kpoints"] == {"scheme": "automatic"}
+
+
+def test_crystal_structure_in_place_update():
+    struct = feo_struct.copy()
+    pwig = PwxInputGenerator(crystal_structure=struct)
+    assert pwig.calculation_settings["ntyp"] == 2
+    assert "O " in pwig.atomic_species_card
+    # in-place updates to the crystal structure are picked up
+    struct.set_chemical_symbols(["Fe"] * len(struct))
+    assert pwig.calculation_settings["ntyp"] == 1
+    assert pwig.parameters_from_structure["ntyp"] == 1
+    assert "O " not in pwig.atomic_species_card
+    assert "O " not in pwig.atomic_positions_card
+    assert set(pwig._get_pseudo_names()) == {"Fe"}
+    # unchanged structure: cached data is reused
+    cs = pwig.calculation_settings
+    assert pwig.calculation_settings is cs
+
+
 def test_control_namelist_to_str():
     # control namelist without pseudo, settings: error
     pwig = PwxInputGenerator(crystal_structure=feo_struct)
@@ -182,6 +235,68 @@ def test_namelist_to_str():
     assert pwig._namelist_to_str("electrons") == electrons
 
 
+def test_compile_and_render_namelist():
+    calc_sett = {"ecutwfc": 40, "nat": 4, "ntyp": 2, "not_a_tag": 0}
+    template = _compile_namelist("system", calc_sett, slots={"nat": 4})
+    assert template == [
+        (None, "&SYSTEM"),
+        ("nat", None),
+        ("ntyp", "    ntyp = 2"),
+        ("ecutwfc", "    ecutwfc = 40"),
+        (None, "/"),
+    ]
+    # slots are formatted at render time (and skipped if missing)
+    nl = _render_namelist(template, {"nat": 8})
+    assert nl == "&SYSTEM\n    nat = 8\n    ntyp = 2\n    ecutwfc = 40\n/"
+    nl = _render_namelist(template, {})
+    assert nl == "&SYSTEM\n    ntyp = 2\n    ecutwfc = 40\n/"
+
+
+def test_namelist_templates():
+    _NAMELIST_TEMPLATES.clear()
+    pwig_1 = PwxInputGenerator(
+        crystal_structure=al_fcc_struct,
+        calculation_presets="scf",
+        custom_sett_dict={"pseudo_dir": pseudo_dir},
+    )
+    pwig_2 = PwxInputGenerator(
+        crystal_structure=feo_struct,
+        calculation_presets="scf",
+        custom_sett_dict={"pseudo_dir": pseudo_dir},
+    )
+    assert pwig_1.all_namelists_as_str == "\n".join(
+        al_fcc_scf_in.splitlines()[:20]
+    )
+    # same settings: templates are shared across instances
+    assert len(_NAMELIST_TEMPLATES) == 1
+    assert pwig_2._get_namelist_templates() is pwig_1._namelist_templates
+    # structure-dependent parameters are not baked into templates
+    assert pwig_2.all_namelists_as_str == "\n".join(
+        feo_scf_in.splitlines()[:20]
+    )
+    templates = pwig_2._namelist_templates
+    pwig_2.crystal_structure = al_fcc_struct
+    assert pwig_2._namelist_templates is templates
+    # changed settings (incl. in-place updates): new templates
+    pwig_2.custom_sett_dict["ecutwfc"] = 50
+    assert "ecutwfc = 50" in pwig_2.all_namelists_as_str
+    assert pwig_2._namelist_templates is not templates
+    assert len(_NAMELIST_TEMPLATES) == 2
+    assert "ecutwfc = 40" in pwig_1.all_namelists_as_str
+
+
+def test_namelist_templates_maxsize(monkeypatch):
+    monkeypatch.setattr("dftinputgen.qe.pwx._NAMELIST_TEMPLATES_MAXSIZE", 2)
+    _NAMELIST_TEMPLATES.clear()
+    for ecutwfc in [30, 40, 50]:
+        pwig = PwxInputGenerator(
+            crystal_structure=feo_struct,
+            custom_sett_dict={"ecutwfc": ecutwfc},
+        )
+        pwig._get_namelist_templates()
+    assert len(_NAMELIST_TEMPLATES) == 1
+
+
 def test_all_namelists_as_str():
     pwig = PwxInputGenerator(
         crystal_structure=al_fcc_struct,
@@ -229,6 +344,32 @@ def test_atomic_positions_card():
     assert pwig.atomic_positions_card == card
 
 
+def test_atomic_positions_card_large():
+    import ase
+    import numpy as np
+
+    # bulk formatting matches per-line `str.format` for many atoms
+    rng = np.random.RandomState(0)
+    positions = rng.uniform(-1.0, 1.0, size=(1000, 3))
+    positions[0] = [-0.0, 1e-12, -5e-9]
+    atoms = ase.Atoms(
+        symbols=["Fe", "O", "Al", "Zr"] * 250,
+        scaled_positions=positions,
+        cell=[[10.0, 0.0, 0.0], [0.0, 10.0, 0.0], [0.0, 0.0, 10.0]],
+        pbc=True,
+    )
+    pwig = PwxInputGenerator(crystal_structure=atoms)
+    lines = ["ATOMIC_POSITIONS {crystal}"]
+    for s, p in zip(
+        atoms.get_chemical_symbols(), atoms.get_scaled_positions()
+    ):
+        lines.append("{:4s}  {:12.8f}  {:12.8f}  {:12.8f}".format(s, *p))
+    assert pwig.atomic_positions_card == "\n".join(lines)
+    # no atoms: only the card header
+    pwig = PwxInputGenerator(crystal_structure=ase.Atoms(cell=np.eye(3)))
+    assert pwig.atomic_positions_card == "ATOMIC_POSITIONS {crystal}"
+
+
 def test_kpoints_card():
     # unknown scheme: error
     pwig = PwxInputGenerator(crystal_structure=feo_struct)
@@ -244,6 +385,152 @@ def test_kpoints_card():
         custom_sett_dict={"kpoints": {"scheme": "gamma"}},
     )
     assert pwig.kpoints_card == "K_POINTS {gamma}"
+    # band structure path
+    path = [[0, 0, 0, 20], [0.5, 0, 0.5, 1]]
+    pwig.custom_sett_dict = {"kpoints": {"scheme": "crystal_b", "path": path}}
+    lines = [
+        "K_POINTS {crystal_b}",
+        "2",
+        "  0.00000000    0.00000000    0.00000000  20",
+        "  0.50000000    0.00000000    0.50000000  1",
+    ]
+    assert pwig.kpoints_card == "\n".join(lines)
+    pwig.calculation_presets = "bands"
+    pwig.custom_sett_dict = {}
+    with pytest.raises(PwxInputGeneratorError, match="path"):
+        print(pwig.kpoints_card)
+
+
+def test_kpoints_card_detect_vacuum():
+    from ase.build import fcc111, molecule
+
+    slab = fcc111("Al", size=(1, 1, 3), vacuum=5.0, periodic=True)
+    mol = molecule("H2O")
+    mol.set_cell([10.0, 10.0, 10.0])
+    kpoints = {"scheme": "automatic", "spacing": 0.15, "shift": [0, 0, 0]}
+    # off by default: same spacing along every direction
+    pwig = PwxInputGenerator(
+        crystal_structure=slab, custom_sett_dict={"kpoints": kpoints}
+    )
+    assert pwig.kpoints_card == "K_POINTS {automatic}\n17 17 3 0 0 0"
+    # single k-point along the vacuum direction
+    kpoints = dict(kpoints, detect_vacuum=True)
+    pwig.custom_sett_dict = {"kpoints": kpoints}
+    assert pwig.kpoints_card == "K_POINTS {automatic}\n17 17 1 0 0 0"
+    # ... only if the vacuum is at least "min_vacuum" thick
+    pwig.custom_sett_dict = {"kpoints": dict(kpoints, min_vacuum=12.0)}
+    assert pwig.kpoints_card == "K_POINTS {automatic}\n17 17 3 0 0 0"
+    # isolated molecule: gamma point only
+    pwig = PwxInputGenerator(
+        crystal_structure=mol,
+        calculation_presets="scf",
+        custom_sett_dict={"kpoints": kpoints},
+    )
+    assert pwig.kpoints_card == "K_POINTS {gamma}"
+    inputs = list(pwig.generate_many([slab, mol, feo_struct]))
+    assert "17 17 1 0 0 0" in inputs[0]
+    assert "K_POINTS {gamma}" in inputs[1]
+    assert "9 9 9 0 0 0" in inputs[2]
+    # explicit grid: used as is
+    pwig.custom_sett_dict = {"kpoints": dict(kpoints, grid=[2, 2, 2])}
+    assert pwig.kpoints_card == "K_POINTS {automatic}\n2 2 2 0 0 0"
+
+
+def _niggli_reduce(crystal_structure):
+    # Niggli reduction only: the number of atoms is kept
+    from dftinputgen.utils import reduce_crystal_structure
+
+    return reduce_crystal_structure(crystal_structure, primitive=False)
+
+
+def test_reduce_structure(monkeypatch):
+    import numpy as np
+
+    monkeypatch.setattr(
+        "dftinputgen.qe.pwx.reduce_crystal_structure", _niggli_reduce
+    )
+    skewed = feo_struct.copy()
+    skewed.set_cell(
+        np.dot([[1, 1, 0], [0, 1, 0], [0, 0, 1]], feo_struct.cell),
+        scale_atoms=False,
+    )
+    pwig = PwxInputGenerator(
+        crystal_structure=skewed, calculation_presets="scf"
+    )
+    assert not pwig.reduce_structure
+    assert pwig.crystal_structure is skewed
+    assert pwig.reduction_factor == 1.0
+    skewed_kpoints_card = pwig.kpoints_card
+    # the current structure is reduced when switched on
+    pwig.reduce_structure = True
+    assert pwig.input_crystal_structure is skewed
+    assert pwig.crystal_structure is not skewed
+    assert pwig.reduction_factor == 1.0
+    # k-point grid from the k-spacing follows the reduced cell
+    assert pwig.kpoints_card != skewed_kpoints_card
+    assert pwig.kpoints_card == "K_POINTS {automatic}\n9 9 9 0 0 0"
+    # grids of reduced structures are not computed in batches
+    inputs = list(pwig.generate_many([skewed, feo_struct]))
+    assert all("9 9 9 0 0 0" in pwx_input for pwx_input in inputs)
+    pwig.reduce_structure = None
+    assert pwig.reduce_structure
+    pwig.reduce_structure = False
+    assert pwig.crystal_structure is skewed
+    # empty structure
+    pwig = PwxInputGenerator(
+        crystal_structure=feo_struct[:0], reduce_structure=True
+    )
+    assert pwig.reduction_factor == 1.0
+
+
+def test_reduce_structure_primitive():
+    pwig = PwxInputGenerator(
+        crystal_structure=al_fcc_struct,
+        calculation_presets="scf",
+        reduce_structure=True,
+    )
+    assert len(pwig.crystal_structure) == 1
+    assert pwig.reduction_factor == 4.0
+    assert "nat = 1" in pwig.pwx_input_as_str
+
+
+def test_fft_grids():
+    # off by default
+    pwig = PwxInputGenerator(
+        crystal_structure=feo_struct, calculation_presets="scf"
+    )
+    assert "nr1" not in pwig._namelist_to_str("system")
+    # dense and smooth grids (ecutrho > 4 ecutwfc)
+    pwig.custom_sett_dict = {"fft_grids": True}
+    system = pwig._namelist_to_str("system")
+    assert "    nr1 = 54\n    nr2 = 54\n    nr3 = 54\n" in system
+    assert "    nr1s = 45\n    nr2s = 45\n    nr3s = 45\n" in system
+    # grids follow the cutoffs and the allowed prime factors
+    pwig.custom_sett_dict = {
+        "fft_grids": True,
+        "ecutrho": 160,
+        "fft_grid_factors": [2, 3, 5],
+    }
+    system = pwig._namelist_to_str("system")
+    assert "nr1 = 45" in system
+    assert "nr1s" not in system
+    # explicitly specified grids are used as is
+    pwig.custom_sett_dict = {"fft_grids": True, "nr3": 60}
+    system = pwig._namelist_to_str("system")
+    assert "nr2 = 54\n    nr3 = 60\n" in system
+    # batch mode: grids for every cell
+    large = feo_struct.copy()
+    large.set_cell(feo_struct.cell * [[1], [1], [2]], scale_atoms=False)
+    inputs = list(pwig.generate_many([feo_struct, large, feo_struct]))
+    assert "nr1 = 54" in inputs[0] and "nr1s = 45" in inputs[0]
+    assert "nr3s = 90" in inputs[1] and "nr3 = 60" in inputs[1]
+    assert inputs[2] == inputs[0]
+    # cutoff needed for the grids
+    pwig = PwxInputGenerator(
+        crystal_structure=feo_struct, custom_sett_dict={"fft_grids": True}
+    )
+    with pytest.raises(PwxInputGeneratorError, match="ecutwfc"):
+        pwig._namelist_to_str("system")
 
 
 def test_cell_parameters_card():
@@ -291,6 +578,160 @@ def test_pwx_input_as_str():
     assert pwig.pwx_input_as_str == feo_scf_in.rstrip("\n")
 
 
+def test_iter_pwx_input():
+    pwig = PwxInputGenerator(
+        crystal_structure=feo_struct,
+        calculation_presets="scf",
+        custom_sett_dict={"pseudo_dir": pseudo_dir},
+        specify_potentials=True,
+    )
+    chunks = list(pwig.iter_pwx_input())
+    # 3 namelists + separator + 4 cards
+    assert len(chunks) == 8
+    assert "".join(chunks) == feo_scf_in.rstrip("\n")
+    # only namelists or only cards
+    pwig.custom_sett_dict["cards"] = []
+    assert "".join(pwig.iter_pwx_input()) == pwig.all_namelists_as_str + "\n"
+    pwig.custom_sett_dict.update({"cards": ["kpoints"], "namelists": []})
+    kpoints = "K_POINTS {automatic}\n9 9 9 0 0 0"
+    assert "".join(pwig.iter_pwx_input()) == "\n" + kpoints
+
+
+def test_has_pwx_input():
+    pwig = PwxInputGenerator(crystal_structure=feo_struct)
+    assert not pwig.has_pwx_input
+    pwig.custom_sett_dict = {"namelists": ["control"]}
+    assert pwig.has_pwx_input
+    pwig.custom_sett_dict = {"cards": ["atomic_positions"]}
+    assert pwig.has_pwx_input
+
+
+def test_stream_pwx_input():
+    import io
+
+    pwig = PwxInputGenerator(crystal_structure=feo_struct)
+    with pytest.raises(PwxInputGeneratorError, match="input settings"):
+        pwig.stream_pwx_input(io.StringIO())
+    pwig.calculation_presets = "scf"
+    pwig.specify_potentials = True
+    pwig.custom_sett_dict = {"pseudo_dir": pseudo_dir}
+    stream = io.StringIO()
+    pwig.stream_pwx_input(stream)
+    assert stream.getvalue() == feo_scf_in.rstrip("\n")
+
+
+def test_generate_many():
+    pwig = PwxInputGenerator(
+        crystal_structure=feo_struct,
+        calculation_presets="scf",
+        custom_sett_dict={"pseudo_dir": pseudo_dir},
+        specify_potentials=True,
+    )
+    structures = [al_fcc_struct, feo_struct, feo_struct.copy()]
+    inputs = list(pwig.generate_many(structures))
+    assert inputs[0] == al_fcc_scf_in.rstrip("\n")
+    assert inputs[1] == feo_scf_in.rstrip("\n")
+    assert inputs[2] == feo_scf_in.rstrip("\n")
+    # the generator itself is not modified
+    assert pwig.crystal_structure is feo_struct
+    assert pwig._matched_pseudo_names is None
+    # errors for individual structures are raised as usual
+    pwig.custom_sett_dict = {"pseudo_dir": os.path.dirname(pseudo_dir)}
+    with pytest.raises(PwxInputGeneratorError, match="Fe, O"):
+        list(pwig.generate_many(structures[1:]))
+
+
+def test_array_structure_input():
+    from dftinputgen.structure import ArrayStructure
+
+    kwargs = {
+        "calculation_presets": "scf",
+        "custom_sett_dict": {"pseudo_dir": pseudo_dir},
+        "specify_potentials": True,
+    }
+    structure = ArrayStructure.from_atoms(feo_struct)
+    pwig = PwxInputGenerator(crystal_structure=structure, **kwargs)
+    assert pwig.parameters_from_structure == {"nat": 4, "ntyp": 2}
+    assert pwig.pwx_input_as_str == feo_scf_in.rstrip("\n")
+    # array structures and `ase.Atoms` objects can be mixed in a batch
+    structures = [ArrayStructure.from_atoms(al_fcc_struct), feo_struct]
+    inputs = list(pwig.generate_many(structures))
+    assert inputs == [al_fcc_scf_in.rstrip("\n"), feo_scf_in.rstrip("\n")]
+    # species labels: weights and potentials of the elements
+    structure = ArrayStructure(
+        ["Fe1", "Fe2", "O", "O"],
+        feo_struct.cell,
+        feo_struct.get_scaled_positions(),
+    )
+    pwig = PwxInputGenerator(crystal_structure=structure, **kwargs)
+    species_card = pwig.atomic_species_card.splitlines()
+    fe_line = feo_scf_in.splitlines()[21]
+    assert species_card[1:3] == [
+        fe_line.replace("Fe ", "Fe1", 1),
+        fe_line.replace("Fe ", "Fe2", 1),
+    ]
+    assert "ntyp = 3" in pwig.pwx_input_as_str
+
+
+def test_generate_many_kpoint_grids(monkeypatch):
+    import ase
+    import numpy as np
+
+    pwig = PwxInputGenerator(
+        crystal_structure=feo_struct, calculation_presets="scf"
+    )
+    # grids for all structures in a chunk are computed at once
+    monkeypatch.setattr("dftinputgen.qe.pwx._BATCH_CHUNK_SIZE", 2)
+    calls = []
+
+    def _grids(crystal_structures, spacing, min_vacuum=None):
+        calls.append(len(crystal_structures))
+        return [[1, 2, 3]] * len(crystal_structures)
+
+    monkeypatch.setattr(
+        "dftinputgen.qe.pwx.get_kpoint_grids_from_spacing", _grids
+    )
+    inputs = list(pwig.generate_many([feo_struct] * 3))
+    assert calls == [2, 1]
+    assert all("1 2 3 0 0 0" in pwx_input for pwx_input in inputs)
+    # precomputed grid is dropped when the structure changes
+    assert "9 9 9 0 0 0" in pwig.kpoints_card
+    monkeypatch.undo()
+
+    # grids not needed: not computed
+    pwig.custom_sett_dict = {"kpoints": {"scheme": "gamma"}}
+    assert pwig._get_batch_kpoint_grids([feo_struct]) == [None]
+    kpoints = {"scheme": "automatic", "grid": [2, 2, 2], "shift": [0, 0, 0]}
+    pwig.custom_sett_dict = {"kpoints": kpoints}
+    assert pwig._get_batch_kpoint_grids([feo_struct]) == [None]
+    # singular cell in a batch: error only for that structure
+    pwig.custom_sett_dict = {}
+    bad_struct = ase.Atoms("Fe", cell=np.zeros((3, 3)))
+    assert pwig._get_batch_kpoint_grids([feo_struct, bad_struct]) == [
+        None,
+        None,
+    ]
+    generated = pwig.generate_many([feo_struct, bad_struct])
+    assert "9 9 9 0 0 0" in next(generated)
+    with pytest.raises(np.linalg.LinAlgError):
+        next(generated)
+
+
+def test_match_pseudo_name():
+    pwig = PwxInputGenerator(crystal_structure=feo_struct)
+    # no memo: plain lookup in `pseudo_dir`
+    assert pwig._match_pseudo_name("Fe", pseudo_dir) == os.path.basename(
+        fe_pseudo
+    )
+    # memo: matches are reused
+    pwig._matched_pseudo_names = {("Fe", pseudo_dir): "cached.UPF"}
+    assert pwig._match_pseudo_name("Fe", pseudo_dir) == "cached.UPF"
+    assert pwig._match_pseudo_name("O", pseudo_dir) == os.path.basename(
+        o_pseudo
+    )
+    assert ("O", pseudo_dir) in pwig._matched_pseudo_names
+
+
 def test_write_pwx_input():
     # no input settings: error
     pwig = PwxInputGenerator(crystal_structure=feo_struct)
@@ -317,6 +758,39 @@ def test_write_pwx_input():
         assert fr.read() == feo_scf_in.rstrip("\n")
 
 
+
+def test_write_pwx_input_errors(tmpdir):
+    pwig = PwxInputGenerator(
+        crystal_structure=feo_struct,
+        custom_sett_dict={"cards": ["atomic_positions", "occupations"]},
+    )
+    # formatting error midway: partially written file is removed
+    with pytest.raises(NotImplementedError):
+        pwig.write_pwx_input(write_location=str(tmpdir), filename="pwx.in")
+    assert not os.listdir(str(tmpdir))
+    # existing input file is left untouched
+    tmpdir.join("pwx.in").write("existing")
+    with pytest.raises(NotImplementedError):
+        pwig.write_pwx_input(write_location=str(tmpdir), filename="pwx.in")
+    assert os.listdir(str(tmpdir)) == ["pwx.in"]
+    assert tmpdir.join("pwx.in").read() == "existing"
+    # e.g. missing pseudopotentials
+    pwig = PwxInputGenerator(
+        crystal_structure=feo_struct,
+        calculation_presets="scf",
+        custom_sett_dict={"pseudo_dir": str(tmpdir)},
+        specify_potentials=True,
+    )
+    with pytest.raises(PwxInputGeneratorError):
+        pwig.write_pwx_input(write_location=str(tmpdir), filename="pwx.in")
+    assert tmpdir.join("pwx.in").read() == "existing"
+    # error opening the file is raised as is
+    with pytest.raises((IOError, OSError)):
+        pwig.write_pwx_input(
+            write_location=str(tmpdir.join("missing")), filename="pwx.in"
+        )
+
+
 def test_write_input_files():
     import tempfile
 
@@ -332,3 +806,175 @@ def test_write_input_files():
     pwig.write_input_files()
     with open(filename, "r") as fr:
         assert fr.read() == feo_scf_in.rstrip("\n")
+
+
+def test_write_input_files_overwrite_and_cache(tmpdir):
+    write_location = str(tmpdir)
+    filename = str(tmpdir.join("scf.in"))
+    pwig = PwxInputGenerator(
+        crystal_structure=feo_struct,
+        calculation_presets="scf",
+        custom_sett_dict={"pseudo_dir": pseudo_dir},
+        specify_potentials=True,
+        write_location=write_location,
+        use_input_cache=True,
+    )
+    assert pwig.use_input_cache
+    assert pwig.write_input_files()
+    assert sorted(os.listdir(write_location)) == [
+        ".dftinputgen_manifest.json",
+        "scf.in",
+    ]
+    # unchanged inputs: file is not rewritten
+    assert not pwig.write_input_files()
+    # changed settings or structure: file is rewritten
+    pwig.custom_sett_dict["ecutwfc"] = 45
+    assert pwig.write_input_files()
+    assert not pwig.write_input_files()
+    pwig.crystal_structure = al_fcc_struct
+    assert pwig.write_input_files()
+    with open(filename, "r") as fr:
+        assert "Al" in fr.read()
+    # file modified since it was written: file is rewritten
+    with open(filename, "w") as fw:
+        fw.write("modified")
+    assert pwig.write_input_files()
+    # existing files are never modified if `overwrite_files` is False
+    pwig.overwrite_files = False
+    pwig.crystal_structure = feo_struct
+    assert not pwig.write_input_files()
+    with open(filename, "r") as fr:
+        assert "Al" in fr.read()
+    pwig.use_input_cache = False
+    assert not pwig.write_input_files()
+    os.remove(filename)
+    assert pwig.write_input_files()
+    with open(filename, "r") as fr:
+        assert "Fe" in fr.read()
+
+
+def test_profile(tmpdir):
+    pwig = PwxInputGenerator(
+        crystal_structure=feo_struct,
+        calculation_presets="scf",
+        custom_sett_dict={"pseudo_dir": pseudo_dir},
+        specify_potentials=True,
+        write_location=str(tmpdir),
+        profile=True,
+    )
+    pwig.write_input_files()
+    stats = pwig.timing_stats.as_dict()
+    for stage in [
+        "calculation_settings",
+        "pseudo_names",
+        "namelist_to_str",
+        "atomic_species_card",
+        "atomic_positions_card",
+        "kpoints_card",
+        "cell_parameters_card",
+        "write_pwx_input",
+        "write_input_files",
+    ]:
+        assert stats[stage]["calls"] >= 1
+    # settings are merged only once
+    assert stats["calculation_settings"]["calls"] == 1
+    # batch generators record stats in the same object
+    pwig.custom_sett_dict["kpoints"] = {
+        "scheme": "automatic",
+        "spacing": 0.2,
+        "shift": [0, 0, 0],
+    }
+    list(pwig.generate_many([feo_struct, al_fcc_struct]))
+    stats = pwig.timing_stats.as_dict()
+    assert stats["kpoint_grids"]["calls"] == 1
+    assert stats["all_namelists_as_str"]["calls"] == 2
+
+
+def test_build_pseudo_index():
+    # not a directory: cannot listdir error
+    with pytest.raises(PwxInputGeneratorError, match="list contents"):
+        _build_pseudo_index(fe_pseudo)
+    index = _build_pseudo_index(pseudo_dir)
+    assert index == {
+        "al": [os.path.basename(al_pseudo)],
+        "fe": [os.path.basename(fe_pseudo)],
+        "o": [os.path.basename(o_pseudo)],
+    }
+
+
+def test_get_pseudo_index(tmpdir, monkeypatch):
+    _pseudo_dir = str(tmpdir.mkdir("pseudos"))
+    for fname in ["Fe.pbe.UPF", "fe_pbe.upf", "o_pbe.UPF", "README"]:
+        open(os.path.join(_pseudo_dir, fname), "w").close()
+    os.utime(_pseudo_dir, (1000.0, 1000.0))
+    index = get_pseudo_index(_pseudo_dir)
+    assert sorted(index["fe"]) == ["Fe.pbe.UPF", "fe_pbe.upf"]
+    assert index["o"] == ["o_pbe.UPF"]
+    # unchanged directory: cached index is used
+    assert get_pseudo_index(_pseudo_dir) is index
+    # changed directory: index is rebuilt
+    open(os.path.join(_pseudo_dir, "al_pbe.UPF"), "w").close()
+    os.utime(_pseudo_dir, (2000.0, 2000.0))
+    index = get_pseudo_index(_pseudo_dir)
+    assert index["al"] == ["al_pbe.UPF"]
+
+    # persisted index: written once, read back in a "new process"
+    index_file = str(tmpdir.join("pseudo_index.json"))
+    _PSEUDO_INDEX_CACHE.clear()
+    assert get_pseudo_index(_pseudo_dir, index_file=index_file) == index
+    assert os.path.isfile(index_file)
+    _PSEUDO_INDEX_CACHE.clear()
+
+    def _fail(*args):
+        raise AssertionError("pseudo_dir should not be listed")
+
+    monkeypatch.setattr("dftinputgen.qe.pwx._build_pseudo_index", _fail)
+    assert get_pseudo_index(_pseudo_dir, index_file=index_file) == index
+    monkeypatch.undo()
+    # stale or invalid persisted index: rebuilt and rewritten
+    os.utime(_pseudo_dir, (3000.0, 3000.0))
+    assert get_pseudo_index(_pseudo_dir, index_file=index_file) == index
+    with open(index_file, "r") as fr:
+        assert json.load(fr)["mtime"] == 3000.0
+    _PSEUDO_INDEX_CACHE.clear()
+    with open(index_file, "w") as fw:
+        json.dump({"pseudo_dir": "other", "mtime": 3000.0}, fw)
+    assert get_pseudo_index(_pseudo_dir, index_file=index_file) == index
+    _PSEUDO_INDEX_CACHE.clear()
+    with open(index_file, "w") as fw:
+        fw.write("not json")
+    assert get_pseudo_index(_pseudo_dir, index_file=index_file) == index
+    # errors writing the persisted index are ignored, no files left behind
+    _PSEUDO_INDEX_CACHE.clear()
+    missing_dir_file = str(tmpdir.join("missing", "pseudo_index.json"))
+    assert get_pseudo_index(_pseudo_dir, index_file=missing_dir_file) == index
+    assert not tmpdir.join("missing").check()
+
+    def _fail_replace(src, dst):
+        raise OSError("read-only file system")
+
+    _PSEUDO_INDEX_CACHE.clear()
+    os.remove(index_file)
+    monkeypatch.setattr(os, "replace", _fail_replace)
+    assert get_pseudo_index(_pseudo_dir, index_file=index_file) == index
+    monkeypatch.undo()
+    assert sorted(os.listdir(str(tmpdir))) == ["pseudos"]
+
+
+def test_get_pseudo_names_with_index_file(tmpdir):
+    index_file = str(tmpdir.join("pseudo_index.json"))
+    _PSEUDO_INDEX_CACHE.clear()
+    pwig = PwxInputGenerator(
+        crystal_structure=feo_struct,
+        custom_sett_dict={
+            "pseudo_dir": pseudo_dir,
+            "pseudo_index_file": index_file,
+        },
+        specify_potentials=True,
+    )
+    assert pwig._get_pseudo_names() == {
+        "Fe": os.path.basename(fe_pseudo),
+        "O": os.path.basename(o_pseudo),
+    }
+    with open(index_file, "r") as fr:
+        assert json.load(fr)["pseudo_dir"] == pseudo_dir
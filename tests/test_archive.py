@@ -0,0 +1,121 @@
+"""Unit tests for sharded archive output in :mod:`dftinputgen.archive`."""
+
+import os
+import sys
+import json
+import tarfile
+import zipfile
+
+import six
+import pytest
+
+from dftinputgen.archive import ARCHIVE_FORMATS
+from dftinputgen.archive import ArchiveWriterError
+from dftinputgen.archive import ShardedArchiveWriter
+
+
+def _read_members(path):
+    if path.endswith(".zip"):
+        with zipfile.ZipFile(path) as zf:
+            return {n: zf.read(n).decode("utf-8") for n in zf.namelist()}
+    with tarfile.open(path) as tf:
+        return {
+            m.name: tf.extractfile(m).read().decode("utf-8")
+            for m in tf.getmembers()
+        }
+
+
+@pytest.mark.parametrize(
+    "archive_format",
+    [
+        "tar",
+        "tar.gz",
+        "tar.bz2",
+        pytest.param(
+            "tar.xz",
+            marks=pytest.mark.skipif(not six.PY3, reason="Python 3 only"),
+        ),
+        "zip",
+    ],
+)
+def test_sharded_archive_writer(tmpdir, archive_format):
+    write_location = str(tmpdir.join("calcs"))
+    ext = ARCHIVE_FORMATS[archive_format]
+    with ShardedArchiveWriter(
+        write_location, archive_format=archive_format, shard_size=2
+    ) as writer:
+        for i in range(5):
+            writer.add("{:02d}/pwx.in".format(i), "input {}".format(i))
+    shards = ["inputs_{:05d}{}".format(i, ext) for i in range(3)]
+    assert sorted(os.listdir(write_location)) == shards + ["inputs_index.json"]
+    assert _read_members(os.path.join(write_location, shards[2])) == {
+        "04/pwx.in": "input 4"
+    }
+    assert _read_members(os.path.join(write_location, shards[0])) == {
+        "00/pwx.in": "input 0",
+        "01/pwx.in": "input 1",
+    }
+    with open(writer.index_file, "r") as fr:
+        index = json.load(fr)
+    assert index == writer.index
+    assert index["03/pwx.in"] == shards[1]
+
+
+def test_sharded_archive_writer_defaults(tmpdir):
+    writer = ShardedArchiveWriter(str(tmpdir), prefix="pwx")
+    writer.add("a/pwx.in", "input a")
+    writer.close()
+    assert sorted(os.listdir(str(tmpdir))) == [
+        "pwx_00000.tar",
+        "pwx_index.json",
+    ]
+    # nothing written: no index file either
+    writer = ShardedArchiveWriter(str(tmpdir.join("empty")))
+    writer.close()
+    assert not os.path.exists(str(tmpdir.join("empty")))
+
+
+def test_sharded_archive_writer_errors(tmpdir):
+    with pytest.raises(ArchiveWriterError, match="Unknown archive format"):
+        ShardedArchiveWriter(str(tmpdir), archive_format="rar")
+    with pytest.raises(ArchiveWriterError, match="must be positive"):
+        ShardedArchiveWriter(str(tmpdir), shard_size=0)
+    writer = ShardedArchiveWriter(str(tmpdir))
+    writer.add("a/pwx.in", "input a")
+    with pytest.raises(ArchiveWriterError, match="Duplicate"):
+        writer.add("a/pwx.in", "input a")
+    writer.close()
+    # existing archives/index are not overwritten, if so specified
+    writer = ShardedArchiveWriter(str(tmpdir), overwrite_files=False)
+    with pytest.raises(ArchiveWriterError, match="already exists"):
+        writer.add("a/pwx.in", "input a")
+    os.remove(str(tmpdir.join("inputs_00000.tar")))
+    writer.add("a/pwx.in", "input a")
+    with pytest.raises(ArchiveWriterError, match="already exists"):
+        writer.close()
+
+
+def test_sharded_archive_writer_xz_python2(tmpdir, monkeypatch):
+    monkeypatch.setattr(six, "PY3", False)
+    with pytest.raises(ArchiveWriterError, match="requires Python 3"):
+        ShardedArchiveWriter(str(tmpdir), archive_format="tar.xz")
+
+
+def test_sharded_archive_writer_zstd_missing(tmpdir, monkeypatch):
+    monkeypatch.setitem(sys.modules, "zstandard", None)
+    writer = ShardedArchiveWriter(str(tmpdir), archive_format="tar.zst")
+    with pytest.raises(ArchiveWriterError, match="zstandard"):
+        writer.add("a/pwx.in", "input a")
+
+
+def test_sharded_archive_writer_zstd(tmpdir):
+    import zstandard
+
+    with ShardedArchiveWriter(str(tmpdir), archive_format="tar.zst") as w:
+        w.add("a/pwx.in", "input a")
+    path = str(tmpdir.join("inputs_00000.tar.zst"))
+    with open(path, "rb") as fr:
+        reader = zstandard.ZstdDecompressor().stream_reader(fr)
+        with tarfile.open(fileobj=reader, mode="r|") as tf:
+            member = next(iter(tf))
+            assert tf.extractfile(member).read() == b"input a"
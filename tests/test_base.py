@@ -62,6 +62,9 @@ def test_constructor():
     # default constructor arguments
     assert dig.write_location == os.getcwd()
     assert dig.overwrite_files
+    assert not dig.use_input_cache
+    assert not dig.profile
+    assert dig.timing_stats is None
 
     dig = DummyInputGenerator(
         crystal_structure=feo_struct,
@@ -69,9 +72,44 @@ def test_constructor():
         custom_sett_dict={"tag_3": "FROM_DICT"},
         write_location=test_data_dir,
         overwrite_files=False,
+        use_input_cache=True,
+        profile=True,
     )
     assert dig.custom_sett_file == dummy_sett_file
     assert dig.custom_sett_from_file == {"tag_1": "FROM_FILE", "tag_2": 0}
     assert dig.custom_sett_dict == {"tag_3": "FROM_DICT"}
     assert dig.write_location == test_data_dir
     assert not dig.overwrite_files
+    assert dig.use_input_cache
+    assert dig.profile
+    assert dig.timing_stats.as_dict() == {}
+    # stats are kept until profiling is disabled
+    dig.timing_stats.record("stage", 1.0)
+    dig.profile = True
+    assert "stage" in dig.timing_stats
+    dig.profile = False
+    assert dig.timing_stats is None
+
+
+def test_invalidate_calculation_settings():
+    DftInputGenerator.__abstractmethods__ = frozenset()
+
+    class DummyInputGenerator(DftInputGenerator):
+        pass
+
+    dig = DummyInputGenerator(crystal_structure=feo_struct)
+    dig._calculation_settings = {"tag_1": "CACHED"}
+    # unchanged settings: cache is retained
+    dig.custom_sett_file = None
+    dig.custom_sett_dict = {}
+    dig.calculation_presets = None
+    assert dig._calculation_settings == {"tag_1": "CACHED"}
+    # changed settings: cache is discarded
+    dig.custom_sett_file = dummy_sett_file
+    assert dig._calculation_settings is None
+    dig._calculation_settings = {"tag_1": "CACHED"}
+    dig.custom_sett_dict = {"tag_3": "FROM_DICT"}
+    assert dig._calculation_settings is None
+    dig._calculation_settings = {"tag_1": "CACHED"}
+    dig.calculation_presets = "scf"
+    assert dig._calculation_settings is None
@@ -0,0 +1,92 @@
+"""Unit tests for the input cache manifest in :mod:`dftinputgen.cache`."""
+
+import os
+import json
+
+from ase import io as ase_io
+
+from dftinputgen.cache import MANIFEST_FILENAME
+from dftinputgen.cache import hash_inputs
+from dftinputgen.cache import InputCacheManifest
+
+
+test_data_dir = os.path.join(os.path.dirname(__file__), "qe", "files")
+feo_struct = ase_io.read(os.path.join(test_data_dir, "feo_conv.vasp"))
+
+
+def test_hash_inputs():
+    sett = {"ecutwfc": 45, "kpoints": {"scheme": "gamma"}}
+    input_hash = hash_inputs(feo_struct, sett)
+    assert len(input_hash) == 64
+    # stable for equal (not identical) inputs
+    assert hash_inputs(feo_struct.copy(), dict(sett)) == input_hash
+    # sensitive to structure, settings and extra data
+    feo_rattled = feo_struct.copy()
+    feo_rattled.positions[0, 0] += 1e-8
+    assert hash_inputs(feo_rattled, sett) != input_hash
+    feo_magnetic = feo_struct.copy()
+    feo_magnetic.set_initial_magnetic_moments([1.0] * len(feo_struct))
+    assert hash_inputs(feo_magnetic, sett) != input_hash
+    feo_strained = feo_struct.copy()
+    feo_strained.cell[0, 1] *= 1.01
+    assert hash_inputs(feo_strained, sett) != input_hash
+    assert hash_inputs(feo_struct, {"ecutwfc": 50}) != input_hash
+    extra = {"pseudo_names": {"Fe": "fe.UPF"}}
+    assert hash_inputs(feo_struct, sett, extra=extra) != input_hash
+
+
+def test_manifest_missing_or_invalid(tmpdir):
+    manifest = InputCacheManifest(str(tmpdir))
+    assert manifest.path == str(tmpdir.join(MANIFEST_FILENAME))
+    # missing manifest
+    assert manifest.entries == {}
+    # unreadable, unexpected contents, or unknown format
+    for contents in ["{not json", "[]", '{"format_version": 0}']:
+        tmpdir.join(MANIFEST_FILENAME).write(contents)
+        assert InputCacheManifest(str(tmpdir)).entries == {}
+
+
+def test_manifest_record_and_save(tmpdir):
+    write_location = str(tmpdir.join("calcs"))
+    manifest = InputCacheManifest(write_location, manifest_file="cache.json")
+    relpath = os.path.join("feo", "scf.in")
+    assert not manifest.is_unchanged(relpath, "abc")
+    os.makedirs(os.path.join(write_location, "feo"))
+    with open(os.path.join(write_location, relpath), "w") as fw:
+        fw.write("&CONTROL\n/")
+    entry = manifest.record(relpath, "abc")
+    assert entry["hash"] == "abc"
+    assert entry["size"] == 10
+    assert manifest.is_unchanged(relpath, "abc")
+    assert not manifest.is_unchanged(relpath, "def")
+    manifest.save()
+    assert os.listdir(write_location) == ["cache.json", "feo"]
+
+    # entries are read back from file
+    manifest = InputCacheManifest(write_location, manifest_file="cache.json")
+    assert manifest.entries == {relpath: entry}
+    assert manifest.is_unchanged(relpath, "abc")
+    # modified file is not up-to-date
+    with open(os.path.join(write_location, relpath), "a") as fw:
+        fw.write("\n")
+    assert not manifest.is_unchanged(relpath, "abc")
+    # removed file is not up-to-date
+    os.remove(os.path.join(write_location, relpath))
+    assert not manifest.is_unchanged(relpath, "abc")
+
+
+def test_manifest_entries_and_update(tmpdir):
+    entries = {"a/pwx.in": {"hash": "abc", "size": 1, "mtime": 0.0}}
+    write_location = str(tmpdir.join("calcs"))
+    manifest = InputCacheManifest(write_location, entries=entries)
+    assert manifest.entries == entries
+    manifest.update({"b/pwx.in": {"hash": "def", "size": 2, "mtime": 0.0}})
+    manifest.save()
+    with open(manifest.path, "r") as fr:
+        saved = json.load(fr)
+    assert sorted(saved["entries"]) == ["a/pwx.in", "b/pwx.in"]
+    # the manifest is created in the write location, if it does not exist
+    # yet; the existing manifest is replaced
+    manifest.update({})
+    manifest.save()
+    assert os.listdir(write_location) == [MANIFEST_FILENAME]
@@ -36,6 +36,16 @@ def test_driver(capsys):
         driver(["pw.x"])
     assert "required" in capsys.readouterr().err
 
+    # batch: missing manifest file error
+    with pytest.raises(SystemExit):
+        driver(["batch"])
+    assert "required" in capsys.readouterr().err
+
+    # cost: missing crystal structure error
+    with pytest.raises(SystemExit):
+        driver(["cost"])
+    assert "required" in capsys.readouterr().err
+
     # pw.x package: minimal working example
     import tempfile
 
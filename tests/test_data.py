@@ -0,0 +1,132 @@
+"""Unit tests for data constants and loaders in :mod:`dftinputgen.data`."""
+
+import sys
+import subprocess
+
+import numpy as np
+import pytest
+
+from dftinputgen.data import LazyMapping
+from dftinputgen.data import AtomicWeights
+from dftinputgen.data import ATOMIC_WEIGHTS
+from dftinputgen.data import list_resources
+from dftinputgen.data import load_json_resource
+from dftinputgen.data import STANDARD_ATOMIC_WEIGHTS
+
+
+def test_lazy_mapping():
+    calls = []
+
+    def _loader():
+        calls.append(1)
+        return {"a": 1, "b": 2}
+
+    lm = LazyMapping(_loader)
+    assert not lm.is_loaded
+    assert repr(lm) == "LazyMapping(<not loaded>)"
+    assert "a" in lm
+    assert lm.is_loaded
+    assert lm["b"] == 2
+    assert lm.get("c") is None
+    assert sorted(lm) == ["a", "b"]
+    assert len(lm) == 2
+    assert lm == {"a": 1, "b": 2}
+    assert repr(lm) == "LazyMapping({'a': 1, 'b': 2})"
+    # contents are loaded only once
+    assert len(calls) == 1
+
+
+def test_lazy_mapping_is_dict():
+    import copy
+    import json
+    import pickle
+    import six
+
+    def _lazy_mapping():
+        return LazyMapping(lambda: {"a": 1, "b": {"c": 2}})
+
+    assert isinstance(_lazy_mapping(), dict)
+    # unloaded mappings behave as their contents everywhere
+    assert json.loads(json.dumps(_lazy_mapping())) == {"a": 1, "b": {"c": 2}}
+    fw = six.StringIO()
+    json.dump(_lazy_mapping(), fw)
+    assert json.loads(fw.getvalue())["a"] == 1
+    assert dict(_lazy_mapping()) == {"a": 1, "b": {"c": 2}}
+    target = {"d": 3}
+    target.update(_lazy_mapping())
+    assert sorted(target) == ["a", "b", "d"]
+    assert {"a": 1, "b": {"c": 2}} == _lazy_mapping()
+    assert _lazy_mapping() != {}
+    assert sorted(_lazy_mapping().items()) == [("a", 1), ("b", {"c": 2})]
+    assert pickle.loads(pickle.dumps(_lazy_mapping())) == {
+        "a": 1,
+        "b": {"c": 2},
+    }
+    assert copy.deepcopy(_lazy_mapping()) == {"a": 1, "b": {"c": 2}}
+    assert _lazy_mapping().copy() == {"a": 1, "b": {"c": 2}}
+    # and can be updated
+    lm = _lazy_mapping()
+    lm.update({"e": 4})
+    lm["f"] = 5
+    assert sorted(lm) == ["a", "b", "e", "f"]
+    assert lm.data is lm
+
+
+def test_resources():
+    assert "standard_atomic_weights.json" in list_resources("dftinputgen.data")
+    saw = load_json_resource("dftinputgen.data", "standard_atomic_weights.json")
+    assert saw["Fe"]["standard_atomic_weight"] == 55.845
+    assert STANDARD_ATOMIC_WEIGHTS["Fe"] == saw["Fe"]
+
+
+def test_atomic_weights():
+    aw = AtomicWeights(
+        {
+            "H": {"atomic_number": 1, "standard_atomic_weight": 1.008},
+            "O": {"atomic_number": 8, "standard_atomic_weight": 15.999},
+        }
+    )
+    assert not aw.is_loaded
+    assert repr(aw) == "AtomicWeights(<not loaded>)"
+    assert aw.atomic_numbers == {"H": 1, "O": 8}
+    assert aw.is_loaded
+    assert aw.weights.dtype == np.float64
+    assert aw.weights.shape == (9,)
+    assert np.isnan(aw.weights[0]) and np.isnan(aw.weights[2])
+    assert aw.weights[[1, 8, 1]].tolist() == [1.008, 15.999, 1.008]
+    assert aw.get_weights(["O", "H"]).tolist() == [15.999, 1.008]
+    assert aw.get_weights([]).tolist() == []
+    assert repr(aw).startswith("AtomicWeights(array([")
+    with pytest.raises(KeyError):
+        aw.get_weights(["X"])
+    # weights array can also be built first
+    aw = AtomicWeights(aw._standard_atomic_weights)
+    assert aw.weights[8] == 15.999
+    assert aw.atomic_numbers["O"] == 8
+
+
+def test_standard_atomic_weights_array():
+    for symbol, data in STANDARD_ATOMIC_WEIGHTS.items():
+        z = ATOMIC_WEIGHTS.atomic_numbers[symbol]
+        assert z == data["atomic_number"]
+        assert ATOMIC_WEIGHTS.weights[z] == data["standard_atomic_weight"]
+    assert ATOMIC_WEIGHTS.get_weights(["Fe", "O"]).tolist() == [
+        55.845,
+        15.9994,
+    ]
+
+
+def test_lazy_import():
+    # importing does not use `pkg_resources` or load any data files
+    script = "\n".join(
+        [
+            "import sys",
+            "from dftinputgen.data import STANDARD_ATOMIC_WEIGHTS",
+            "assert 'pkg_resources' not in sys.modules",
+            "assert not STANDARD_ATOMIC_WEIGHTS.is_loaded",
+            "from dftinputgen.data import ATOMIC_WEIGHTS",
+            "assert not ATOMIC_WEIGHTS.is_loaded",
+            "assert 'numpy' not in sys.modules",
+        ]
+    )
+    subprocess.check_call([sys.executable, "-c", script])
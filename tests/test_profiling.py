@@ -0,0 +1,75 @@
+"""Unit tests for timing instrumentation in :mod:`dftinputgen.profiling`."""
+
+import json
+import pytest
+
+from dftinputgen.profiling import TimingStats
+from dftinputgen.profiling import timed
+from dftinputgen.profiling import timer
+
+
+def test_timing_stats():
+    ts = TimingStats()
+    assert ts.as_dict() == {}
+    ts.record("stage_1", 0.5)
+    ts.record("stage_1", 0.25, calls=2)
+    assert ts.as_dict() == {"stage_1": {"calls": 3, "wall_time": 0.75}}
+    assert "stage_1" in ts
+    assert "stage_2" not in ts
+    with ts.timer("stage_2"):
+        pass
+    assert ts.as_dict()["stage_2"]["calls"] == 1
+    assert ts.as_dict()["stage_2"]["wall_time"] >= 0
+    # time is recorded even if the body raises
+    with pytest.raises(ValueError):
+        with ts.timer("stage_3"):
+            raise ValueError
+    assert ts.as_dict()["stage_3"]["calls"] == 1
+    assert json.loads(ts.to_json()) == ts.as_dict()
+    assert repr(ts).startswith("TimingStats({")
+    # returned dictionary is a copy
+    ts.as_dict()["stage_1"]["calls"] = 10
+    assert ts.as_dict()["stage_1"]["calls"] == 3
+    ts.reset()
+    assert ts.as_dict() == {}
+
+
+def test_timing_stats_merge():
+    ts_1 = TimingStats()
+    ts_1.record("stage_1", 0.5)
+    ts_2 = TimingStats()
+    ts_2.record("stage_1", 0.25)
+    ts_2.record("stage_2", 1.0)
+    ts_1.merge(ts_2)
+    ts_1.merge({"stage_2": {"calls": 2, "wall_time": 1.0}})
+    assert ts_1.as_dict() == {
+        "stage_1": {"calls": 2, "wall_time": 0.75},
+        "stage_2": {"calls": 3, "wall_time": 2.0},
+    }
+
+
+def test_timer():
+    with timer(None, "stage_1"):
+        pass
+    ts = TimingStats()
+    with timer(ts, "stage_1"):
+        pass
+    assert ts.as_dict()["stage_1"]["calls"] == 1
+
+
+def test_timed():
+    class Dummy(object):
+        timing_stats = None
+
+        @timed("stage_1")
+        def method(self, value, factor=1):
+            """Docstring."""
+            return value * factor
+
+    dummy = Dummy()
+    assert Dummy.method.__doc__ == "Docstring."
+    assert dummy.method(2, factor=3) == 6
+    dummy.timing_stats = TimingStats()
+    assert dummy.method(2, factor=3) == 6
+    assert dummy.method(2) == 2
+    assert dummy.timing_stats.as_dict()["stage_1"]["calls"] == 2
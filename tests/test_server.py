@@ -0,0 +1,254 @@
+"""Unit tests for the server/client mode in :mod:`dftinputgen.server`."""
+
+import io
+import os
+import sys
+import json
+import errno
+import shutil
+import tempfile
+import threading
+import subprocess
+
+import pytest
+
+from dftinputgen.cli import driver
+from dftinputgen.server import handle_request
+from dftinputgen.server import serve
+from dftinputgen.server import serve_stream
+from dftinputgen.server import serve_unix_socket
+from dftinputgen.server import send_request
+from dftinputgen.server import client_main
+
+
+test_data_dir = os.path.join(os.path.dirname(__file__), "files")
+feo_file = os.path.join(test_data_dir, "feo_conv.vasp")
+
+
+@pytest.fixture
+def socket_path():
+    # short path: Unix socket paths are limited to ~100 characters
+    tmp_dir = tempfile.mkdtemp()
+    yield os.path.join(tmp_dir, "dig.sock")
+    shutil.rmtree(tmp_dir)
+
+
+def test_handle_request(tmpdir):
+    assert handle_request({"command": "ping", "id": 1}) == {
+        "ok": True,
+        "exit_code": 0,
+        "error": None,
+        "id": 1,
+    }
+    assert handle_request({"command": "shutdown"})["ok"]
+    for request in [{"command": "unknown"}, {"args": "pw.x -i POSCAR"}]:
+        assert handle_request(request)["error"] == "Invalid request"
+    response = handle_request({"args": ["serve"]})
+    assert "Cannot run server/client" in response["error"]
+
+    # command is run relative to the specified directory
+    cwd = os.getcwd()
+    shutil.copy(feo_file, str(tmpdir))
+    args = ["pw.x", "-i", "feo_conv.vasp", "-pre", "scf"]
+    response = handle_request({"args": args, "cwd": str(tmpdir)})
+    assert response["ok"]
+    assert response["elapsed"] >= 0
+    assert os.path.isfile(str(tmpdir.join("scf.in")))
+    assert os.getcwd() == cwd
+
+    # invalid arguments: exit code and error messages from argparse
+    response = handle_request({"args": ["pw.x"], "cwd": str(tmpdir)})
+    assert not response["ok"]
+    assert response["exit_code"] == 2
+    assert "required" in response["stderr"]
+
+    # errors while generating input are reported
+    response = handle_request({"args": ["pw.x", "-i", feo_file]})
+    assert not response["ok"]
+    assert "Nothing to write" in response["error"]
+    response = handle_request({"args": args, "cwd": str(tmpdir.join("no"))})
+    assert not response["ok"]
+    assert os.getcwd() == cwd
+
+
+def test_serve_stream():
+    requests = [
+        json.dumps({"command": "ping", "id": "a"}),
+        "",
+        "{not json",
+        json.dumps({"args": ["pw.x"]}),
+        json.dumps({"command": "shutdown"}),
+        json.dumps({"command": "ping", "id": "b"}),
+    ]
+    # text streams
+    wfile = io.StringIO()
+    assert serve_stream(io.StringIO(u"\n".join(requests)), wfile)
+    responses = [json.loads(r) for r in wfile.getvalue().splitlines()]
+    assert [r.get("id") for r in responses] == ["a", None, None, None]
+    assert responses[1]["error"] == "Invalid JSON"
+    assert responses[2]["exit_code"] == 2
+    # binary streams, until EOF
+    wfile = io.BytesIO()
+    rfile = io.BytesIO("\n".join(requests[:2]).encode("utf-8"))
+    assert not serve_stream(rfile, wfile)
+    assert json.loads(wfile.getvalue().decode("utf-8"))["id"] == "a"
+
+
+def test_serve_stdio(monkeypatch):
+    monkeypatch.setattr(sys, "stdin", io.StringIO(u'{"command": "ping"}\n'))
+    monkeypatch.setattr(sys, "stdout", io.StringIO())
+    stdout = sys.stdout
+    serve()
+    assert json.loads(stdout.getvalue())["ok"]
+
+
+def test_serve_unix_socket(socket_path, tmpdir, capsys):
+    server = threading.Thread(
+        target=driver, args=(["serve", "-s", socket_path],)
+    )
+    server.start()
+    try:
+        for _ in range(500):
+            if os.path.exists(socket_path):
+                break
+            server.join(0.01)
+        assert send_request(socket_path, {"command": "ping"}, timeout=10)["ok"]
+
+        # socket is accessible to the current user only
+        assert not os.stat(socket_path).st_mode & 0o077
+
+        # another server on the same socket fails, leaves the socket alone
+        with pytest.raises(OSError) as exc_info:
+            serve_unix_socket(socket_path)
+        assert "already listening" in str(exc_info.value)
+        assert send_request(socket_path, {"command": "ping"}, timeout=10)["ok"]
+
+        # client relays output and exit code of the command
+        client_args = ["-s", socket_path, "-t", "10"]
+        with pytest.raises(SystemExit) as exc_info:
+            client_main(client_args + ["pw.x"])
+        assert exc_info.value.code == 2
+        assert "required" in capsys.readouterr().err
+        with pytest.raises(SystemExit) as exc_info:
+            client_main(client_args + ["pw.x", "-i", feo_file])
+        assert "Nothing to write" in capsys.readouterr().err
+        driver(["client"] + client_args + ["ping"])
+        cwd = os.getcwd()
+        try:
+            os.chdir(str(tmpdir))
+            driver(
+                ["client"] + client_args + ["pw.x", "-i", feo_file]
+                + ["-pre", "scf"]
+            )
+        finally:
+            os.chdir(cwd)
+        assert os.path.isfile(str(tmpdir.join("scf.in")))
+
+        # client disconnecting without reading the response is OK
+        import socket
+
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        client.connect(socket_path)
+        client.sendall(b'{"command": "ping"}\n')
+        client.close()
+        assert send_request(socket_path, {"command": "ping"})["ok"]
+        client_main(client_args + ["shutdown"])
+    finally:
+        server.join(10)
+    assert not server.is_alive()
+    assert not os.path.exists(socket_path)
+
+
+def test_serve_unix_socket_stale(socket_path, monkeypatch):
+    import socket
+
+    # socket left behind by a server that is not running anymore
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(socket_path)
+    stale.close()
+    server = threading.Thread(target=serve_unix_socket, args=(socket_path,))
+    server.start()
+    try:
+        for _ in range(500):
+            try:
+                response = send_request(socket_path, {"command": "shutdown"})
+                break
+            except (IOError, OSError):
+                server.join(0.01)
+        assert response["ok"]
+    finally:
+        server.join(10)
+    assert not server.is_alive()
+    assert not os.path.exists(socket_path)
+
+    # socket that cannot be checked (e.g. no permission): not removed
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(socket_path)
+    stale.close()
+
+    def _connect(self, address):
+        raise OSError(errno.EACCES, "Permission denied")
+
+    with monkeypatch.context() as m:
+        m.setattr(socket.socket, "connect", _connect)
+        with pytest.raises(OSError) as exc_info:
+            serve_unix_socket(socket_path)
+    assert exc_info.value.errno == errno.EACCES
+    assert os.path.exists(socket_path)
+    os.remove(socket_path)
+
+    # not a socket: not removed
+    with open(socket_path, "w") as fw:
+        fw.write("data")
+    with pytest.raises(OSError):
+        serve_unix_socket(socket_path)
+    assert os.path.isfile(socket_path)
+
+
+def test_run_command_exit_codes(monkeypatch):
+    import dftinputgen.cli
+
+    for code, exit_code in [(None, 0), (3, 3), ("Error", 1)]:
+
+        def _exit(args, code=code):
+            sys.exit(code)
+
+        monkeypatch.setattr(dftinputgen.cli, "driver", _exit)
+        response = handle_request({"args": ["pw.x"]})
+        assert response["exit_code"] == exit_code
+        assert response["ok"] == (exit_code == 0)
+
+
+def test_send_request_no_response(socket_path):
+    import socket
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_path)
+    server.listen(1)
+
+    def _close_without_response():
+        conn, _ = server.accept()
+        conn.recv(1024)
+        conn.close()
+
+    thread = threading.Thread(target=_close_without_response)
+    thread.start()
+    try:
+        response = send_request(socket_path, {"command": "ping"}, timeout=10)
+    finally:
+        thread.join(10)
+        server.close()
+    assert response["error"] == "No response"
+
+
+def test_client_is_lightweight():
+    # the client does not import numpy/ase
+    script = "\n".join(
+        [
+            "import sys",
+            "import dftinputgen.server",
+            "assert 'numpy' not in sys.modules",
+            "assert 'ase' not in sys.modules",
+        ]
+    )
+    subprocess.check_call([sys.executable, "-c", script])
@@ -0,0 +1,82 @@
+"""Unit tests for array-backed structures in :mod:`dftinputgen.structure`."""
+
+import os
+import pytest
+import numpy as np
+
+from ase import io as ase_io
+
+from dftinputgen.cache import hash_inputs
+from dftinputgen.structure import ArrayStructure
+from dftinputgen.structure import iter_array_structures
+
+
+test_base_dir = os.path.dirname(__file__)
+feo_conv_file = os.path.join(test_base_dir, "qe", "files", "feo_conv.vasp")
+feo_conv = ase_io.read(feo_conv_file)
+
+
+def test_array_structure():
+    cell = np.array(feo_conv.get_cell())
+    positions = feo_conv.get_scaled_positions()
+    structure = ArrayStructure(
+        feo_conv.get_chemical_symbols(), cell, positions
+    )
+    assert len(structure) == len(feo_conv)
+    assert structure.get_chemical_symbols() == feo_conv.get_chemical_symbols()
+    # arrays of the expected type are not copied
+    assert structure.get_scaled_positions() is positions
+    assert structure.get_cell() is cell
+    assert structure.cell is cell
+    assert structure.get_pbc().tolist() == [True] * 3
+    assert np.allclose(structure.get_positions(), feo_conv.get_positions())
+    assert sorted(structure.arrays) == ["scaled_positions", "symbols"]
+    assert "symbols=['Fe'" in repr(structure)
+    structure = ArrayStructure(["Al"], np.eye(3), [[0.5] * 3], pbc=False)
+    assert structure.get_pbc().tolist() == [False] * 3
+
+
+def test_array_structure_errors():
+    with pytest.raises(ValueError, match="1D sequence of symbols"):
+        ArrayStructure("Al", np.eye(3), [[0] * 3])
+    with pytest.raises(ValueError, match="cell of shape"):
+        ArrayStructure(["Al"], np.eye(2), [[0] * 3])
+    with pytest.raises(ValueError, match=r"positions of shape \(2, 3\)"):
+        ArrayStructure(["Al", "Al"], np.eye(3), [[0] * 3])
+
+
+def test_array_structure_atoms_roundtrip():
+    structure = ArrayStructure.from_atoms(feo_conv)
+    atoms = structure.to_atoms()
+    assert atoms.get_chemical_symbols() == feo_conv.get_chemical_symbols()
+    assert np.allclose(atoms.get_positions(), feo_conv.get_positions())
+    assert np.allclose(atoms.get_cell(), feo_conv.get_cell())
+    # inputs of array structures are hashed like any other structure
+    settings = {"ecutwfc": 40}
+    assert hash_inputs(structure, settings) == hash_inputs(
+        ArrayStructure.from_atoms(atoms), settings
+    )
+    assert hash_inputs(structure, settings) != hash_inputs(
+        structure, {"ecutwfc": 45}
+    )
+
+
+def test_iter_array_structures():
+    cells = np.stack([np.eye(3) * a for a in [3.0, 4.0, 5.0]])
+    positions = np.zeros((3, 2, 3))
+    positions[:, 1] = 0.5
+    structures = list(iter_array_structures(["Cs", "Cl"], cells, positions))
+    assert len(structures) == 3
+    assert [len(s) for s in structures] == [2] * 3
+    assert structures[1].get_chemical_symbols() == ["Cs", "Cl"]
+    # structures are views into the input arrays
+    assert np.shares_memory(structures[2].cell, cells)
+    assert np.shares_memory(structures[2].get_scaled_positions(), positions)
+    symbols = [["Cs", "Cl"], ["Na", "Cl"], ["K", "Br"]]
+    structures = list(
+        iter_array_structures(symbols, cells, positions, pbc=[1, 1, 0])
+    )
+    assert structures[2].get_chemical_symbols() == ["K", "Br"]
+    assert structures[2].get_pbc().tolist() == [True, True, False]
+    with pytest.raises(ValueError, match="same number"):
+        list(iter_array_structures(symbols, cells[:2], positions))
@@ -2,12 +2,21 @@
 
 import os
 import pytest
+import numpy as np
 
 from ase import io as ase_io
 
 from dftinputgen.utils import get_elem_symbol
+from dftinputgen.utils import get_elem_symbols
 from dftinputgen.utils import read_crystal_structure
+from dftinputgen.utils import iread_crystal_structures
+from dftinputgen.utils import crystal_structure_from_dict
 from dftinputgen.utils import get_kpoint_grid_from_spacing
+from dftinputgen.utils import get_kpoint_grids_from_spacing
+from dftinputgen.utils import get_vacuum_directions
+from dftinputgen.utils import get_dimensionality
+from dftinputgen.utils import reduce_crystal_structure
+from dftinputgen.utils import write_json_atomic
 from dftinputgen.utils import DftInputGeneratorUtilsError
 
 
@@ -23,6 +32,38 @@ def test_get_elem_symbol():
         get_elem_symbol("G23")
 
 
+def test_get_elem_symbol_memo(monkeypatch):
+    from dftinputgen import utils
+
+    monkeypatch.setattr(utils, "_ELEM_SYMBOL_MEMO", {})
+    monkeypatch.setattr(utils, "_ELEM_SYMBOL_MEMO_MAXSIZE", 2)
+    # element symbols are not memoized
+    assert get_elem_symbol("Fe") == "Fe"
+    assert utils._ELEM_SYMBOL_MEMO == {}
+    assert get_elem_symbol("Fe_up") == "Fe"
+    assert get_elem_symbol("Fe_dn") == "Fe"
+    assert utils._ELEM_SYMBOL_MEMO == {"Fe_up": "Fe", "Fe_dn": "Fe"}
+    assert get_elem_symbol("Fe_up") == "Fe"
+    # memo is cleared when full
+    assert get_elem_symbol("O1") == "O"
+    assert utils._ELEM_SYMBOL_MEMO == {"O1": "O"}
+    # failures are not memoized
+    with pytest.raises(DftInputGeneratorUtilsError):
+        get_elem_symbol("G23")
+    assert "G23" not in utils._ELEM_SYMBOL_MEMO
+
+
+def test_get_elem_symbols():
+    labels = ["Fe1", "Fe-2", "O", "Fe_up", "3RGe-34"]
+    assert get_elem_symbols(labels) == ["Fe", "Fe", "O", "Fe", "Ge"]
+    assert get_elem_symbols(np.array(labels)) == get_elem_symbols(labels)
+    symbols = feo_conv.get_chemical_symbols()
+    assert get_elem_symbols(symbols) == symbols
+    assert get_elem_symbols([]) == []
+    with pytest.raises(DftInputGeneratorUtilsError):
+        get_elem_symbols(["Fe", "G23"])
+
+
 def test_read_crystal_structure():
     # str with path to crystal structure file is OK
     cs = read_crystal_structure(feo_conv_file)
@@ -32,7 +73,212 @@ def test_read_crystal_structure():
         read_crystal_structure(feo_conv)
 
 
+def test_iread_crystal_structures(tmpdir):
+    frames_file = str(tmpdir.join("frames.extxyz"))
+    frames = [feo_conv.copy() for _ in range(4)]
+    for i, frame in enumerate(frames):
+        frame.rattle(stdev=0.01, seed=i)
+    ase_io.write(frames_file, frames)
+    # frames are read lazily, one at a time
+    it = iread_crystal_structures(frames_file)
+    assert not isinstance(it, list)
+    for test, ref in zip(it, frames):
+        assert np.allclose(test.positions, ref.positions)
+    # slices of frames
+    it = iread_crystal_structures(frames_file, index="1::2")
+    assert len(list(it)) == 2
+    # any other type of input should throw an error
+    with pytest.raises(TypeError):
+        iread_crystal_structures(feo_conv)
+
+
+def test_crystal_structure_from_dict():
+    feo = feo_conv
+    inline = {
+        "symbols": feo.get_chemical_symbols(),
+        "cell": feo.get_cell().tolist(),
+        "scaled_positions": feo.get_scaled_positions().tolist(),
+    }
+    atoms = crystal_structure_from_dict(inline)
+    assert atoms.get_chemical_formula() == feo.get_chemical_formula()
+    assert np.allclose(atoms.get_positions(), feo.get_positions())
+    assert all(atoms.get_pbc())
+    atoms = crystal_structure_from_dict(
+        {"symbols": "Al", "cell": np.eye(3), "positions": [[0] * 3], "pbc": 0}
+    )
+    assert not any(atoms.get_pbc())
+    with pytest.raises(TypeError):
+        crystal_structure_from_dict(feo)
+    with pytest.raises(ValueError, match="Unknown"):
+        crystal_structure_from_dict(dict(inline, numbers=[26]))
+    with pytest.raises(ValueError, match="Missing"):
+        crystal_structure_from_dict({"symbols": "Al", "positions": [[0] * 3]})
+    with pytest.raises(ValueError, match="exactly one"):
+        crystal_structure_from_dict({"symbols": "Al", "cell": np.eye(3)})
+
+
 def test_kpoint_grid_from_spacing():
     assert get_kpoint_grid_from_spacing(feo_conv, 0.2) == pytest.approx(
         [7, 7, 7]
     )
+
+
+def test_kpoint_grids_from_spacing():
+    import numpy as np
+
+    # same grids as for one structure at a time
+    rng = np.random.RandomState(0)
+    cells = rng.uniform(-2.0, 2.0, size=(50, 3, 3)) + 6.0 * np.eye(3)
+    grids = get_kpoint_grids_from_spacing(cells, 0.15)
+    assert len(grids) == 50
+    for cell, grid in zip(cells, grids):
+        structure = feo_conv.copy()
+        structure.set_cell(cell)
+        assert grid == get_kpoint_grid_from_spacing(structure, 0.15)
+    # list of structures, or a list of cells
+    assert get_kpoint_grids_from_spacing([feo_conv] * 2, 0.2) == [[7, 7, 7]] * 2
+    assert get_kpoint_grids_from_spacing([feo_conv.cell], 0.2) == [[7, 7, 7]]
+    assert get_kpoint_grids_from_spacing([], 0.2) == []
+    # singular cell: error
+    with pytest.raises(np.linalg.LinAlgError):
+        get_kpoint_grids_from_spacing(np.zeros((2, 3, 3)), 0.2)
+
+
+def _slab_and_molecule():
+    from ase.build import fcc111, molecule
+
+    slab = fcc111("Al", size=(2, 2, 3), vacuum=5.0, periodic=True)
+    mol = molecule("H2O")
+    mol.set_cell([10.0, 10.0, 10.0])
+    mol.center()
+    return slab, mol
+
+
+def test_get_vacuum_directions():
+    from dftinputgen.structure import ArrayStructure
+
+    slab, mol = _slab_and_molecule()
+    assert get_vacuum_directions(feo_conv) == [False] * 3
+    assert get_dimensionality(feo_conv) == 3
+    assert get_vacuum_directions(slab) == [False, False, True]
+    assert get_dimensionality(ArrayStructure.from_atoms(slab)) == 2
+    assert get_vacuum_directions(mol) == [True] * 3
+    assert get_dimensionality(mol) == 0
+    # threshold: 10 A of vacuum in the slab
+    assert get_vacuum_directions(slab, min_vacuum=12.0) == [False] * 3
+    # non-periodic directions are always vacuum
+    structure = feo_conv.copy()
+    structure.set_pbc([True, True, False])
+    assert get_vacuum_directions(structure) == [False, False, True]
+    assert get_dimensionality(feo_conv[:0]) == 0
+
+
+def test_kpoint_grids_from_spacing_vacuum():
+    slab, mol = _slab_and_molecule()
+    grid = get_kpoint_grid_from_spacing(slab, 0.2)
+    assert grid[2] > 1
+    vacuum_grid = get_kpoint_grid_from_spacing(slab, 0.2, min_vacuum=6.0)
+    assert vacuum_grid == grid[:2] + [1]
+    assert get_kpoint_grid_from_spacing(mol, 0.2, min_vacuum=6.0) == [1] * 3
+    grids = get_kpoint_grids_from_spacing(
+        [feo_conv, slab, mol], 0.2, min_vacuum=6.0
+    )
+    assert grids == [[7, 7, 7], vacuum_grid, [1, 1, 1]]
+    # vacuum cannot be detected from cells alone
+    with pytest.raises(TypeError):
+        get_kpoint_grids_from_spacing(
+            np.array([slab.cell]), 0.2, min_vacuum=6.0
+        )
+
+
+def test_reduce_crystal_structure_niggli():
+    from dftinputgen.structure import ArrayStructure
+
+    # skewed (but equivalent) cell: Niggli reduction recovers the cell
+    structure = feo_conv.copy()
+    structure.set_cell(
+        np.dot([[1, 1, 0], [0, 1, 0], [0, 1, 1]], feo_conv.cell),
+        scale_atoms=False,
+    )
+    structure.set_initial_magnetic_moments([4, -4, 0, 0])
+    reduced = reduce_crystal_structure(structure, primitive=False)
+    assert sorted(reduced.get_cell_lengths_and_angles()[:3]) == pytest.approx(
+        sorted(feo_conv.get_cell_lengths_and_angles()[:3])
+    )
+    assert reduced.get_volume() == pytest.approx(feo_conv.get_volume())
+    assert reduced.get_chemical_symbols() == ["Fe", "Fe", "O", "O"]
+    assert reduced.get_initial_magnetic_moments().tolist() == [4, -4, 0, 0]
+    scaled_positions = reduced.get_scaled_positions(wrap=False)
+    assert np.all((scaled_positions >= 0) & (scaled_positions < 1))
+    # array structures stay array structures
+    reduced = reduce_crystal_structure(
+        ArrayStructure.from_atoms(structure), primitive=False
+    )
+    assert isinstance(reduced, ArrayStructure)
+    assert reduced.get_chemical_symbols() == ["Fe", "Fe", "O", "O"]
+    # only periodic structures can be reduced
+    structure.set_pbc([True, True, False])
+    with pytest.raises(DftInputGeneratorUtilsError, match="periodic"):
+        reduce_crystal_structure(structure, primitive=False)
+
+
+def test_reduce_crystal_structure_no_spglib(monkeypatch):
+    import sys
+
+    monkeypatch.setitem(sys.modules, "spglib", None)
+    with pytest.raises(DftInputGeneratorUtilsError, match="spglib"):
+        reduce_crystal_structure(feo_conv)
+
+
+def test_reduce_crystal_structure_primitive():
+    from dftinputgen.structure import ArrayStructure
+
+    al_fcc_file = os.path.join(
+        test_base_dir, "qe", "files", "al_fcc_conv.vasp"
+    )
+    al_fcc = ase_io.read(al_fcc_file)
+    reduced = reduce_crystal_structure(al_fcc)
+    assert len(reduced) == 1
+    assert reduced.get_volume() == pytest.approx(al_fcc.get_volume() / 4)
+    # rock salt FeO: 2 atoms in the primitive cell, unless Fe atoms have
+    # different magnetic moments (AFM order)
+    assert len(reduce_crystal_structure(feo_conv)) == 2
+    structure = feo_conv.copy()
+    structure.set_initial_magnetic_moments([4, -4, 0, 0])
+    reduced = reduce_crystal_structure(structure)
+    assert len(reduced) == 4
+    assert sorted(reduced.get_initial_magnetic_moments()) == [-4, 0, 0, 4]
+    # same magnetic moments (FM order): kinds are kept in the primitive cell
+    structure.set_initial_magnetic_moments([4, 4, 0, 0])
+    reduced = reduce_crystal_structure(structure)
+    assert len(reduced) == 2
+    assert reduced.get_volume() == pytest.approx(feo_conv.get_volume() / 2)
+    symbols_magmoms = zip(
+        reduced.get_chemical_symbols(), reduced.get_initial_magnetic_moments()
+    )
+    assert sorted(symbols_magmoms) == [("Fe", 4), ("O", 0)]
+    # array structures
+    reduced = reduce_crystal_structure(ArrayStructure.from_atoms(al_fcc))
+    assert isinstance(reduced, ArrayStructure)
+    assert reduced.get_chemical_symbols() == ["Al"]
+    # overlapping atoms: no primitive cell
+    structure = feo_conv.copy()
+    structure.positions[1] = structure.positions[0]
+    with pytest.raises(DftInputGeneratorUtilsError, match="primitive"):
+        reduce_crystal_structure(structure)
+
+
+def test_write_json_atomic(tmpdir):
+    import json
+
+    path = str(tmpdir.join("data.json"))
+    write_json_atomic(path, {"b": 1, "a": [2]}, sort_keys=True)
+    write_json_atomic(path, {"c": 3})
+    with open(path, "r") as fr:
+        assert json.load(fr) == {"c": 3}
+    # failure: existing file left untouched, no temporary file left behind
+    with pytest.raises(TypeError):
+        write_json_atomic(path, {"d": object()})
+    with open(path, "r") as fr:
+        assert json.load(fr) == {"c": 3}
+    assert os.listdir(str(tmpdir)) == ["data.json"]